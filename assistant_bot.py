@@ -1,28 +1,100 @@
 import os
-import time
+import random
 import logging
 import sys
 from http import HTTPStatus
-from logging.handlers import RotatingFileHandler
 
-import telegram
-import requests
-from dotenv import load_dotenv
+from dotenv import dotenv_values, find_dotenv, load_dotenv
 
+import clocks
 from exceptions import ApiEndpointFatalException, ApiResponseException
 from exceptions import ApiHomeworkStatusException, TelegramSendMessageException
 from exceptions import ApiEndpointHttpResponseException
+from exceptions import ApiConnectTimeoutException, ApiReadTimeoutException
+from exceptions import ApiConnectionException, ApiDeadlineExceededException
+from logs import lazy_logging
+from metrics import SEND_MESSAGE_SECONDS
+from tracing import span
 
-# Load tokens
-load_dotenv()
+# Load tokens, .env file is read again by reload_settings()
+ENV_FILE = find_dotenv()
+# Variables of the process environment take precedence over .env values on
+# start and on reload. Worker processes get the names of the parent, their
+# environment has .env values loaded by the parent.
+ENVIRONMENT_NAMES = frozenset(
+    os.environ['BOT_ENVIRONMENT_NAMES'].split(',')
+    if 'BOT_ENVIRONMENT_NAMES' in os.environ else os.environ
+)
+os.environ['BOT_ENVIRONMENT_NAMES'] = ','.join(sorted(ENVIRONMENT_NAMES))
+load_dotenv(ENV_FILE)
 
 # Get tokens from environment variables
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+# Optional JSON file with many tenants (token + chat id pairs)
+TENANTS_FILE = os.getenv('TENANTS_FILE')
 
 # Prepare constants
-RETRY_TIME = 600
+RETRY_TIME = int(os.getenv('RETRY_TIME', 600))
+MIN_POLL_INTERVAL = int(os.getenv('MIN_POLL_INTERVAL', 60))
+MAX_POLL_INTERVAL = int(os.getenv('MAX_POLL_INTERVAL', 3600))
+REVIEWING_POLL_INTERVAL = int(os.getenv('REVIEWING_POLL_INTERVAL', 120))
+POLL_CONCURRENCY = int(os.getenv('POLL_CONCURRENCY', 10))
+TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', 30))
+TELEGRAM_CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', 1))
+STATE_DB = os.getenv('STATE_DB', 'state.sqlite3')
+# Number of worker processes, tenants are sharded by chat id
+WORKERS = int(os.getenv('WORKERS', 1))
+# Practicum API request timeouts (seconds), retries of failed requests
+# and time limit of the whole poll cycle including retries
+API_CONNECT_TIMEOUT = float(os.getenv('API_CONNECT_TIMEOUT', 3.05))
+API_READ_TIMEOUT = float(os.getenv('API_READ_TIMEOUT', 10))
+API_RETRIES = int(os.getenv('API_RETRIES', 2))
+API_RETRY_BACKOFF = float(os.getenv('API_RETRY_BACKOFF', 0.5))
+POLL_DEADLINE = float(os.getenv('POLL_DEADLINE', 30))
+# Telegram bot api request timeouts (seconds)
+TELEGRAM_CONNECT_TIMEOUT = float(os.getenv('TELEGRAM_CONNECT_TIMEOUT', 3.05))
+TELEGRAM_READ_TIMEOUT = float(os.getenv('TELEGRAM_READ_TIMEOUT', 10))
+# Days to keep approved homeworks in the snapshot, 0 keeps them forever
+APPROVED_RETENTION_DAYS = float(os.getenv('APPROVED_RETENTION_DAYS', 30))
+# Seconds a poll stage or the event loop may stall before the watchdog
+# restarts the tenant task (worker process in supervisor mode)
+WATCHDOG_TIMEOUT = float(os.getenv('WATCHDOG_TIMEOUT', 120))
+# Seconds to collect changes of a chat into one pinned summary message,
+# 0 sends a message per change
+DIGEST_WINDOW = float(os.getenv('DIGEST_WINDOW', 0))
+# Optional JSON lines file to record api responses for replay
+CASSETTE_FILE = os.getenv('CASSETTE_FILE')
+# Seconds to finish polls and send queued messages after SIGTERM
+SHUTDOWN_TIMEOUT = float(os.getenv('SHUTDOWN_TIMEOUT', 20))
+# Optional port of metrics endpoint, empty disables it
+METRICS_PORT = os.getenv('METRICS_PORT')
+# Answer /status and /list commands (getUpdates long polling), off by
+# default: the bot token may be shared or have a webhook
+BOT_COMMANDS = os.getenv('BOT_COMMANDS', 'false').lower() in (
+    '1', 'true', 'yes'
+)
+# Settings read again on reload and their types, other settings (bot
+# token, state database, workers, ports) need restart
+RELOADABLE_SETTINGS = {
+    'PRACTICUM_TOKEN': str,
+    'TELEGRAM_CHAT_ID': str,
+    'TENANTS_FILE': str,
+    'RETRY_TIME': int,
+    'MIN_POLL_INTERVAL': int,
+    'MAX_POLL_INTERVAL': int,
+    'REVIEWING_POLL_INTERVAL': int,
+    'POLL_CONCURRENCY': int,
+    'TELEGRAM_GLOBAL_RATE': float,
+    'TELEGRAM_CHAT_RATE': float,
+    'API_CONNECT_TIMEOUT': float,
+    'API_READ_TIMEOUT': float,
+    'API_RETRIES': int,
+    'API_RETRY_BACKOFF': float,
+    'POLL_DEADLINE': float,
+    'APPROVED_RETENTION_DAYS': float,
+}
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 VERDICTS = {
@@ -30,26 +102,24 @@ VERDICTS = {
     'reviewing': 'The homework hase been taken for code review.',
     'rejected': 'The homework has been checked and rejected by the reviewer.'
 }
-
-# Set up logger
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
-# Heroku service handler
-handler = logging.StreamHandler()
-# VPS handler
-extra_handler = RotatingFileHandler(
-    'main.log',
-    maxBytes=50000000,
-    backupCount=5
-)
-formatter = logging.Formatter(
-    '%(asctime)s %(levelname)s %(funcName)s %(lineno)d %(message)s'
+# Statuses of failed requests which are retried
+RETRY_STATUSES = frozenset((
+    HTTPStatus.REQUEST_TIMEOUT, HTTPStatus.TOO_MANY_REQUESTS,
+    HTTPStatus.INTERNAL_SERVER_ERROR, HTTPStatus.BAD_GATEWAY,
+    HTTPStatus.SERVICE_UNAVAILABLE, HTTPStatus.GATEWAY_TIMEOUT
+))
+# Request failures which are retried
+RETRY_FAILURES = (
+    ApiConnectTimeoutException, ApiReadTimeoutException,
+    ApiConnectionException
 )
-handler.setFormatter(formatter)
-extra_handler.setFormatter(formatter)
-handler.setStream(sys.stdout)
-logger.addHandler(handler)
-logger.addHandler(extra_handler)
+RESPONSE_KEYS = ('current_date', 'homeworks')
+HOMEWORK_KEYS = ('homework_name', 'status')
+
+# Set up logger (fixed name, so the engine module shares it when the bot
+# is started as a script). Handlers and listener thread are started on the
+# first record, records are written by the listener thread.
+logger = lazy_logging(logging.getLogger('assistant_bot'))
 
 
 def check_tokens():
@@ -59,16 +129,16 @@ def check_tokens():
     """
     # Prepare validation data and error message
     result = True
-    required_tokens = {
-        'PRACTICUM_TOKEN': PRACTICUM_TOKEN,
-        'TELEGRAM_TOKEN': TELEGRAM_TOKEN,
-        'TELEGRAM_CHAT_ID': TELEGRAM_CHAT_ID
-    }
-    error_message = ('Missing required environment variable {}.')
+    required_tokens = {'TELEGRAM_TOKEN': TELEGRAM_TOKEN}
+    # Single tenant tokens are not required when tenants file is used
+    if not TENANTS_FILE:
+        required_tokens['PRACTICUM_TOKEN'] = PRACTICUM_TOKEN
+        required_tokens['TELEGRAM_CHAT_ID'] = TELEGRAM_CHAT_ID
+    error_message = 'Missing required environment variable %s.'
     # Check tokens
     for key, value in required_tokens.items():
         if not value:
-            logger.critical(error_message.format(repr(key)))
+            logger.critical(error_message, repr(key))
             result = False
     return result
 
@@ -79,25 +149,138 @@ def get_api_answer(current_timestamp):
     Raise exceptions: for any unexpected failure
     or response.status_code != 200.
     """
+    return request_api_answer(current_timestamp, HEADERS)
+
+
+def request_api_answer(current_timestamp, headers, get=None, deadline=None):
+    """Get answer from endpoint with given request headers.
+
+    Shared by single tenant get_api_answer() and polling engine tenants.
+    Raise exceptions: for any unexpected failure
+    or response.status_code != 200.
+    """
+    response = request_api_response(
+        current_timestamp, headers, get, deadline=deadline
+    )
+    # Return api response json data
+    with span('json_decode'):
+        return response.json()
+
+
+def request_api_response(current_timestamp, headers, get=None,
+                         not_modified=False, deadline=None):
+    """Make endpoint request and return response object.
+
+    Timeouts, connection failures and RETRY_STATUSES responses are retried
+    API_RETRIES times with exponential backoff while deadline (monotonic
+    time, POLL_DEADLINE from now by default) allows. Read timeout limits
+    every socket read and is cut to the time left before deadline.
+    Raise exceptions: for any unexpected failure
+    or response.status_code != 200 (or 304 when not_modified is True).
+    """
+    # Imported on first request, heavy dependency tree
+    import requests
+
     # Prepare request data
-    timestamp = current_timestamp or int(time.time())
+    get = get or requests.get
+    timestamp = current_timestamp or int(clocks.now())
     params = {'from_date': timestamp}
-    # Run request
-    try:
-        logger.debug('Start api request.')
-        response = requests.get(ENDPOINT, params=params, headers=HEADERS)
-    except Exception as error:
-        raise ApiEndpointFatalException(
-            f'API reqeust failed with error: {error}. '
-            f'Parameters: {params}.')
-    # Check response status
-    if response.status_code != HTTPStatus.OK:
-        raise ApiEndpointHttpResponseException(
-            f'Endpoint {ENDPOINT} failure. Status code: {response.status_code}'
-            f' Parameters: {params}'
+    if deadline is None:
+        deadline = clocks.monotonic() + POLL_DEADLINE
+    attempt = 0
+    while True:
+        attempt += 1
+        # Run request
+        try:
+            logger.debug('Start api request.')
+            response = get(
+                ENDPOINT, params=params, headers=headers,
+                timeout=request_timeout(deadline, params)
+            )
+        except ApiDeadlineExceededException:
+            raise
+        except Exception as error:
+            failure = map_request_error(error, params)
+            if not isinstance(failure, RETRY_FAILURES):
+                raise failure
+        else:
+            failure = map_response_error(response, params, not_modified)
+            if failure is None:
+                return response
+            if response.status_code not in RETRY_STATUSES:
+                raise failure
+        # Retry while attempts and time are left
+        delay = retry_delay(attempt)
+        if attempt > API_RETRIES or delay >= deadline - clocks.monotonic():
+            raise failure
+        logger.warning(
+            'API request attempt %d failed, retry in %.2f seconds: %s',
+            attempt, delay, failure
         )
-    # Return api response json data
-    return response.json()
+        clocks.sleep(delay)
+
+
+def map_request_error(error, params):
+    """Return api exception of the failed endpoint request.
+
+    Timeouts and connection failures map to RETRY_FAILURES, other errors
+    to ApiEndpointFatalException.
+    """
+    import requests
+
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return ApiConnectTimeoutException(
+            f'API request connect timeout: {error}. Parameters: {params}.'
+        )
+    if isinstance(error, requests.exceptions.Timeout):
+        return ApiReadTimeoutException(
+            f'API request read timeout: {error}. Parameters: {params}.'
+        )
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return ApiConnectionException(
+            f'API request connection failure: {error}. '
+            f'Parameters: {params}.'
+        )
+    return ApiEndpointFatalException(
+        f'API reqeust failed with error: {error}. Parameters: {params}.'
+    )
+
+
+def map_response_error(response, params, not_modified=False):
+    """Return api exception of the failed response status or None.
+
+    Status 200 (or 304 when not_modified is True) is not a failure.
+    """
+    if response.status_code == HTTPStatus.OK or (
+        not_modified and response.status_code == HTTPStatus.NOT_MODIFIED
+    ):
+        return None
+    return ApiEndpointHttpResponseException(
+        f'Endpoint {ENDPOINT} failure. Status code: '
+        f'{response.status_code} Parameters: {params}',
+        response.status_code
+    )
+
+
+def request_timeout(deadline, params=None):
+    """Return (connect, read) timeouts cut to the time left before deadline.
+
+    Raise exception: deadline is over.
+    """
+    remaining = deadline - clocks.monotonic()
+    if remaining <= 0:
+        raise ApiDeadlineExceededException(
+            f'Poll deadline of {POLL_DEADLINE} seconds exceeded. '
+            f'Parameters: {params}.'
+        )
+    return (
+        min(API_CONNECT_TIMEOUT, remaining), min(API_READ_TIMEOUT, remaining)
+    )
+
+
+def retry_delay(attempt):
+    """Return jittered exponential backoff delay before the next attempt."""
+    return API_RETRY_BACKOFF * 2 ** (attempt - 1) * random.uniform(0.5, 1)
 
 
 def check_response(response):
@@ -107,8 +290,6 @@ def check_response(response):
     api response is dict and is not empty,
     api response['homeworks'] is a list.
     """
-    # Prepare valid response keys
-    keys = ['current_date', 'homeworks']
     logger.debug('Start api response check.')
     # Check api response is a dictionary and it is not empty
     if isinstance(response, dict) and len(response) == 0:
@@ -117,7 +298,7 @@ def check_response(response):
     if not isinstance(response, dict):
         raise TypeError('API response is not a dict')
     # Check api response keys
-    for key in keys:
+    for key in RESPONSE_KEYS:
         if key not in response:
             raise KeyError(f'Missing key {key} in api response.')
 
@@ -134,11 +315,10 @@ def parse_status(homework):
     Raise exceptions: if any key is missing or homework status is invalid.
     """
     # Prepare variables
-    keys = ['homework_name', 'status']
     homework_name = homework.get('homework_name')
     homework_status = homework.get('status')
     # Check keys in api response
-    for key in keys:
+    for key in HOMEWORK_KEYS:
         if key not in homework:
             raise KeyError(
                 f'Missing {repr(key)} key in api response.'
@@ -149,21 +329,204 @@ def parse_status(homework):
             f'Incorrect home work status: {homework_status}.'
         )
     # Prepare and return status message
+    return format_status(homework_name, homework_status)
+
+
+def format_status(homework_name, homework_status):
+    """Return status message of valid homework name and status."""
     verdict = VERDICTS.get(homework_status)
     return f'Изменился статус проверки работы "{homework_name}". {verdict}'
 
 
+def format_comment(homework_name, reviewer_comment):
+    """Return message of updated reviewer comment."""
+    return (
+        f'Обновлен комментарий ревьюера к работе "{homework_name}": '
+        f'{reviewer_comment}'
+    )
+
+
 def send_message(bot, message):
     """Send telegram message.
 
+    Raise exception for any unexpected error.
+    """
+    send_chat_message(bot, TELEGRAM_CHAT_ID, message)
+
+
+def send_chat_message(bot, chat_id, message):
+    """Send telegram message to the given chat.
+
     Raise exception for any unexpected error.
     """
     try:
         logger.debug('Send telegram message.')
-        bot.send_message(TELEGRAM_CHAT_ID, message)
-        logger.info(f'Message sent to telegram: {message}.')
+        with SEND_MESSAGE_SECONDS.time(), span('send_message'):
+            bot.send_message(chat_id, message)
+        logger.info('Message sent to telegram: %s.', message)
     except Exception as error:
-        raise TelegramSendMessageException(f'Telegram message error: {error}.')
+        raise TelegramSendMessageException(
+            f'Telegram message error: {error}.'
+        ) from error
+
+
+def check_settings(settings):
+    """Check values of reloadable settings together.
+
+    Raise ValueError: settings are invalid or inconsistent.
+    """
+    if not 0 < settings['MIN_POLL_INTERVAL'] <= settings['MAX_POLL_INTERVAL']:
+        raise ValueError(
+            'Invalid poll interval bounds: '
+            f'{settings["MIN_POLL_INTERVAL"]}, '
+            f'{settings["MAX_POLL_INTERVAL"]}.'
+        )
+    positive = (
+        'RETRY_TIME', 'REVIEWING_POLL_INTERVAL', 'POLL_CONCURRENCY',
+        'TELEGRAM_GLOBAL_RATE', 'TELEGRAM_CHAT_RATE', 'API_CONNECT_TIMEOUT',
+        'API_READ_TIMEOUT', 'POLL_DEADLINE'
+    )
+    for name in positive:
+        if settings[name] <= 0:
+            raise ValueError(f'{name} should be positive: {settings[name]}.')
+    not_negative = (
+        'API_RETRIES', 'API_RETRY_BACKOFF', 'APPROVED_RETENTION_DAYS'
+    )
+    for name in not_negative:
+        if settings[name] < 0:
+            raise ValueError(
+                f'{name} should not be negative: {settings[name]}.'
+            )
+
+
+def reload_settings():
+    """Read .env file and environment into RELOADABLE_SETTINGS again.
+
+    Values of .env file replace values loaded from it on start, process
+    environment values are kept as on start, environment is not changed.
+    Return dict of changed setting names to new values. Raise exception:
+    invalid or inconsistent values, no setting is changed then.
+    """
+    global HEADERS
+
+    file_values = dotenv_values(ENV_FILE) if ENV_FILE else {}
+    values = {}
+    for name, convert in RELOADABLE_SETTINGS.items():
+        value = None
+        if name not in ENVIRONMENT_NAMES:
+            value = file_values.get(name)
+        if value is None:
+            value = os.getenv(name)
+        if value is not None:
+            values[name] = convert(value)
+    changed = {
+        name: value for name, value in values.items()
+        if value != globals()[name]
+    }
+    check_settings({
+        name: changed.get(name, globals()[name])
+        for name in RELOADABLE_SETTINGS
+    })
+    globals().update(changed)
+    if 'PRACTICUM_TOKEN' in changed:
+        HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+    return changed
+
+
+def load_bot_tenants():
+    """Return tenants from TENANTS_FILE or the single tenant from tokens."""
+    from engine import Tenant, load_tenants
+
+    if TENANTS_FILE:
+        return load_tenants(TENANTS_FILE)
+    return [Tenant('default', PRACTICUM_TOKEN, TELEGRAM_CHAT_ID)]
+
+
+def run_bot(tenants, make_services=None, metrics_port=METRICS_PORT,
+            load_tenants=load_bot_tenants):
+    """Run polling engine of the tenants until it is stopped.
+
+    make_services(bot, index, dispatcher) returns engine services,
+    by default bot commands handler when BOT_COMMANDS is enabled.
+    Config reload calls load_tenants() and updates the tenants list.
+    """
+    # Imported here: engine module imports this module, runtime modules
+    # are not needed by importers of the api functions
+    import asyncio
+
+    import profiler
+    import tracing
+    from dispatcher import Dispatcher
+    from breaker import BreakerRegistry
+    from cache import ResponseCache
+    from commands import CommandHandler, SnapshotIndex
+    from digest import DigestService
+    from engine import PollingEngine
+    from health import Watchdog
+    from metrics import start_http_server
+    from outbox import Outbox
+    from reloader import ConfigReloader
+    from scheduler import AdaptiveScheduler
+    from storage import SQLiteStateStore
+    from transport import Transport, TelegramClient
+
+    # Spans export (TRACE_FILE) and profile windows (SIGUSR2)
+    tracing.configure()
+    profiler.install()
+    # Prepare shared http transport, telegram bot and engine
+    transport = Transport(default_pool_size=POLL_CONCURRENCY)
+    bot = TelegramClient(
+        TELEGRAM_TOKEN, transport,
+        timeout=(TELEGRAM_CONNECT_TIMEOUT, TELEGRAM_READ_TIMEOUT)
+    )
+    store = SQLiteStateStore(STATE_DB)
+    scheduler = AdaptiveScheduler(
+        RETRY_TIME, MIN_POLL_INTERVAL, MAX_POLL_INTERVAL,
+        REVIEWING_POLL_INTERVAL
+    )
+    dispatcher = Dispatcher(bot, TELEGRAM_GLOBAL_RATE, TELEGRAM_CHAT_RATE)
+    recorder = None
+    if CASSETTE_FILE:
+        from cassettes import CassetteRecorder
+
+        recorder = CassetteRecorder(CASSETTE_FILE, tenants, transport.get)
+    index = SnapshotIndex(tenants)
+    if make_services is not None:
+        services = make_services(bot, index, dispatcher)
+    elif BOT_COMMANDS:
+        services = [CommandHandler(bot, index, dispatcher.submit)]
+    else:
+        services = []
+    engine = PollingEngine(
+        tenants, bot, transport=transport, store=store, scheduler=scheduler,
+        dispatcher=dispatcher, cache=ResponseCache(),
+        breakers=BreakerRegistry(), services=services,
+        concurrency=POLL_CONCURRENCY,
+        retention=APPROVED_RETENTION_DAYS * 24 * 3600,
+        get=recorder.get if recorder else None, watchdog=Watchdog(),
+        digest=DigestService(bot, index, store) if DIGEST_WINDOW else None,
+        outbox=Outbox(store, dispatcher, tenants), index=index
+    )
+
+    def sync_tenants(reloaded):
+        # Services read the same list
+        tenants[:] = reloaded
+        if recorder is not None:
+            recorder.rebuild()
+
+    engine.services.append(ConfigReloader(
+        engine, load_tenants, index, dispatcher, on_reload=sync_tenants
+    ))
+    if metrics_port:
+        start_http_server(int(metrics_port), health=engine.watchdog.health)
+        logger.info('Metrics endpoint started on port %s.', metrics_port)
+    try:
+        asyncio.run(engine.run(handle_signals=True))
+    finally:
+        transport.close()
+        store.close()
+        if recorder is not None:
+            recorder.close()
 
 
 def main():
@@ -175,53 +538,18 @@ def main():
         logger.critical('Interrupt main() function.')
         sys.exit('Missing required tokens. Update .env file.')
 
-    # Prepare telegram bot and other variables
-    raised_exceptions = []
-    status_tracking = {}
-    bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    current_timestamp = int(time.time())
+    # Shard tenants between worker processes
+    if WORKERS > 1:
+        from supervisor import Supervisor
 
-    while True:
-        try:
-            # Make api request and check response
-            logger.debug('Start api task.')
-            response = get_api_answer(current_timestamp)
-            homeworks = check_response(response)
-            # Check updates
-            logger.debug('Check status updates.')
-            for homework in homeworks:
-                hw_name = homework.get('homework_name')
-                hw_status = homework.get('status')
-                if hw_name not in status_tracking:
-                    status_tracking[hw_name] = hw_status
-                    message = parse_status(homework)
-                    send_message(bot, message)
-                elif status_tracking[hw_name] != hw_status:
-                    status_tracking[hw_name] = hw_status
-                    message = parse_status(homework)
-                    send_message(bot, message)
-                else:
-                    logger.DEBUG(f'No new status in api response {message}')
-            current_timestamp = response.get('current_date')
-        except TelegramSendMessageException as error:
-            logger.error(f'Proram failure: {error}')
-            logger.debug('End api task with errors.')
-        except Exception as error:
-            # Log Exception error
-            message = f'Program failure: {error}'
-            logging.error(error, exc_info=True)
-            # Remember exception error and send message to telegram
-            if error not in raised_exceptions:
-                send_message(bot, message)
-                raised_exceptions.append(error)
-            logger.debug('End api task with errors.')
-        else:
-            logger.debug('End api task successfully.')
-        finally:
-            # Suspend for RETRY_TIME seconds
-            logger.debug(f'Suspend for {RETRY_TIME} seconds.')
-            time.sleep(RETRY_TIME)
+        Supervisor(WORKERS).run(handle_signals=True)
+        return
+    run_bot(load_bot_tenants())
 
 
 if __name__ == '__main__':
-    main()
+    # Script runs main() of the imported module: config reload changes
+    # settings of assistant_bot module, not of this __main__ copy
+    import assistant_bot
+
+    assistant_bot.main()
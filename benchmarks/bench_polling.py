@@ -0,0 +1,156 @@
+"""Measure polling engine throughput against local stub servers.
+
+Usage: python -m benchmarks.bench_polling --tenants 100 --cycles 5
+
+Result of every run is appended as a JSON line to the output file.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import resource
+
+from benchmarks.stubs import StubConfig, StubServers
+
+
+def percentile(values, share):
+    """Return value at the share (0..1) of sorted values."""
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(int(len(values) * share), len(values) - 1)
+    return values[index]
+
+
+def current_rss_mb():
+    """Return resident memory of the process in megabytes."""
+    try:
+        with open('/proc/self/statm') as file:
+            pages = int(file.read().split()[1])
+        return pages * resource.getpagesize() / 2 ** 20
+    except OSError:
+        # Peak value is the best available outside Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2 ** 10
+
+
+async def drain(dispatcher, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        stats = dispatcher.stats()
+        if not stats['queue_depth'] and not stats['in_flight']:
+            break
+        await asyncio.sleep(0.01)
+
+
+def measure(stubs, tenants, cycles, concurrency):
+    """Poll stub servers with the engine and return raw measurements."""
+    from dispatcher import Dispatcher
+    from engine import PollingEngine, Tenant
+    from transport import TelegramClient, Transport
+
+    transport = Transport(default_pool_size=concurrency)
+    bot = TelegramClient('0:bench', transport, api_url=stubs.telegram_url)
+    # Rate limits are not measured here
+    dispatcher = Dispatcher(
+        bot, global_rate=10 ** 6, chat_rate=10 ** 6, workers=concurrency
+    )
+    engine = PollingEngine(
+        [Tenant(f'tenant{number}', f'token{number}', number)
+         for number in range(tenants)],
+        bot, transport=transport, dispatcher=dispatcher,
+        concurrency=concurrency
+    )
+
+    async def poll():
+        dispatcher.start()
+        for _ in range(cycles):
+            await engine.run_cycle()
+        await drain(dispatcher, timeout=60)
+        await dispatcher.stop()
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    asyncio.run(poll())
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    stub_stats = transport.get(stubs.telegram_url + '/stats').json()
+    connections = transport.stats()
+    transport.close()
+    return elapsed, cpu, stub_stats, connections
+
+
+def run(tenants=10, cycles=3, concurrency=10, homeworks=10, latency=0.0,
+        error_rate=0.0, change_rate=0.1, label=''):
+    """Run the benchmark and return result dict."""
+    import assistant_bot
+
+    config = StubConfig(latency, error_rate, homeworks, change_rate)
+    endpoint = assistant_bot.ENDPOINT
+    with StubServers(config) as stubs:
+        assistant_bot.ENDPOINT = stubs.practicum_url
+        try:
+            elapsed, cpu, stub_stats, connections = measure(
+                stubs, tenants, cycles, concurrency
+            )
+        finally:
+            assistant_bot.ENDPOINT = endpoint
+    latencies = stub_stats['latencies']
+    polls = tenants * cycles
+    return {
+        'label': label,
+        'time': int(time.time()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': {
+            'tenants': tenants, 'cycles': cycles, 'concurrency': concurrency,
+            'homeworks': homeworks, 'latency': latency,
+            'error_rate': error_rate, 'change_rate': change_rate,
+        },
+        'polls': polls,
+        'elapsed_seconds': elapsed,
+        'polls_per_second': polls / elapsed if elapsed else None,
+        'api_requests': stub_stats['api_requests'],
+        'notifications': len(latencies),
+        'notification_latency': {
+            'p50': percentile(latencies, 0.5),
+            'p95': percentile(latencies, 0.95),
+            'p99': percentile(latencies, 0.99),
+            'max': max(latencies) if latencies else None,
+        },
+        'cpu_seconds': cpu,
+        'cpu_percent': 100 * cpu / elapsed if elapsed else None,
+        'rss_mb': current_rss_mb(),
+        'connections': connections,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tenants', type=int, default=100)
+    parser.add_argument('--cycles', type=int, default=5)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--homeworks', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--change-rate', type=float, default=0.1)
+    parser.add_argument('--label', default='')
+    parser.add_argument('--output', default='bench_results.jsonl')
+    args = parser.parse_args(argv)
+    # Keep bot logs out of the measurements
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ.setdefault('LOG_FILE', '')
+    result = run(
+        args.tenants, args.cycles, args.concurrency, args.homeworks,
+        args.latency, args.error_rate, args.change_rate, args.label
+    )
+    with open(args.output, 'a', encoding='utf-8') as file:
+        file.write(json.dumps(result) + '\n')
+    json.dump(result, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Measure bot import time and first poll latency in fresh processes.
+
+Usage: python -m benchmarks.bench_startup --runs 5
+
+Result of every run is appended as a JSON line to the output file.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+
+from benchmarks.stubs import StubConfig, StubServers
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def child(practicum_url, telegram_url):
+    """Import the bot, poll one tenant and print timings as JSON."""
+    start = time.perf_counter()
+    import assistant_bot
+    imported = time.perf_counter()
+
+    import asyncio
+    from engine import PollingEngine, Tenant
+    from transport import TelegramClient, Transport
+
+    assistant_bot.ENDPOINT = practicum_url
+    transport = Transport()
+    bot = TelegramClient('0:bench', transport, api_url=telegram_url)
+    engine = PollingEngine([Tenant('tenant', 'token', 1)], bot, transport)
+    asyncio.run(engine.run_cycle())
+    polled = time.perf_counter()
+    print(json.dumps({
+        'import_seconds': imported - start,
+        'first_poll_seconds': polled - start,
+        'modules': len(sys.modules),
+    }))
+
+
+def run(runs=5, label=''):
+    """Start fresh bot processes and return result dict."""
+    env = dict(os.environ, LOG_LEVEL='WARNING', LOG_FILE='')
+    samples = []
+    with StubServers(StubConfig(homeworks=5, change_rate=0)) as stubs:
+        for _ in range(runs):
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_startup', '--child',
+                 stubs.practicum_url, stubs.telegram_url],
+                cwd=ROOT_DIR, env=env, check=True, capture_output=True,
+                text=True
+            ).stdout
+            samples.append(json.loads(output.strip().splitlines()[-1]))
+    imports = [sample['import_seconds'] for sample in samples]
+    polls = [sample['first_poll_seconds'] for sample in samples]
+    return {
+        'label': label,
+        'time': int(time.time()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'runs': runs,
+        'import_seconds': {
+            'median': statistics.median(imports), 'max': max(imports)
+        },
+        'first_poll_seconds': {
+            'median': statistics.median(polls), 'max': max(polls)
+        },
+        'modules_after_import': samples[-1]['modules'],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--label', default='')
+    parser.add_argument('--output', default='bench_results.jsonl')
+    parser.add_argument('--child', nargs=2, metavar='URL',
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        child(*args.child)
+        return
+    result = run(args.runs, args.label)
+    with open(args.output, 'a', encoding='utf-8') as file:
+        file.write(json.dumps(result) + '\n')
+    json.dump(result, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
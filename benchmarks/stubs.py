@@ -0,0 +1,193 @@
+"""Local stand-ins of Practicum homework_statuses and Telegram Bot APIs."""
+import json
+import time
+import random
+import threading
+import multiprocessing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+VERDICT_STATUSES = ('reviewing', 'approved', 'rejected')
+
+
+class StubConfig:
+    """Behaviour of stub servers.
+
+    latency: seconds added to every response, error_rate: share of
+    Practicum responses with status 500, homeworks: homework list size,
+    change_rate: chance a homework changes status on a request.
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, homeworks=10,
+                 change_rate=0.1, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.homeworks = homeworks
+        self.change_rate = change_rate
+        self.seed = seed
+
+
+class StubState:
+    """Homework statuses and notification latencies shared by stubs."""
+
+    def __init__(self, config):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.lock = threading.Lock()
+        # token -> list of statuses
+        self.statuses = {}
+        # homework name -> time of last status change
+        self.changed_at = {}
+        self.latencies = []
+        self.api_requests = 0
+        self.telegram_requests = 0
+
+    def homeworks(self, token):
+        """Return homework list of the token, some statuses changed."""
+        now = time.time()
+        with self.lock:
+            self.api_requests += 1
+            statuses = self.statuses.get(token)
+            if statuses is None:
+                statuses = self.statuses[token] = [
+                    'reviewing'
+                ] * self.config.homeworks
+                for number in range(self.config.homeworks):
+                    self.changed_at[f'{token}-hw{number}'] = now
+            for number, status in enumerate(statuses):
+                if self.random.random() < self.config.change_rate:
+                    statuses[number] = self.random.choice(
+                        [item for item in VERDICT_STATUSES if item != status]
+                    )
+                    self.changed_at[f'{token}-hw{number}'] = now
+            return [
+                {
+                    'id': number,
+                    'homework_name': f'{token}-hw{number}',
+                    'status': status,
+                    'reviewer_comment': 'Stub comment.',
+                    'date_updated': '2020-02-13T14:40:57Z',
+                    'lesson_name': 'Stub lesson',
+                }
+                for number, status in enumerate(statuses)
+            ]
+
+    def notified(self, text):
+        """Record latency of notification about homework in the text."""
+        now = time.time()
+        parts = text.split('"')
+        with self.lock:
+            self.telegram_requests += 1
+            if len(parts) >= 3 and parts[1] in self.changed_at:
+                self.latencies.append(now - self.changed_at[parts[1]])
+
+    def stats(self):
+        with self.lock:
+            return {
+                'api_requests': self.api_requests,
+                'telegram_requests': self.telegram_requests,
+                'latencies': list(self.latencies),
+            }
+
+
+def make_handlers(state):
+    """Return Practicum and Telegram request handler classes."""
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def reply(self, status, data):
+            body = json.dumps(data).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    class PracticumHandler(StubHandler):
+
+        def do_GET(self):
+            time.sleep(state.config.latency)
+            if state.random.random() < state.config.error_rate:
+                self.reply(500, {'error': 'Stub failure.'})
+                return
+            token = self.headers.get('Authorization', '')[len('OAuth '):]
+            self.reply(200, {
+                'homeworks': state.homeworks(token),
+                'current_date': int(time.time()),
+            })
+
+    class TelegramHandler(StubHandler):
+
+        def do_GET(self):
+            if urlsplit(self.path).path == '/stats':
+                self.reply(200, state.stats())
+            else:
+                self.reply(404, {'ok': False, 'description': 'Not Found'})
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            params = json.loads(self.rfile.read(length) or b'{}')
+            time.sleep(state.config.latency)
+            state.notified(params.get('text', ''))
+            self.reply(200, {'ok': True, 'result': {'message_id': 1}})
+
+    return PracticumHandler, TelegramHandler
+
+
+def serve(config, connection):
+    """Run both stub servers and send their ports to the connection."""
+    state = StubState(config)
+    practicum_handler, telegram_handler = make_handlers(state)
+    servers = [
+        ThreadingHTTPServer(('127.0.0.1', 0), practicum_handler),
+        ThreadingHTTPServer(('127.0.0.1', 0), telegram_handler),
+    ]
+    for server in servers:
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    connection.send([server.server_address[1] for server in servers])
+    # Block until parent asks to stop
+    connection.recv()
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+class StubServers:
+    """Stub servers running in a child process.
+
+    Child process keeps stub CPU and memory out of the bot measurements.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self._connection = None
+        self._process = None
+        self.practicum_url = None
+        self.telegram_url = None
+
+    def start(self):
+        parent, child = multiprocessing.Pipe()
+        self._connection = parent
+        self._process = multiprocessing.Process(
+            target=serve, args=(self.config, child), daemon=True
+        )
+        self._process.start()
+        practicum_port, telegram_port = parent.recv()
+        self.practicum_url = f'http://127.0.0.1:{practicum_port}/'
+        self.telegram_url = f'http://127.0.0.1:{telegram_port}'
+        return self
+
+    def stop(self):
+        self._connection.send('stop')
+        self._process.join(5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
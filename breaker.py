@@ -0,0 +1,140 @@
+import time
+import threading
+from collections import deque
+from urllib.parse import urlsplit
+
+from assistant_bot import logger
+from exceptions import ApiCircuitOpenException, ApiEndpointFatalException
+from exceptions import ApiEndpointHttpResponseException
+from metrics import CIRCUIT_STATE, CIRCUIT_TRANSITIONS
+
+CLOSED = 'closed'
+HALF_OPEN = 'half_open'
+OPEN = 'open'
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def is_endpoint_failure(error):
+    """Check error means endpoint is unavailable (network or 5xx)."""
+    if isinstance(error, ApiEndpointFatalException):
+        return True
+    if isinstance(error, ApiEndpointHttpResponseException):
+        return error.status_code is None or error.status_code >= 500
+    return False
+
+
+class CircuitBreaker:
+    """Circuit breaker of an api host.
+
+    Breaker opens when failure rate of the last window calls reaches
+    failure_rate (after at least min_calls calls). Open breaker rejects
+    calls for open_time seconds, then lets a single probe call through
+    (half-open). Successful probe closes the breaker, failed one opens it.
+    """
+
+    def __init__(self, host, window=20, min_calls=5, failure_rate=0.5,
+                 open_time=60, clock=time.monotonic):
+        self.host = host
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_time = open_time
+        self._clock = clock
+        self._results = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._opened_at = 0.0
+        self._probing = False
+        self.state = CLOSED
+        CIRCUIT_STATE.set(STATE_VALUES[CLOSED], labels=(host,))
+
+    def call(self, function, *args, **kwargs):
+        """Call function through the breaker and return its result.
+
+        Raise exceptions: breaker is open or function raised.
+        """
+        self._before_call()
+        try:
+            result = function(*args, **kwargs)
+        except Exception as error:
+            self._after_call(not is_endpoint_failure(error))
+            raise
+        self._after_call(True)
+        return result
+
+    def _before_call(self):
+        with self._lock:
+            if self.state == OPEN:
+                if self._clock() - self._opened_at < self.open_time:
+                    raise ApiCircuitOpenException(
+                        f'Circuit of {self.host} is open.'
+                    )
+                self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._probing:
+                    raise ApiCircuitOpenException(
+                        f'Circuit of {self.host} is half-open, probe is '
+                        f'in progress.'
+                    )
+                self._probing = True
+
+    def _after_call(self, success):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+                if success:
+                    self._results.clear()
+                    self._set_state(CLOSED)
+                else:
+                    self._open()
+                return
+            self._results.append(success)
+            if len(self._results) < self.min_calls:
+                return
+            failures = self._results.count(False)
+            if failures / len(self._results) >= self.failure_rate:
+                self._open()
+
+    def _open(self):
+        self._opened_at = self._clock()
+        self._results.clear()
+        self._set_state(OPEN)
+
+    def _set_state(self, state):
+        if state == self.state:
+            return
+        logger.warning(
+            'Circuit breaker of %s: %s -> %s.', self.host, self.state, state
+        )
+        self.state = state
+        CIRCUIT_STATE.set(STATE_VALUES[state], labels=(self.host,))
+        CIRCUIT_TRANSITIONS.inc(labels=(self.host, state))
+
+
+class BreakerRegistry:
+    """Circuit breakers shared by every tenant using the same host."""
+
+    def __init__(self, **options):
+        self.options = options
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, host):
+        """Return breaker of the host."""
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(host)
+                if breaker is None:
+                    breaker = CircuitBreaker(host, **self.options)
+                    self._breakers[host] = breaker
+        return breaker
+
+    def for_url(self, url):
+        """Return breaker of the url host."""
+        return self.get(urlsplit(url).netloc)
+
+    def states(self):
+        """Return dict of host to breaker state."""
+        return {
+            host: breaker.state for host, breaker in self._breakers.items()
+        }
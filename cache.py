@@ -0,0 +1,158 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from http import HTTPStatus
+
+from assistant_bot import request_api_response
+from metrics import Counter
+from tracing import span
+
+CACHE_REQUESTS = Counter(
+    'bot_response_cache_requests', 'Response cache lookups by result.',
+    ('result',)
+)
+CACHE_SAVED_BYTES = Counter(
+    'bot_response_cache_saved_bytes',
+    'Response bytes not downloaded (not_modified) or not decoded (hash).',
+    ('reason',)
+)
+CURRENT_DATE_KEY = b'"current_date"'
+NUMBER_BYTES = frozenset(b' \t\r\n-+.0123456789eE')
+
+
+def payload_digest(body):
+    """Return hash of response body without `current_date` value.
+
+    Server time changes on every request, everything else is compared.
+    """
+    start = body.find(CURRENT_DATE_KEY)
+    if start != -1:
+        colon = body.find(b':', start + len(CURRENT_DATE_KEY))
+        if colon != -1:
+            end = colon + 1
+            while end < len(body) and body[end] in NUMBER_BYTES:
+                end += 1
+            body = body[:colon + 1] + body[end:]
+    return hashlib.blake2b(body, digest_size=16).digest()
+
+
+class CacheEntry:
+    """Validators and content hash of the last tenant response."""
+
+    __slots__ = ('from_date', 'etag', 'last_modified', 'digest', 'size')
+
+    def __init__(self, from_date, etag, last_modified, digest, size):
+        self.from_date = from_date
+        self.etag = etag
+        self.last_modified = last_modified
+        self.digest = digest
+        self.size = size
+
+
+class ResponseCache:
+    """Cache of homework_statuses responses keyed by token and from_date.
+
+    Requests with the same from_date as the cached response are sent with
+    If-None-Match and If-Modified-Since headers. Payloads equal to the
+    cached one (compared by content hash) are not decoded, their from_date
+    is kept, so the next request can be answered with 304 Not Modified.
+    Compressed transfer encodings are accepted by the requests library.
+    """
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.bytes_not_downloaded = 0
+        self.bytes_not_decoded = 0
+
+    def fetch(self, key, from_date, headers, get=None, deadline=None):
+        """Request endpoint and return tuple of from_date and json data.
+
+        Data is None when payload has not changed since the last request
+        of the key (tenant token), from_date is not advanced then. New
+        payload is cached right away.
+        """
+        from_date, data, entry = self.request(
+            key, from_date, headers, get, deadline
+        )
+        if entry is not None:
+            self.store(key, entry)
+        return from_date, data
+
+    def request(self, key, from_date, headers, get=None, deadline=None):
+        """Request endpoint, return from_date, json data and cache entry.
+
+        Entry of a new payload is not cached: caller stores it when the
+        payload is processed, so payload of a failed poll is decoded again.
+        Entry is None when payload has not changed.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        request_headers = headers
+        if entry is not None and entry.from_date == from_date:
+            request_headers = dict(headers)
+            if entry.etag:
+                request_headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                request_headers['If-Modified-Since'] = entry.last_modified
+        response = request_api_response(
+            from_date, request_headers, get, not_modified=True,
+            deadline=deadline
+        )
+        if response.status_code == HTTPStatus.NOT_MODIFIED:
+            self._hit('not_modified', entry.size)
+            return from_date, None, None
+        body = response.content
+        digest = payload_digest(body)
+        if entry is not None and entry.digest == digest:
+            self._hit('hash', len(body))
+            entry.etag = response.headers.get('ETag')
+            entry.last_modified = response.headers.get('Last-Modified')
+            entry.from_date = from_date
+            return from_date, None, None
+        self.misses += 1
+        CACHE_REQUESTS.inc(labels=('miss',))
+        with span('json_decode', bytes=len(body)):
+            data = response.json()
+        return from_date, data, CacheEntry(
+            from_date, response.headers.get('ETag'),
+            response.headers.get('Last-Modified'), digest, len(body)
+        )
+
+    def _hit(self, reason, size):
+        self.hits += 1
+        CACHE_REQUESTS.inc(labels=('hit',))
+        CACHE_SAVED_BYTES.inc(size, labels=(reason,))
+        if reason == 'not_modified':
+            self.not_modified += 1
+            self.bytes_not_downloaded += size
+        else:
+            self.bytes_not_decoded += size
+
+    def store(self, key, entry):
+        """Cache entry of the processed payload of the key."""
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def forget(self, key):
+        """Drop cached entry of the key."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self):
+        """Return hit, miss and saved bytes counters."""
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'not_modified': self.not_modified,
+            'bytes_not_downloaded': self.bytes_not_downloaded,
+            'bytes_not_decoded': self.bytes_not_decoded,
+        }
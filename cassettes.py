@@ -0,0 +1,245 @@
+import json
+import time
+import argparse
+import threading
+from collections import deque
+
+import clocks
+from assistant_bot import logger
+
+# Response headers read by the response cache
+RECORDED_HEADERS = ('ETag', 'Last-Modified')
+
+
+def load_cassette(path):
+    """Return list of records of the cassette file."""
+    with open(path, encoding='utf-8') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def tenant_names(tenants):
+    """Return dict of tenant `Authorization` header to tenant name."""
+    return {
+        tenant.headers['Authorization']: tenant.name for tenant in tenants
+    }
+
+
+class CassetteRecorder:
+    """Record endpoint responses of tenants to a JSON lines cassette.
+
+    get() wraps the get function of the engine. Record keeps tenant name,
+    request time and from_date, response status, cache headers and body,
+    or the request exception class. Tokens are not recorded. Tenant names
+    are found in tenants list kept up to date by the owner, rebuild() is
+    called on its reload.
+    """
+
+    def __init__(self, path, tenants, get=None):
+        self.path = path
+        self.tenants = tenants
+        self._names = tenant_names(tenants)
+        self._get = get
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def get(self, url, params=None, headers=None, **kwargs):
+        get = self._get
+        if get is None:
+            # Imported on first request, heavy dependency tree
+            import requests
+
+            get = requests.get
+        record = {
+            'time': clocks.now(),
+            'tenant': self.tenant_name((headers or {}).get('Authorization')),
+            'from_date': (params or {}).get('from_date'),
+        }
+        try:
+            response = get(url, params=params, headers=headers, **kwargs)
+        except Exception as error:
+            record['error'] = type(error).__name__
+            record['message'] = str(error)
+            self.write(record)
+            raise
+        record['status'] = response.status_code
+        record['headers'] = {
+            name: response.headers[name] for name in RECORDED_HEADERS
+            if name in response.headers
+        }
+        record['body'] = response.content.decode('utf-8', 'replace')
+        self.write(record)
+        return response
+
+    def rebuild(self):
+        """Map tenant names by `Authorization` header of tenants again."""
+        self._names = tenant_names(self.tenants)
+
+    def tenant_name(self, authorization):
+        """Return tenant name of the `Authorization` header or None."""
+        name = self._names.get(authorization)
+        if name is None:
+            # Tenant added or token changed by reload
+            self.rebuild()
+            name = self._names.get(authorization)
+        return name
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class RecordedResponse:
+    """Endpoint response restored from a cassette record."""
+
+    def __init__(self, status_code, headers, body):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = body.encode('utf-8')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class CassettePlayer:
+    """Return recorded responses of every tenant in the recorded order.
+
+    Recorded request exceptions are raised again, requests exceptions by
+    the same class.
+    """
+
+    def __init__(self, records, tenants):
+        self._names = tenant_names(tenants)
+        self._records = {}
+        for record in records:
+            self._records.setdefault(record['tenant'], deque()).append(record)
+
+    def __len__(self):
+        return sum(len(records) for records in self._records.values())
+
+    def next_request(self):
+        """Return (time, tenant name) of the earliest record left or None."""
+        return min(
+            ((records[0]['time'], name)
+             for name, records in self._records.items() if records),
+            default=None
+        )
+
+    def skip(self, name):
+        """Drop the earliest record left of the tenant."""
+        self._records[name].popleft()
+
+    def get(self, url, params=None, headers=None, **kwargs):
+        name = self._names.get((headers or {}).get('Authorization'))
+        records = self._records.get(name)
+        if not records:
+            raise LookupError(f'No recorded responses of tenant {name}.')
+        record = records.popleft()
+        if 'error' in record:
+            # Imported on first request, heavy dependency tree
+            import requests
+
+            error_class = getattr(
+                requests.exceptions, record['error'], RuntimeError
+            )
+            raise error_class(record['message'])
+        return RecordedResponse(
+            record['status'], record['headers'], record['body']
+        )
+
+
+class ReplayBot:
+    """Telegram bot keeping sent messages with virtual send time."""
+
+    def __init__(self):
+        self.messages = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.messages.append((clocks.now(), chat_id, text))
+
+
+def replay(records, bot=None):
+    """Poll tenants of cassette records at recorded times on virtual clock.
+
+    Every poll runs response check, status parsing and message sending of
+    the polling engine, recorded retries are made within the poll. Circuit
+    breaker is not used: recorded requests are the ones made after breaker
+    checks. Record of a poll which made no request is skipped. Return the
+    bot, tenants chat ids are their names.
+    """
+    from cache import ResponseCache
+    from engine import PollingEngine, Tenant
+    from suppression import ErrorSuppressor
+
+    bot = bot or ReplayBot()
+    tenants = {}
+    for record in records:
+        if record['tenant'] not in tenants:
+            tenants[record['tenant']] = Tenant(
+                record['tenant'], f'replay-{record["tenant"]}',
+                record['tenant'], current_timestamp=record['from_date']
+            )
+    player = CassettePlayer(records, tenants.values())
+    clock = clocks.VirtualClock(records[0]['time'] if records else 0)
+    engine = PollingEngine(
+        tenants.values(), bot, cache=ResponseCache(),
+        suppressor=ErrorSuppressor(clock=clock.monotonic),
+        get=player.get, concurrency=1
+    )
+    previous = clocks.set_clock(clock)
+    try:
+        while True:
+            request = player.next_request()
+            if request is None:
+                break
+            request_time, name = request
+            clock.set(request_time)
+            left = len(player)
+            engine.poll_tenant(tenants[name])
+            if len(player) == left:
+                logger.warning(
+                    'Poll of %s at %s made no request, record is skipped.',
+                    name, request_time
+                )
+                player.skip(name)
+    finally:
+        clocks.set_clock(previous)
+    return bot
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Replay recorded endpoint responses on virtual clock.'
+    )
+    parser.add_argument('cassette')
+    parser.add_argument(
+        '--output', help='JSON lines file of sent messages'
+    )
+    args = parser.parse_args(argv)
+    records = load_cassette(args.cassette)
+    started = time.perf_counter()
+    bot = replay(records)
+    elapsed = time.perf_counter() - started
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            for sent, chat_id, text in bot.messages:
+                file.write(json.dumps(
+                    {'time': sent, 'chat_id': chat_id, 'text': text},
+                    ensure_ascii=False
+                ) + '\n')
+    recorded = records[-1]['time'] - records[0]['time'] if records else 0
+    logger.info(
+        'Replayed %d responses of %.0f seconds in %.2f seconds, '
+        '%d messages sent.', len(records), recorded, elapsed,
+        len(bot.messages)
+    )
+    return bot
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+import time
+import threading
+
+
+class SystemClock:
+    """Wall and monotonic time of the system."""
+
+    def now(self):
+        """Return unix time in seconds."""
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class VirtualClock:
+    """Clock moved forward by sleeps and the owner, never by itself.
+
+    Wall and monotonic time are the same value, sleep returns at once.
+    """
+
+    def __init__(self, start=0.0):
+        self._now = start
+        self._lock = threading.Lock()
+
+    def now(self):
+        """Return unix time in seconds."""
+        return self._now
+
+    def monotonic(self):
+        return self._now
+
+    def sleep(self, seconds):
+        self.advance(seconds)
+
+    def advance(self, seconds):
+        """Move clock forward by seconds."""
+        with self._lock:
+            self._now += max(seconds, 0)
+
+    def set(self, now):
+        """Move clock forward to unix time, earlier time is ignored."""
+        with self._lock:
+            self._now = max(self._now, now)
+
+
+CLOCK = SystemClock()
+
+
+def now():
+    """Return unix time of the global clock."""
+    return CLOCK.now()
+
+
+def monotonic():
+    """Return monotonic time of the global clock."""
+    return CLOCK.monotonic()
+
+
+def sleep(seconds):
+    """Sleep for seconds of the global clock."""
+    CLOCK.sleep(seconds)
+
+
+def set_clock(clock):
+    """Replace the global clock and return the previous one."""
+    global CLOCK
+    previous, CLOCK = CLOCK, clock
+    return previous
@@ -0,0 +1,252 @@
+import asyncio
+import threading
+
+from assistant_bot import VERDICTS, logger
+from metrics import count_exception
+from snapshots import LegacyEntry
+from transport import TELEGRAM_TIMEOUT
+
+MESSAGE_LIMIT = 4096
+# Read timeout of getUpdates exceeds long polling timeout by the margin
+LONG_POLL_MARGIN = 10
+HELP_TEXT = (
+    'Commands:\n'
+    '/list - statuses of all tracked homeworks.\n'
+    '/status - number of homeworks by status.\n'
+    '/status <homework name> - status of the homework.'
+)
+
+
+class SnapshotIndex:
+    """Index of tenants and their homeworks by telegram chat id.
+
+    Replies are built from tenants homeworks snapshots, the same snapshot
+    the polling loop keeps, no api request is made. Homeworks are indexed
+    by case insensitive name and counted by status per chat, the engine
+    keeps the index in sync with update().
+    """
+
+    def __init__(self, tenants=()):
+        self._by_chat = {}
+        # Chat id to case folded name to dict of entry key to entry
+        self._names = {}
+        # Chat id to status to number of homeworks
+        self._counts = {}
+        # (tenant name, homework key) to (chat id, entry)
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.rebuild(tenants)
+
+    def rebuild(self, tenants):
+        """Build index from the tenants list and their snapshots."""
+        by_chat = {}
+        for tenant in tenants:
+            by_chat.setdefault(str(tenant.chat_id), []).append(tenant)
+        with self._lock:
+            self._by_chat = by_chat
+            self._names = {}
+            self._counts = {}
+            self._entries = {}
+            for tenant in tenants:
+                for key, entry in tenant.snapshot.entries():
+                    self._put(tenant, key, entry)
+
+    def update(self, tenant, events, evicted=()):
+        """Apply saved snapshot change events and evicted keys of tenant."""
+        with self._lock:
+            for event in events:
+                # Legacy entry is replaced by the id keyed one
+                legacy = self._entries.get((tenant.name, event.homework.name))
+                if legacy is not None and isinstance(legacy[1], LegacyEntry):
+                    self._remove((tenant.name, event.homework.name))
+                self._put(tenant, event.key, event.entry)
+            for key in evicted:
+                self._remove((tenant.name, key))
+
+    def _put(self, tenant, key, entry):
+        full_key = (tenant.name, key)
+        self._remove(full_key)
+        chat_id = str(tenant.chat_id)
+        self._names.setdefault(chat_id, {}).setdefault(
+            entry.name.casefold(), {}
+        )[full_key] = entry
+        counts = self._counts.setdefault(chat_id, {})
+        counts[entry.status] = counts.get(entry.status, 0) + 1
+        self._entries[full_key] = (chat_id, entry)
+
+    def _remove(self, full_key):
+        item = self._entries.pop(full_key, None)
+        if item is None:
+            return
+        chat_id, entry = item
+        names = self._names[chat_id]
+        folded = entry.name.casefold()
+        del names[folded][full_key]
+        if not names[folded]:
+            del names[folded]
+        counts = self._counts[chat_id]
+        counts[entry.status] -= 1
+        if not counts[entry.status]:
+            del counts[entry.status]
+
+    def tenants(self, chat_id):
+        """Return tenants of the chat."""
+        return self._by_chat.get(str(chat_id), ())
+
+    def counts(self, chat_id):
+        """Return dict of status to number of homeworks of the chat."""
+        with self._lock:
+            return dict(self._counts.get(str(chat_id), {}))
+
+    def find(self, chat_id, homework_name):
+        """Return list of (homework name, status) matching the name.
+
+        Exact name matches are returned, case insensitive matches
+        are a fallback.
+        """
+        with self._lock:
+            entries = list(self._names.get(str(chat_id), {}).get(
+                homework_name.casefold(), {}
+            ).values())
+        found = [(entry.name, entry.status) for entry in entries]
+        exact = [item for item in found if item[0] == homework_name]
+        return exact or found
+
+
+def call_in_daemon_thread(function):
+    """Run blocking function in a daemon thread and return asyncio future.
+
+    Long polling thread is not joined on shutdown, unlike executor threads.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def resolve(error, result):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def target():
+        error = result = None
+        try:
+            result = function()
+        except Exception as exception:
+            error = exception
+        try:
+            loop.call_soon_threadsafe(resolve, error, result)
+        except RuntimeError:
+            # Event loop is closed
+            pass
+
+    threading.Thread(target=target, name='commands', daemon=True).start()
+    return future
+
+
+def limit(text):
+    """Cut text to telegram message length limit."""
+    if len(text) <= MESSAGE_LIMIT:
+        return text
+    return text[:MESSAGE_LIMIT - 2] + '\n…'
+
+
+class CommandHandler:
+    """Answer read-only bot commands received with getUpdates long polling.
+
+    Replies are sent with reply(chat_id, text) callable.
+    """
+
+    def __init__(self, bot, index, reply, poll_timeout=30,
+                 connect_timeout=TELEGRAM_TIMEOUT[0]):
+        self.bot = bot
+        self.index = index
+        self.reply = reply
+        self.poll_timeout = poll_timeout
+        self.connect_timeout = connect_timeout
+        self._offset = None
+        self._commands = {
+            '/list': self.command_list,
+            '/status': self.command_status,
+            '/start': self.command_help,
+            '/help': self.command_help,
+        }
+
+    def handle(self, update):
+        """Return reply text of the update or None."""
+        message = update.get('message') or {}
+        text = message.get('text') or ''
+        chat_id = (message.get('chat') or {}).get('id')
+        if chat_id is None or not text.startswith('/'):
+            return None
+        command, _, argument = text.partition(' ')
+        # Commands in groups are sent as /command@bot_name
+        command = command.split('@', 1)[0].lower()
+        method = self._commands.get(command)
+        if method is None:
+            return None
+        if not self.index.tenants(chat_id) and method != self.command_help:
+            return 'This chat is not registered.'
+        return limit(method(chat_id, argument.strip()))
+
+    def command_help(self, chat_id, argument):
+        return HELP_TEXT
+
+    def command_list(self, chat_id, argument):
+        lines = []
+        for tenant in self.index.tenants(chat_id):
+            for name, status in tenant.snapshot.statuses():
+                lines.append(f'{name}: {status}')
+        if not lines:
+            return 'No tracked homeworks yet.'
+        return '\n'.join(sorted(lines))
+
+    def command_status(self, chat_id, argument):
+        if argument:
+            found = self.index.find(chat_id, argument)
+            if not found:
+                return f'Homework "{argument}" is not tracked.'
+            return '\n'.join(
+                f'{name}: {status}. {VERDICTS.get(status, "")}'.rstrip()
+                for name, status in found
+            )
+        counts = self.index.counts(chat_id)
+        if not counts:
+            return 'No tracked homeworks yet.'
+        return '\n'.join(
+            f'{status}: {count}' for status, count in sorted(counts.items())
+        )
+
+    def get_updates(self):
+        """Long poll telegram for new updates and handle them."""
+        params = {'timeout': self.poll_timeout, 'allowed_updates': ['message']}
+        if self._offset is not None:
+            params['offset'] = self._offset
+        updates = self.bot.call(
+            'getUpdates',
+            request_timeout=(
+                self.connect_timeout, self.poll_timeout + LONG_POLL_MARGIN
+            ),
+            **params
+        ) or []
+        for update in updates:
+            self._offset = update['update_id'] + 1
+            self.process(update)
+        return len(updates)
+
+    def process(self, update):
+        """Handle the update and send reply."""
+        text = self.handle(update)
+        if text is not None:
+            self.reply(update['message']['chat']['id'], text)
+
+    async def run(self, retry_time=5):
+        """Handle updates until cancelled."""
+        while True:
+            try:
+                await call_in_daemon_thread(self.get_updates)
+            except Exception as error:
+                count_exception(error)
+                logger.error('Commands failure: %s', error)
+                await asyncio.sleep(retry_time)
@@ -0,0 +1,174 @@
+import time
+import asyncio
+import threading
+
+from assistant_bot import DIGEST_WINDOW, TELEGRAM_GLOBAL_RATE, VERDICTS
+from assistant_bot import logger
+from commands import limit
+from dispatcher import TokenBucket
+from exceptions import TelegramApiException, TelegramRetryAfterException
+from metrics import Counter, count_exception
+
+# Seconds between checks of windows to flush
+CHECK_INTERVAL = 1
+# Changes shown under the summary, older ones are in the statuses list
+MAX_CHANGES = 20
+
+DIGEST_CALLS = Counter(
+    'bot_digest_calls', 'Telegram calls of digest messages by method.',
+    ('method',)
+)
+
+
+def render_digest(statuses, changes):
+    """Return summary text of homework statuses and recent change messages.
+
+    statuses is a list of (homework name, status) tuples.
+    """
+    lines = ['Homework statuses:']
+    lines.extend(
+        f'{name}: {VERDICTS.get(status, status)}'
+        for name, status in sorted(statuses)
+    )
+    if not statuses:
+        lines.append('No tracked homeworks yet.')
+    if changes:
+        lines.append('')
+        lines.append(time.strftime('Changes (%d.%m %H:%M):'))
+        lines.extend(changes[-MAX_CHANGES:])
+    return limit('\n'.join(lines))
+
+
+class PendingDigest:
+    """Change messages of a chat waiting for the window end."""
+
+    __slots__ = ('due', 'changes')
+
+    def __init__(self, due):
+        self.due = due
+        self.changes = []
+
+
+class DigestService:
+    """Engine service keeping one pinned summary message per chat.
+
+    Change messages of a chat are collected for window seconds from the
+    first change, then the pinned summary of all homeworks of the chat is
+    edited in place, so about one telegram call is made per window per
+    chat. Summary is sent and pinned on the first change, message ids are
+    kept in the store. Failed updates are retried in the next window.
+    """
+
+    def __init__(self, bot, index, store=None, window=DIGEST_WINDOW,
+                 global_rate=TELEGRAM_GLOBAL_RATE, clock=time.monotonic):
+        self.bot = bot
+        self.index = index
+        self.store = store
+        self.window = window
+        self._clock = clock
+        self._bucket = TokenBucket(global_rate, clock=clock)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._messages = store.load_digest_messages() if store else {}
+
+    def add(self, chat_id, message):
+        """Add change message to the chat digest. Thread safe."""
+        chat_id = str(chat_id)
+        with self._lock:
+            pending = self._pending.get(chat_id)
+            if pending is None:
+                pending = self._pending[chat_id] = PendingDigest(
+                    self._clock() + self.window
+                )
+            pending.changes.append(message)
+
+    def due(self, force=False):
+        """Take and return pending digests of ended windows by chat id."""
+        now = self._clock()
+        with self._lock:
+            chats = [
+                chat_id for chat_id, pending in self._pending.items()
+                if force or pending.due <= now
+            ]
+            return {chat_id: self._pending.pop(chat_id) for chat_id in chats}
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(CHECK_INTERVAL)
+            for chat_id, pending in self.due().items():
+                await asyncio.sleep(self._bucket.reserve())
+                await loop.run_in_executor(None, self.flush, chat_id, pending)
+
+    def flush_all(self):
+        """Update digests of every chat with pending changes."""
+        for chat_id, pending in self.due(force=True).items():
+            self.flush(chat_id, pending)
+
+    def flush(self, chat_id, pending):
+        """Edit pinned summary of the chat, send and pin it when missing.
+
+        Return True when the summary is updated.
+        """
+        statuses = []
+        for tenant in self.index.tenants(chat_id):
+            statuses.extend(tenant.snapshot.statuses())
+        text = render_digest(statuses, pending.changes)
+        try:
+            self.update(chat_id, text)
+        except Exception as error:
+            # Any failure (connection, response, store) is retried, it
+            # should not stop the service task and the engine
+            count_exception(error)
+            logger.error('Digest update failure of chat %s: %s',
+                         chat_id, error)
+            delay = self.window
+            if isinstance(error, TelegramRetryAfterException):
+                delay = max(delay, error.retry_after)
+            self.retry(chat_id, pending, self._clock() + delay)
+            return False
+        return True
+
+    def retry(self, chat_id, pending, due):
+        with self._lock:
+            current = self._pending.get(chat_id)
+            if current is not None:
+                # Keep changes order, newer ones are already waiting
+                current.changes[:0] = pending.changes
+                return
+            pending.due = due
+            self._pending[chat_id] = pending
+
+    def update(self, chat_id, text):
+        message_id = self._messages.get(chat_id)
+        if message_id is not None:
+            try:
+                DIGEST_CALLS.inc(labels=('editMessageText',))
+                self.bot.call(
+                    'editMessageText', chat_id=chat_id,
+                    message_id=message_id, text=text
+                )
+                return
+            except TelegramApiException as error:
+                description = str(error).lower()
+                if 'not modified' in description:
+                    return
+                if 'not found' not in description:
+                    raise
+                # Summary is deleted, a new one is sent
+        DIGEST_CALLS.inc(labels=('sendMessage',))
+        message = self.bot.call('sendMessage', chat_id=chat_id, text=text)
+        message_id = message['message_id']
+        self._messages[chat_id] = message_id
+        if self.store is not None:
+            self.store.save_digest_message(chat_id, message_id)
+        try:
+            DIGEST_CALLS.inc(labels=('pinChatMessage',))
+            self.bot.call(
+                'pinChatMessage', chat_id=chat_id, message_id=message_id,
+                disable_notification=True
+            )
+        except TelegramApiException as error:
+            # Summary is kept up to date without the pin (no rights)
+            logger.warning('Digest pin failure of chat %s: %s',
+                           chat_id, error)
@@ -0,0 +1,268 @@
+import time
+import asyncio
+import contextvars
+from collections import deque
+
+from assistant_bot import logger
+from assistant_bot import send_chat_message
+from exceptions import TelegramRetryAfterException
+from executors import DaemonThreadPoolExecutor
+from metrics import DISPATCH_QUEUE_DEPTH, count_exception
+from metrics import DISPATCH_SENT, DISPATCH_FAILED, DISPATCH_RETRIED
+
+# Telegram limits: about 30 messages per second overall
+# and one message per second to the same chat
+GLOBAL_RATE = 30
+CHAT_RATE = 1
+THROUGHPUT_WINDOW = 60
+# Queue check interval while draining on shutdown
+DRAIN_INTERVAL = 0.05
+
+
+class TokenBucket:
+    """Token bucket rate limiter with reservations.
+
+    Every reservation takes one token, tokens may go below zero,
+    so reservations are served in order they were made.
+    """
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated', '_clock')
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self._clock = clock
+        self.updated = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    def reserve(self):
+        """Take one token and return seconds to wait before using it."""
+        self._refill()
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+    def set_rate(self, rate):
+        """Change rate, capacity is set equal to the rate."""
+        self._refill()
+        self.rate = self.capacity = rate
+        self.tokens = min(self.tokens, rate)
+
+    def is_full(self):
+        """Check bucket is idle and has all tokens."""
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+class OutgoingMessage:
+    """Message waiting in the dispatcher queue."""
+
+    __slots__ = (
+        'chat_id', 'text', 'created', 'reserved', 'attempts', 'context',
+        'on_done'
+    )
+
+    def __init__(self, chat_id, text, on_done=None):
+        self.chat_id = chat_id
+        self.text = text
+        # Called with True when the message is sent, False when given up
+        self.on_done = on_done
+        self.created = time.monotonic()
+        self.reserved = False
+        self.attempts = 0
+        # Context of the submitter, send span belongs to its poll cycle
+        self.context = contextvars.copy_context()
+
+
+class Dispatcher:
+    """Send telegram messages from worker tasks with rate limits.
+
+    Messages are submitted from any thread and never block the caller.
+    Global and per chat token buckets keep sending within telegram limits,
+    flood control errors pause sending for the requested time.
+    """
+
+    def __init__(self, bot, global_rate=GLOBAL_RATE, chat_rate=CHAT_RATE,
+                 workers=4, max_attempts=5, max_idle_chats=10000):
+        self.bot = bot
+        self.chat_rate = chat_rate
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.max_idle_chats = max_idle_chats
+        self._global_bucket = TokenBucket(global_rate)
+        self._chat_buckets = {}
+        self._paused_until = 0.0
+        self._queue = None
+        self._loop = None
+        self._tasks = []
+        self._executor = None
+        self._delayed = 0
+        self._in_flight = 0
+        self._sent_times = deque()
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+
+    def start(self):
+        """Start worker tasks in the running event loop."""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        # Own threads, so every worker has a thread to send from
+        self._executor = DaemonThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix='dispatch'
+        )
+        DISPATCH_QUEUE_DEPTH.set_function(
+            lambda: self._queue.qsize() + self._delayed
+        )
+        self._tasks = [
+            self._loop.create_task(self._worker())
+            for _ in range(self.workers)
+        ]
+
+    async def stop(self):
+        """Cancel worker tasks."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._executor.shutdown(wait=False)
+
+    async def drain(self, timeout):
+        """Wait until queued and delayed messages are sent.
+
+        Return False when messages are still waiting after timeout.
+        """
+        deadline = self._loop.time() + timeout
+        while self._queue.qsize() or self._delayed or self._in_flight:
+            if self._loop.time() >= deadline:
+                return False
+            await asyncio.sleep(DRAIN_INTERVAL)
+        return True
+
+    def set_rates(self, global_rate, chat_rate):
+        """Change global and per chat rate limits of the next messages."""
+        self.chat_rate = chat_rate
+        self._global_bucket.set_rate(global_rate)
+        for bucket in list(self._chat_buckets.values()):
+            bucket.set_rate(chat_rate)
+
+    def submit(self, chat_id, text, on_done=None):
+        """Put message to the queue. Thread safe.
+
+        on_done(sent) is called in the event loop thread when the message
+        is sent or given up after max attempts.
+        """
+        message = OutgoingMessage(chat_id, text, on_done)
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, message)
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= self.max_idle_chats:
+                # Forget idle chats, their buckets are full anyway
+                self._chat_buckets = {
+                    key: value for key, value in self._chat_buckets.items()
+                    if not value.is_full()
+                }
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate)
+        return bucket
+
+    def _delay(self, message, delay):
+        self._delayed += 1
+        self._loop.call_later(delay, self._requeue, message)
+
+    def _requeue(self, message):
+        self._delayed -= 1
+        self._queue.put_nowait(message)
+
+    async def _worker(self):
+        while True:
+            message = await self._queue.get()
+            self._in_flight += 1
+            try:
+                await self._process(message)
+            finally:
+                self._in_flight -= 1
+
+    async def _process(self, message):
+        # Reserve chat slot once, messages to a chat keep their order
+        if not message.reserved:
+            message.reserved = True
+            delay = self._chat_bucket(message.chat_id).reserve()
+            if delay > 0:
+                self._delay(message, delay)
+                return
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            self._delay(message, pause)
+            return
+        await asyncio.sleep(self._global_bucket.reserve())
+        await self._send(message)
+
+    async def _send(self, message):
+        message.attempts += 1
+        try:
+            await self._loop.run_in_executor(
+                self._executor, message.context.run, send_chat_message,
+                self.bot, message.chat_id, message.text
+            )
+        except Exception as error:
+            cause = error.__cause__
+            if isinstance(cause, TelegramRetryAfterException):
+                self.retried += 1
+                DISPATCH_RETRIED.inc()
+                self._paused_until = time.monotonic() + cause.retry_after
+                logger.warning(
+                    'Telegram flood control, pause %s seconds.',
+                    cause.retry_after
+                )
+                self._delay(message, cause.retry_after)
+                return
+            if message.attempts < self.max_attempts:
+                self.retried += 1
+                DISPATCH_RETRIED.inc()
+                self._delay(message, 2 ** message.attempts)
+                return
+            self.failed += 1
+            DISPATCH_FAILED.inc()
+            count_exception(error)
+            logger.error('Program failure: %s', error)
+            if message.on_done is not None:
+                message.on_done(False)
+            return
+        self.sent += 1
+        DISPATCH_SENT.inc()
+        now = time.monotonic()
+        self._sent_times.append(now)
+        self._trim(now)
+        if message.on_done is not None:
+            message.on_done(True)
+
+    def _trim(self, now):
+        # Keep send times of the throughput window only
+        while self._sent_times and (
+            now - self._sent_times[0] > THROUGHPUT_WINDOW
+        ):
+            self._sent_times.popleft()
+
+    def stats(self):
+        """Return queue depth and throughput statistics."""
+        self._trim(time.monotonic())
+        return {
+            'queue_depth': (
+                self._queue.qsize() if self._queue else 0
+            ) + self._delayed,
+            'in_flight': self._in_flight,
+            'sent': self.sent,
+            'failed': self.failed,
+            'retried': self.retried,
+            'throughput': len(self._sent_times) / THROUGHPUT_WINDOW,
+        }
@@ -0,0 +1,709 @@
+import json
+import time
+import signal
+import asyncio
+import threading
+import functools
+import traceback
+
+import assistant_bot
+import clocks
+import tracing
+from assistant_bot import RETRY_TIME, SHUTDOWN_TIMEOUT, VERDICTS, logger
+from assistant_bot import POLL_DEADLINE
+from assistant_bot import request_api_answer, format_status, format_comment
+from assistant_bot import send_chat_message
+from exceptions import ApiCircuitOpenException, TelegramSendMessageException
+from executors import DaemonThreadPoolExecutor
+from metrics import API_REQUEST_SECONDS, VALIDATE_SECONDS, POLL_SECONDS
+from metrics import PARSE_STATUS_SECONDS
+from metrics import TENANTS, TRACKED_HOMEWORKS, count_exception
+from metrics import SNAPSHOT_BYTES, HOMEWORK_BYTES, EVICTED_HOMEWORKS
+from outbox import OutboxMessage
+from scheduler import AdaptiveScheduler
+from snapshots import NEW, STATUS_CHANGED, COMMENT_UPDATED, Snapshot
+from suppression import ErrorSuppressor
+from validator import ResponseValidator
+
+# Seconds between evictions of finalized homeworks of a tenant
+EVICTION_INTERVAL = 3600
+# Seconds between checks of ended error suppression windows
+SUPPRESSION_CHECK_INTERVAL = 60
+
+
+class Tenant:
+    """Practicum account and telegram chat polled by the engine.
+
+    Every tenant keeps own homeworks snapshot and api timestamp.
+    """
+
+    def __init__(self, name, practicum_token, chat_id,
+                 current_timestamp=None):
+        self.name = name
+        self.practicum_token = practicum_token
+        self.chat_id = chat_id
+        self.headers = {'Authorization': f'OAuth {practicum_token}'}
+        self.snapshot = Snapshot()
+        # Adaptive scheduler backoff counters
+        self.failures = 0
+        self.idle_polls = 0
+        # Unix time of the last eviction of finalized homeworks
+        self.evicted_at = 0
+        # Restarts of the stalled polling task, results of polls started
+        # before the restart are dropped
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.current_timestamp = current_timestamp or int(clocks.now())
+
+    def __repr__(self):
+        return f'Tenant({self.name!r})'
+
+
+def event_message(event):
+    """Return telegram message of the change event or None."""
+    homework = event.homework
+    if event.kind in (NEW, STATUS_CHANGED):
+        return format_status(homework.name, homework.status)
+    if event.kind == COMMENT_UPDATED:
+        return format_comment(homework.name, homework.reviewer_comment)
+    return None
+
+
+def load_tenants(path):
+    """Load tenants from JSON file.
+
+    File contains a list of objects with `name`, `practicum_token`
+    and `chat_id` keys. Raise exceptions: file is missing or invalid.
+    """
+    with open(path, encoding='utf-8') as file:
+        data = json.load(file)
+    if not isinstance(data, list):
+        raise ValueError(f'Tenants file {path} should contain a list.')
+    return [
+        Tenant(item['name'], item['practicum_token'], item['chat_id'])
+        for item in data
+    ]
+
+
+class PollingEngine:
+    """Poll many tenants concurrently in one process.
+
+    Blocking api requests and telegram calls run in a thread pool,
+    number of tenants polled at the same time is limited by concurrency.
+    Api requests use keep-alive sessions of the transport when it is given.
+    Tenant state is restored from and saved to the store when it is given.
+    Messages are queued to the dispatcher when it is given, otherwise they
+    are sent right from the poll. Unchanged api payloads are skipped when
+    response cache is given. Api requests go through the endpoint host
+    circuit breaker when breakers registry is given. Repeated error
+    notifications are deduplicated by the suppressor, its summaries are
+    sent when the windows end. Api requests are made with get function
+    when it is given (cassette recorder). Services (objects with run()
+    coroutine) are run together with tenants polling.
+    Approved homeworks unchanged for retention seconds are evicted from
+    snapshots, zero retention keeps them. Time is read from the global
+    clock of clocks module.
+
+    Waits between polls end early on stop() and poll_now(). After stop()
+    running polls are finished and queued messages are sent within
+    shutdown timeout. Tenants and concurrency are changed on the run with
+    update_tenants() and set_concurrency(). Poll stages are reported to the
+    watchdog when it is given, stalled and failed tenant tasks are
+    restarted. Change messages go to the digest service when it is given,
+    error messages are sent as usual. Otherwise change messages go to the
+    outbox when it is given: they are saved with the tenant state and
+    delivered at least once. Saved changes are applied to the commands
+    snapshot index when it is given.
+    """
+
+    def __init__(self, tenants, bot, transport=None, store=None,
+                 scheduler=None, dispatcher=None, validator=None,
+                 cache=None, breakers=None, suppressor=None, services=(),
+                 concurrency=10, shutdown_timeout=SHUTDOWN_TIMEOUT,
+                 poll_deadline=POLL_DEADLINE, retention=0, get=None,
+                 watchdog=None, digest=None, outbox=None, index=None):
+        self.tenants = list(tenants)
+        self.bot = bot
+        self.dispatcher = dispatcher
+        self.transport = transport
+        self.store = store
+        self.scheduler = scheduler or AdaptiveScheduler(RETRY_TIME)
+        self.validator = validator or ResponseValidator(VERDICTS)
+        self.cache = cache
+        self.breakers = breakers
+        # Empty suppressor is falsy, it has __len__
+        self.suppressor = (
+            ErrorSuppressor() if suppressor is None else suppressor
+        )
+        self.services = list(services)
+        self.concurrency = concurrency
+        self.shutdown_timeout = shutdown_timeout
+        self.poll_deadline = poll_deadline
+        self.retention = retention
+        self.watchdog = watchdog
+        self.digest = digest
+        self.outbox = outbox
+        self.index = index
+        self._executor = DaemonThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix='poll'
+        )
+        self._semaphore = None
+        self._loop = None
+        self._stopping = None
+        self._wakeup = None
+        # Polling task of every tenant name
+        self._tasks = {}
+        self._get = get or (transport.get if transport else None)
+
+    async def run(self, handle_signals=False):
+        """Run polling loop of every tenant until stopped or cancelled.
+
+        With handle_signals SIGTERM and SIGINT stop the engine, SIGUSR1
+        polls every tenant right away.
+        """
+        logger.debug('Start polling engine for %d tenants.', len(self.tenants))
+        self.restore()
+        TENANTS.set_function(lambda: len(self.tenants))
+        TRACKED_HOMEWORKS.set_function(self.tracked_homeworks)
+        SNAPSHOT_BYTES.set_function(self.snapshot_bytes)
+        HOMEWORK_BYTES.set_function(self.homework_bytes)
+        self._loop = asyncio.get_running_loop()
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._stopping = asyncio.Event()
+        self._wakeup = asyncio.Event()
+        if handle_signals:
+            self.add_signal_handlers()
+        if self.dispatcher is not None:
+            self.dispatcher.start()
+        for tenant in self.tenants:
+            self._start_tenant(tenant)
+        services = self.services + [
+            service for service in (self.digest, self.outbox)
+            if service is not None
+        ]
+        service_tasks = [
+            self._loop.create_task(service.run()) for service in services
+        ]
+        service_tasks.append(
+            self._loop.create_task(self._report_suppressed())
+        )
+        if self.watchdog is not None:
+            if self.watchdog.on_stall is None:
+                self.watchdog.on_stall = functools.partial(
+                    self._loop.call_soon_threadsafe, self.restart_tenant
+                )
+            service_tasks.append(self._loop.create_task(self._loop_beat()))
+            self.watchdog.start()
+        for task in service_tasks:
+            task.add_done_callback(self._task_done)
+        try:
+            await self._stopping.wait()
+            await self.shutdown(list(self._tasks.values()), service_tasks)
+        finally:
+            for task in list(self._tasks.values()) + service_tasks:
+                task.cancel()
+            if self.dispatcher is not None:
+                await self.dispatcher.stop()
+            if self.watchdog is not None:
+                self.watchdog.stop()
+            self._executor.shutdown(wait=False)
+
+    def add_signal_handlers(self):
+        """Stop on SIGTERM and SIGINT, poll right away on SIGUSR1."""
+        handlers = [(signal.SIGTERM, self.stop), (signal.SIGINT, self.stop)]
+        # Not available on Windows
+        if hasattr(signal, 'SIGUSR1'):
+            handlers.append((signal.SIGUSR1, self.poll_now))
+        for signum, handler in handlers:
+            try:
+                self._loop.add_signal_handler(signum, handler, signum)
+            except (NotImplementedError, RuntimeError):
+                logger.warning('Signal %s handler is not supported.', signum)
+
+    def stop(self, signum=None):
+        """Stop polling loops. Call from the event loop thread."""
+        if self._stopping is None or self._stopping.is_set():
+            return
+        logger.info('Stop polling engine (signal %s).', signum)
+        self._stopping.set()
+        self._wakeup.set()
+
+    def poll_now(self, signum=None):
+        """Wake every waiting tenant to poll out of cycle."""
+        if self._wakeup is None:
+            return
+        logger.info('Poll all tenants now (signal %s).', signum)
+        # Waiters hold the set event, next waits use a new one
+        wakeup, self._wakeup = self._wakeup, asyncio.Event()
+        wakeup.set()
+
+    def _start_tenant(self, tenant, delay=None):
+        task = self._loop.create_task(self._run_tenant(tenant, delay))
+        task.add_done_callback(functools.partial(self._tenant_done, tenant))
+        self._tasks[tenant.name] = task
+
+    def _tenant_done(self, tenant, task):
+        if task.cancelled() or task.exception() is None:
+            return
+        if self._tasks.get(tenant.name) is not task:
+            return
+        # Unexpected failure, nothing handles it inside the task
+        count_exception(task.exception())
+        logger.critical(
+            '%s: polling task failure, restart task: %s', tenant,
+            task.exception(), exc_info=task.exception()
+        )
+        self._start_tenant(tenant, self.scheduler.min_interval)
+
+    def restart_tenant(self, name):
+        """Cancel stalled polling task of the tenant and start a new one.
+
+        Blocked poll thread can not be stopped: its generation is outdated,
+        so its state changes and messages are dropped, and later polls run
+        in a new thread pool. Call from the event loop thread.
+        """
+        task = self._tasks.get(name)
+        if task is None or self._stopping.is_set():
+            return
+        frames = task.get_stack()
+        logger.critical(
+            'Restart polling task of tenant %s. Task stack:\n%s', name,
+            ''.join(traceback.format_list(traceback.StackSummary.extract(
+                (frame, frame.f_lineno) for frame in frames
+            )))
+        )
+        tenant = next(
+            tenant for tenant in self.tenants if tenant.name == name
+        )
+        tenant.generation += 1
+        task.cancel()
+        # Blocked thread keeps its pool thread busy
+        self._replace_executor()
+        self._start_tenant(tenant, 0)
+
+    async def _report_suppressed(self):
+        while True:
+            await asyncio.sleep(SUPPRESSION_CHECK_INTERVAL)
+            await self._loop.run_in_executor(None, self.report_suppressed)
+
+    def report_suppressed(self):
+        """Send summaries of ended error windows with suppressed repeats."""
+        tenants = {tenant.name: tenant for tenant in self.tenants}
+        for scope, message in self.suppressor.due():
+            tenant = tenants.get(scope)
+            if tenant is None:
+                continue
+            try:
+                self.send(tenant, message)
+            except TelegramSendMessageException as error:
+                logger.error('%s: program failure: %s', tenant, error)
+
+    async def _loop_beat(self):
+        while True:
+            self.watchdog.loop_beat()
+            await asyncio.sleep(self.watchdog.interval)
+
+    def _enter(self, tenant, stage, duration=0, generation=None):
+        if self.watchdog is not None and self._current(tenant, generation):
+            self.watchdog.enter(tenant.name, stage, duration)
+
+    @staticmethod
+    def _current(tenant, generation):
+        """Check poll of the generation is not dropped by a restart."""
+        return generation is None or generation == tenant.generation
+
+    def update_tenants(self, tenants):
+        """Poll the new tenants list. Call from the event loop thread.
+
+        Tenants are matched by name. Kept tenants keep their snapshot,
+        timestamp and cached responses, changed token or chat id is set in
+        place. Added tenants are restored from the store and start polling,
+        removed ones are cancelled. Return lists of added and removed names.
+        """
+        current = {tenant.name: tenant for tenant in self.tenants}
+        names = {tenant.name for tenant in tenants}
+        added = [tenant for tenant in tenants if tenant.name not in current]
+        removed = [name for name in current if name not in names]
+        updated = [
+            tenant if tenant.name not in current
+            else self._update_tenant(current[tenant.name], tenant)
+            for tenant in tenants
+        ]
+        for name in removed:
+            task = self._tasks.pop(name, None)
+            if task is not None:
+                task.cancel()
+            if self.watchdog is not None:
+                self.watchdog.forget(name)
+        if added:
+            self.restore(added)
+        self.tenants = updated
+        if self._loop is not None:
+            for tenant in added:
+                self._start_tenant(tenant)
+        return [tenant.name for tenant in added], removed
+
+    def _update_tenant(self, kept, tenant):
+        """Set token and chat id of the reloaded tenant, return kept one."""
+        if kept.practicum_token != tenant.practicum_token:
+            if self.cache is not None:
+                self.cache.forget(kept.practicum_token)
+            kept.practicum_token = tenant.practicum_token
+            kept.headers = tenant.headers
+        kept.chat_id = tenant.chat_id
+        return kept
+
+    def set_concurrency(self, concurrency):
+        """Change number of tenants polled at the same time.
+
+        Running polls finish in the previous thread pool.
+        """
+        if concurrency == self.concurrency:
+            return
+        self.concurrency = concurrency
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._replace_executor()
+
+    def _replace_executor(self):
+        executor = self._executor
+        self._executor = DaemonThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix='poll'
+        )
+        executor.shutdown(wait=False)
+
+    def _task_done(self, task):
+        if task.cancelled() or task.exception() is None:
+            return
+        # Unexpected failure, nothing handles it inside the task
+        logger.critical(
+            'Polling task failure: %s', task.exception(),
+            exc_info=task.exception()
+        )
+        self.stop()
+
+    async def shutdown(self, tenant_tasks, service_tasks):
+        """Finish running polls and send queued messages before deadline."""
+        deadline = self._loop.time() + self.shutdown_timeout
+        for task in service_tasks:
+            task.cancel()
+        if tenant_tasks:
+            _, pending = await asyncio.wait(
+                tenant_tasks, timeout=deadline - self._loop.time()
+            )
+            if pending:
+                logger.warning(
+                    'Shutdown timeout, %d polls are not finished.',
+                    len(pending)
+                )
+        if self.digest is not None:
+            try:
+                await asyncio.wait_for(
+                    self._loop.run_in_executor(None, self.digest.flush_all),
+                    max(deadline - self._loop.time(), 0)
+                )
+            except asyncio.TimeoutError:
+                logger.warning('Shutdown timeout, digests are not updated.')
+        if self.dispatcher is not None:
+            if not await self.dispatcher.drain(deadline - self._loop.time()):
+                left = self.dispatcher.stats()['queue_depth']
+                logger.warning(
+                    'Shutdown timeout, %d messages are not sent.', left
+                )
+        if self.outbox is not None:
+            # Unsent messages stay in the outbox for the next start
+            self.outbox.flush()
+        logger.info('Polling engine stopped.')
+
+    async def wait(self, seconds):
+        """Sleep for seconds, return early on stop() or poll_now()."""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    def restore(self, tenants=None):
+        """Load tenants timestamps and homeworks snapshots from the store.
+
+        All tenants of the engine are restored by default.
+        """
+        if self.store is None:
+            return
+        states = self.store.load_all()
+        for tenant in self.tenants if tenants is None else tenants:
+            state = states.get(tenant.name)
+            if state is None:
+                continue
+            if state.current_timestamp:
+                tenant.current_timestamp = state.current_timestamp
+            tenant.snapshot = state.snapshot
+        if self.index is not None and tenants is None:
+            self.index.rebuild(self.tenants)
+        logger.info('Restored state of %d tenants.', len(states))
+
+    def tracked_homeworks(self):
+        """Return number of tracked homeworks of all tenants."""
+        return sum(len(tenant.snapshot) for tenant in self.tenants)
+
+    def snapshot_bytes(self):
+        """Return approximate memory of homeworks snapshots."""
+        return sum(tenant.snapshot.memory_size() for tenant in self.tenants)
+
+    def homework_bytes(self):
+        """Return approximate snapshot memory per tracked homework."""
+        homeworks = self.tracked_homeworks()
+        return self.snapshot_bytes() // homeworks if homeworks else 0
+
+    def evict(self, tenant, now=None):
+        """Remove approved homeworks unchanged for retention seconds.
+
+        Runs once per eviction interval of the tenant, return list of
+        removed homework keys.
+        """
+        evicted = self.expired(tenant, now)
+        self.forget(tenant, evicted)
+        return evicted
+
+    def expired(self, tenant, now=None):
+        """Return keys of approved homeworks unchanged for retention seconds.
+
+        Checked once per eviction interval of the tenant, snapshot is kept.
+        """
+        now = clocks.now() if now is None else now
+        if not self.retention or now - tenant.evicted_at < EVICTION_INTERVAL:
+            return []
+        tenant.evicted_at = now
+        return tenant.snapshot.expired(now - self.retention)
+
+    def forget(self, tenant, evicted):
+        """Remove evicted homework keys from the tenant snapshot."""
+        tenant.snapshot.remove(evicted)
+        if evicted:
+            EVICTED_HOMEWORKS.inc(len(evicted))
+            logger.info(
+                '%s: evicted %d finalized homeworks.', tenant, len(evicted)
+            )
+        return evicted
+
+    async def run_cycle(self):
+        """Poll every tenant once."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        await asyncio.gather(*(self._poll(tenant) for tenant in self.tenants))
+
+    async def _run_tenant(self, tenant, delay=None):
+        if delay is None:
+            delay = self.scheduler.first_delay()
+        self._enter(tenant, 'wait', delay)
+        await self.wait(delay)
+        while not self._stopping.is_set():
+            # Waiting for a free poll slot has no deadline
+            self._enter(tenant, 'queued', None)
+            changes, error = await self._poll(tenant)
+            if self._stopping.is_set():
+                break
+            # Suspend for adaptive interval
+            interval = self.scheduler.next_interval(tenant, changes, error)
+            logger.debug('%s: suspend for %.0f seconds.', tenant, interval)
+            self._enter(tenant, 'wait', interval)
+            await self.wait(interval)
+
+    async def _poll(self, tenant):
+        async with self._semaphore:
+            # Pool has a free thread for every slot, waiting for it has the
+            # stage deadline
+            self._enter(tenant, 'start')
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, self.poll_tenant, tenant, tenant.generation
+            )
+
+    def send(self, tenant, message):
+        """Queue message to the tenant chat or send it right away."""
+        if self.dispatcher is not None:
+            self.dispatcher.submit(tenant.chat_id, message)
+        else:
+            send_chat_message(self.bot, tenant.chat_id, message)
+
+    def fetch(self, tenant, deadline=None):
+        """Make api request and return current date and homework records.
+
+        Homework records are empty when cached payload has not changed.
+        Third item is a tuple of cache key and entry of the new payload
+        to cache after the state is saved (or None). Request retries stop
+        at deadline (monotonic time).
+        """
+        with API_REQUEST_SECONDS.time(), tracing.span(
+            'get_api_answer'
+        ) as span:
+            if self.breakers is None:
+                result = self._request(tenant, deadline)
+            else:
+                breaker = self.breakers.for_url(assistant_bot.ENDPOINT)
+                result = breaker.call(self._request, tenant, deadline)
+            span.set(changed=result[1] is not None)
+        from_date, response, cached = result
+        if response is None:
+            return from_date, (), None
+        current_date, homeworks = self.validate(response)
+        return current_date, homeworks, cached
+
+    def _request(self, tenant, deadline):
+        if self.cache is None:
+            return tenant.current_timestamp, request_api_answer(
+                tenant.current_timestamp, tenant.headers, self._get, deadline
+            ), None
+        key = tenant.practicum_token
+        from_date, data, entry = self.cache.request(
+            key, tenant.current_timestamp, tenant.headers, self._get,
+            deadline
+        )
+        return from_date, data, None if entry is None else (key, entry)
+
+    def validate(self, response):
+        """Validate api response and return current date and records."""
+        start = time.perf_counter()
+        try:
+            with tracing.span('check_response'):
+                return self.validator.validate(response)
+        finally:
+            VALIDATE_SECONDS.observe(time.perf_counter() - start)
+
+    def poll_tenant(self, tenant, generation=None):
+        """Make api request for the tenant and send status updates.
+
+        Poll of an outdated generation (restarted task) changes nothing.
+        Return tuple of change events and raised error (or None).
+        """
+        with POLL_SECONDS.time(), tracing.span(
+            'poll', tenant=tenant.name
+        ) as span:
+            changes, error = self._poll_tenant(tenant, generation)
+            if self.watchdog is not None and self._current(
+                tenant, generation
+            ):
+                self.watchdog.leave(tenant.name, error)
+            span.set(
+                changes=len(changes),
+                error=type(error).__name__ if error else None
+            )
+            return changes, error
+
+    def _poll_tenant(self, tenant, generation=None):
+        changes = []
+        try:
+            # Make api request and check response
+            logger.debug('%s: start api task.', tenant)
+            self._enter(
+                tenant, 'get_api_answer', self.poll_deadline, generation
+            )
+            current_date, homeworks, cached = self.fetch(
+                tenant, clocks.monotonic() + self.poll_deadline
+            )
+            # Check updates
+            logger.debug('%s: check status updates.', tenant)
+            self._enter(tenant, 'parse_status', generation=generation)
+            changes, notices = self.find_changes(tenant, homeworks)
+            messages = []
+            if self.outbox is not None and self.digest is None:
+                messages = [
+                    OutboxMessage.of_event(tenant, event, message)
+                    for event, message in notices
+                ]
+            if not self.commit(
+                tenant, generation, current_date, changes, messages, cached
+            ):
+                logger.warning(
+                    '%s: poll of restarted task is dropped.', tenant
+                )
+                return [], None
+            self._enter(tenant, 'send_message', generation=generation)
+            self.deliver(tenant, generation, notices, messages)
+        except TelegramSendMessageException as error:
+            count_exception(error)
+            logger.error('%s: program failure: %s', tenant, error)
+            logger.debug('%s: end api task with errors.', tenant)
+            return changes, error
+        except ApiCircuitOpenException as error:
+            # Failure which opened the circuit is already reported
+            count_exception(error)
+            logger.warning('%s: %s', tenant, error)
+            return changes, error
+        except Exception as error:
+            self.report_error(tenant, generation, error)
+            return changes, error
+        logger.debug('%s: end api task successfully.', tenant)
+        return changes, None
+
+    def find_changes(self, tenant, homeworks):
+        """Return change events of homework records and their messages.
+
+        Messages are (event, text) tuples, tenant snapshot is kept.
+        """
+        with PARSE_STATUS_SECONDS.time(), tracing.span(
+            'parse_status', homeworks=len(homeworks)
+        ):
+            changes = tenant.snapshot.changes(homeworks, int(clocks.now()))
+            notices = []
+            for event in changes:
+                message = event_message(event)
+                if message is not None:
+                    notices.append((event, message))
+        return changes, notices
+
+    def commit(self, tenant, generation, current_date, changes, messages=(),
+               cached=None):
+        """Save poll results and apply them to the tenant memory state.
+
+        Return False when the poll is dropped by a task restart.
+        """
+        with tenant.lock:
+            if not self._current(tenant, generation):
+                return False
+            evicted = self.expired(tenant)
+            # Save checkpoint, changed homeworks and outbox atomically
+            if self.store is not None:
+                self._enter(tenant, 'save_state', generation=generation)
+                with tracing.span('save_state'):
+                    self.store.save(
+                        tenant.name, current_date, changes, evicted, messages
+                    )
+            # Memory state moves only after the save, so changes of a
+            # failed save are found again by the next poll
+            tenant.snapshot.apply(changes)
+            self.forget(tenant, evicted)
+            tenant.current_timestamp = current_date
+            if self.index is not None:
+                self.index.update(tenant, changes, evicted)
+            # Payload is cached only when processed, otherwise the same
+            # payload of the next poll would be skipped
+            if cached is not None:
+                self.cache.store(*cached)
+        return True
+
+    def deliver(self, tenant, generation, notices, messages=()):
+        """Pass change messages to the digest, the outbox or the chat."""
+        if self.digest is not None:
+            for _, message in notices:
+                self.digest.add(tenant.chat_id, message)
+        elif messages:
+            self.outbox.submit(messages)
+        else:
+            for _, message in notices:
+                if not self._current(tenant, generation):
+                    break
+                self.send(tenant, message)
+
+    def report_error(self, tenant, generation, error):
+        """Log poll error, send it to the chat unless it is suppressed."""
+        count_exception(error)
+        logger.error(error, exc_info=True)
+        # Send message to telegram unless it is a suppressed repeat
+        message = None
+        if self._current(tenant, generation):
+            message = self.suppressor.notification(tenant.name, error)
+        if message is not None:
+            try:
+                self.send(tenant, message)
+            except TelegramSendMessageException as send_error:
+                logger.error('%s: program failure: %s', tenant, send_error)
+        logger.debug('%s: end api task with errors.', tenant)
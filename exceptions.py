@@ -7,7 +7,9 @@ class ApiEndpointFatalException(Exception):
 class ApiEndpointHttpResponseException(Exception):
     """API endpoint http response exception."""
 
-    ...
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
 
 
 class ApiResponseException(Exception):
@@ -26,3 +28,67 @@ class TelegramSendMessageException(Exception):
     """Telegram send message exception."""
 
     ...
+
+
+class TelegramApiException(Exception):
+    """Telegram bot api exception."""
+
+    ...
+
+
+class TelegramRetryAfterException(TelegramApiException):
+    """Telegram flood control exception, retry after given seconds."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ApiValidationException(ApiResponseException):
+    """API response validation exception with every found problem."""
+
+    def __init__(self, errors):
+        super().__init__('; '.join(errors))
+        self.errors = errors
+
+
+class ApiCircuitOpenException(Exception):
+    """API endpoint circuit breaker is open, request is not sent."""
+
+    ...
+
+
+class ApiConnectTimeoutException(ApiEndpointFatalException):
+    """API endpoint connection is not established within connect timeout."""
+
+    ...
+
+
+class ApiReadTimeoutException(ApiEndpointFatalException):
+    """API endpoint does not send response data within read timeout."""
+
+    ...
+
+
+class ApiConnectionException(ApiEndpointFatalException):
+    """API endpoint connection failure (DNS, refused, TLS, reset)."""
+
+    ...
+
+
+class ApiDeadlineExceededException(ApiEndpointFatalException):
+    """Poll cycle deadline is over before API response is received."""
+
+    ...
+
+
+class TelegramTimeoutException(TelegramApiException):
+    """Telegram bot api request timeout."""
+
+    ...
+
+
+class TelegramConnectionException(TelegramApiException):
+    """Telegram bot api connection failure."""
+
+    ...
@@ -0,0 +1,81 @@
+import queue
+import threading
+from concurrent.futures import Executor, Future
+
+
+class DaemonThreadPoolExecutor(Executor):
+    """Thread pool executor with daemon worker threads.
+
+    Threads of ThreadPoolExecutor are joined on interpreter exit, so a
+    blocked call delays the exit past any shutdown deadline. Daemon threads
+    of this pool are not joined: blocked calls end with the process.
+    Threads are started on demand up to max_workers.
+    """
+
+    def __init__(self, max_workers, thread_name_prefix='worker'):
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self._queue = queue.SimpleQueue()
+        self._idle = threading.Semaphore(0)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._shutdown = False
+
+    def submit(self, fn, *args, **kwargs):
+        """Schedule call of fn(*args, **kwargs) and return its Future."""
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError(
+                    'cannot schedule new futures after shutdown'
+                )
+            future = Future()
+            self._queue.put((future, fn, args, kwargs))
+            if (not self._idle.acquire(blocking=False)
+                    and len(self._threads) < self.max_workers):
+                thread = threading.Thread(
+                    target=self._work, daemon=True,
+                    name=f'{self.thread_name_prefix}_{len(self._threads)}'
+                )
+                thread.start()
+                self._threads.append(thread)
+        return future
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                # Wake the next worker to stop too
+                self._queue.put(None)
+                return
+            future, fn, args, kwargs = item
+            del item
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException as error:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+            del future
+            self._idle.release()
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        """Stop worker threads after queued calls.
+
+        With wait running calls are waited for, queued calls are cancelled
+        with cancel_futures.
+        """
+        with self._lock:
+            self._shutdown = True
+            if cancel_futures:
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not None:
+                        item[0].cancel()
+            self._queue.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
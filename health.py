@@ -0,0 +1,179 @@
+import sys
+import time
+import threading
+import traceback
+
+from assistant_bot import WATCHDOG_TIMEOUT, logger
+from metrics import Counter, Gauge
+
+# Seconds between watchdog checks and event loop heartbeats
+WATCHDOG_INTERVAL = 5
+
+STALLS = Counter(
+    'bot_watchdog_stalls', 'Stalled poll stages and event loop.', ('kind',)
+)
+LAST_SUCCESS = Gauge(
+    'bot_last_success_timestamp', 'Unix time of the last successful poll.'
+)
+
+
+def thread_stack(ident):
+    """Return formatted current stack of the thread."""
+    frame = sys._current_frames().get(ident)
+    if frame is None:
+        return 'Thread is not running.\n'
+    return ''.join(traceback.format_stack(frame))
+
+
+class Heartbeat:
+    """Current stage of a tenant polling loop and its last results."""
+
+    __slots__ = ('stage', 'started', 'deadline', 'thread', 'stalled',
+                 'last_poll', 'last_success')
+
+    def __init__(self):
+        self.stage = None
+        self.started = 0.0
+        self.deadline = float('inf')
+        self.thread = None
+        self.stalled = False
+        self.last_poll = None
+        self.last_success = None
+
+
+class Watchdog:
+    """Detect stalled poll stages and event loop from a daemon thread.
+
+    Tenant loops mark stages with enter(). Stage running past its deadline
+    (timeout, or expected duration plus timeout) is stalled: stack of the
+    thread running it is logged and on_stall(tenant name) is called once.
+    Event loop calls loop_beat() every interval, loop missing beats for
+    timeout is stalled. Health report has last success time of tenants.
+    """
+
+    def __init__(self, timeout=WATCHDOG_TIMEOUT, interval=WATCHDOG_INTERVAL,
+                 on_stall=None, clock=time.monotonic):
+        self.timeout = timeout
+        self.interval = interval
+        self.on_stall = on_stall
+        self._clock = clock
+        self._beats = {}
+        self._loop_beat = None
+        self._loop_thread = None
+        self._loop_stalled = False
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def enter(self, name, stage, duration=0):
+        """Mark start of the tenant stage in the thread running it.
+
+        duration is expected stage time, None means no deadline.
+        """
+        beat = self._beats.get(name)
+        if beat is None:
+            beat = self._beats[name] = Heartbeat()
+        now = self._clock()
+        beat.stage = stage
+        beat.started = now
+        beat.deadline = (
+            float('inf') if duration is None
+            else now + duration + self.timeout
+        )
+        beat.thread = threading.get_ident()
+        beat.stalled = False
+
+    def leave(self, name, error=None):
+        """Mark end of the tenant poll, successful without error."""
+        beat = self._beats.get(name)
+        if beat is None:
+            return
+        beat.last_poll = time.time()
+        if error is None:
+            beat.last_success = beat.last_poll
+            LAST_SUCCESS.set(beat.last_success)
+
+    def forget(self, name):
+        """Stop watching the tenant."""
+        self._beats.pop(name, None)
+
+    def loop_beat(self):
+        """Mark event loop is running. Call from the event loop thread."""
+        self._loop_beat = self._clock()
+        self._loop_thread = threading.get_ident()
+
+    def start(self):
+        """Start checks in a daemon thread."""
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name='watchdog', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.check()
+            except Exception as error:
+                # Watchdog must keep running
+                logger.error('Watchdog failure: %s', error, exc_info=True)
+
+    def check(self):
+        """Log stalled stages and event loop, return stalled tenant names."""
+        now = self._clock()
+        stalled = []
+        for name, beat in list(self._beats.items()):
+            if beat.stalled or now < beat.deadline:
+                continue
+            beat.stalled = True
+            STALLS.inc(labels=('poll',))
+            logger.critical(
+                '%s: %s stage stalled for %.0f seconds. Stack:\n%s',
+                name, beat.stage, now - beat.started,
+                thread_stack(beat.thread)
+            )
+            stalled.append(name)
+        if self._loop_beat is not None:
+            lag = now - self._loop_beat
+            if lag <= self.timeout:
+                self._loop_stalled = False
+            elif not self._loop_stalled:
+                self._loop_stalled = True
+                STALLS.inc(labels=('loop',))
+                logger.critical(
+                    'Event loop stalled for %.0f seconds. Stack:\n%s',
+                    lag, thread_stack(self._loop_thread)
+                )
+        if self.on_stall is not None:
+            for name in stalled:
+                self.on_stall(name)
+        return stalled
+
+    def healthy(self):
+        """Check event loop and every poll are running."""
+        return not self._loop_stalled and not any(
+            beat.stalled for beat in list(self._beats.values())
+        )
+
+    def health(self):
+        """Return health report: status, loop lag and tenants stages."""
+        now = self._clock()
+        tenants = {
+            name: {
+                'stage': beat.stage,
+                'stage_seconds': now - beat.started,
+                'stalled': beat.stalled,
+                'last_poll': beat.last_poll,
+                'last_success': beat.last_success,
+            }
+            for name, beat in list(self._beats.items())
+        }
+        return {
+            'status': 'ok' if self.healthy() else 'stalled',
+            'loop_lag': (
+                None if self._loop_beat is None else now - self._loop_beat
+            ),
+            'tenants': tenants,
+        }
@@ -0,0 +1,161 @@
+import os
+import sys
+import json
+import queue
+import atexit
+import logging
+import threading
+
+LOG_FORMAT = '%(asctime)s %(levelname)s %(funcName)s %(lineno)d %(message)s'
+LOG_FILE = 'main.log'
+LOG_MAX_BYTES = 50000000
+LOG_BACKUP_COUNT = 5
+
+_listener = None
+_queue_handler = None
+_logger = None
+_setup_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """Format log record as one JSON line."""
+
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'function': record.funcName,
+            'line': record.lineno,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+class DeferredQueueHandler(logging.Handler):
+    """Queue handler which leaves message formatting to the listener.
+
+    Standard QueueHandler formats the message in the logging thread,
+    records here are put to the in-process queue as they are.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__()
+        self.queue = log_queue
+
+    def emit(self, record):
+        self.queue.put_nowait(record)
+
+
+class LazySetupHandler(logging.Handler):
+    """Placeholder handler which sets up logging on the first record.
+
+    Importing modules does not start listener thread or open log file.
+    """
+
+    def __init__(self, logger):
+        super().__init__()
+        self._logger = logger
+
+    def handle(self, record):
+        self._logger.removeHandler(self)
+        setup_logging(self._logger)
+        # Deliver the first record through the real handlers
+        for handler in self._logger.handlers:
+            handler.handle(record)
+        return True
+
+    def emit(self, record):
+        pass
+
+
+def gzip_namer(name):
+    """Name rotated log file with .gz suffix."""
+    return name + '.gz'
+
+
+def gzip_rotator(source, dest):
+    """Compress rotated log file and remove the source."""
+    import gzip
+    import shutil
+
+    with open(source, 'rb') as source_file:
+        with gzip.open(dest, 'wb') as dest_file:
+            shutil.copyfileobj(source_file, dest_file)
+    os.remove(source)
+
+
+def lazy_logging(logger):
+    """Set logger level from LOG_LEVEL and defer handlers setup.
+
+    Handlers are set up by setup_logging() when the first record passes
+    the level check.
+    """
+    logger.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+    if _listener is None and not logger.handlers:
+        logger.addHandler(LazySetupHandler(logger))
+    return logger
+
+
+def setup_logging(logger, level=None, log_file=None, json_lines=None):
+    """Attach queue handler to the logger and start listener thread.
+
+    Level, log file and JSON lines output default to LOG_LEVEL, LOG_FILE
+    and LOG_JSON environment variables. Empty log file disables file output.
+    """
+    with _setup_lock:
+        return _setup_logging(logger, level, log_file, json_lines)
+
+
+def _setup_logging(logger, level, log_file, json_lines):
+    from logging.handlers import QueueListener, RotatingFileHandler
+
+    global _listener, _queue_handler, _logger
+    level = level or os.getenv('LOG_LEVEL', 'INFO')
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    if _listener is not None:
+        return logger
+    if log_file is None:
+        log_file = os.getenv('LOG_FILE', LOG_FILE)
+    if json_lines is None:
+        json_lines = os.getenv('LOG_JSON', '').lower() in ('1', 'true', 'yes')
+    formatter = JsonFormatter() if json_lines else logging.Formatter(
+        LOG_FORMAT
+    )
+    # Heroku service handler
+    handlers = [logging.StreamHandler(sys.stdout)]
+    # VPS handler
+    if log_file:
+        file_handler = RotatingFileHandler(
+            log_file,
+            maxBytes=LOG_MAX_BYTES,
+            backupCount=LOG_BACKUP_COUNT
+        )
+        file_handler.namer = gzip_namer
+        file_handler.rotator = gzip_rotator
+        handlers.append(file_handler)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    log_queue = queue.SimpleQueue()
+    _queue_handler = DeferredQueueHandler(log_queue)
+    _logger = logger
+    logger.addHandler(_queue_handler)
+    logger.propagate = False
+    _listener = QueueListener(log_queue, *handlers)
+    _listener.start()
+    atexit.register(stop_logging)
+    return logger
+
+
+def stop_logging():
+    """Flush queued records and stop listener thread."""
+    global _listener, _queue_handler, _logger
+    if _listener is not None:
+        _logger.removeHandler(_queue_handler)
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = _queue_handler = _logger = None
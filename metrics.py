@@ -0,0 +1,306 @@
+import time
+import threading
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(
+            name, str(value).replace('\\', r'\\').replace('"', r'\"')
+        )
+        for name, value in zip(names, values)
+    )
+    return '{' + pairs + '}'
+
+
+class Registry:
+    """Collection of metrics rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Add metric to the registry and return it."""
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def unregister(self, metric):
+        """Remove metric from the registry."""
+        with self._lock:
+            self._metrics.remove(metric)
+
+    def render(self):
+        """Return all metrics in Prometheus text format."""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics)
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class Counter:
+    """Monotonic counter, optionally split by label values."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def inc(self, amount=1, labels=()):
+        """Increase counter of the label values."""
+        labels = tuple(labels)
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels=()):
+        """Return counter value of the label values."""
+        return self._values.get(tuple(labels), 0)
+
+    def total(self):
+        """Return sum of counter values of all label values."""
+        with self._lock:
+            return sum(self._values.values())
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield (
+                f'{self.name}_total'
+                f'{_format_labels(self.labelnames, labels)} {value}'
+            )
+
+
+class Gauge:
+    """Current value, set directly or read from a function.
+
+    Labeled gauges keep a value per label values and are set directly.
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, function=None, labelnames=(),
+                 registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._function = function
+        self._values = {(): 0} if not labelnames else {}
+        if registry is not None:
+            registry.register(self)
+
+    def set(self, value, labels=()):
+        """Set gauge value of the label values."""
+        self._values[tuple(labels)] = value
+
+    def set_function(self, function):
+        """Read gauge value from the function on every render."""
+        self._function = function
+
+    def value(self, labels=()):
+        """Return gauge value of the label values."""
+        if self._function is not None:
+            return self._function()
+        return self._values.get(tuple(labels), 0)
+
+    def samples(self):
+        if self._function is not None:
+            yield f'{self.name} {self._function()}'
+            return
+        for labels, value in sorted(self._values.items()):
+            yield (
+                f'{self.name}'
+                f'{_format_labels(self.labelnames, labels)} {value}'
+            )
+
+
+class Histogram:
+    """Distribution of observed values in cumulative buckets."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets=LATENCY_BUCKETS,
+                 registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def observe(self, value):
+        """Add observed value to its bucket."""
+        index = len(self.buckets)
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = position
+                break
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @contextmanager
+    def time(self):
+        """Observe duration of the with block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    @property
+    def count(self):
+        return sum(self._counts)
+
+    def samples(self):
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            yield f'{self.name}_bucket{{le="{bound}"}} {cumulative}'
+        cumulative += counts[-1]
+        yield f'{self.name}_bucket{{le="+Inf"}} {cumulative}'
+        yield f'{self.name}_sum {total}'
+        yield f'{self.name}_count {cumulative}'
+
+
+# Bot metrics
+API_REQUEST_SECONDS = Histogram(
+    'bot_api_request_seconds', 'Practicum API request (get_api_answer) time.'
+)
+VALIDATE_SECONDS = Histogram(
+    'bot_validate_seconds', 'API response check (check_response) time.'
+)
+PARSE_STATUS_SECONDS = Histogram(
+    'bot_parse_status_seconds',
+    'Snapshot diff and change messages formatting (parse_status) time.'
+)
+SEND_MESSAGE_SECONDS = Histogram(
+    'bot_send_message_seconds', 'Telegram send_message time.'
+)
+POLL_SECONDS = Histogram(
+    'bot_poll_seconds', 'Tenant poll loop iteration time.'
+)
+EXCEPTIONS = Counter(
+    'bot_exceptions', 'Raised exceptions by class.', ('exception',)
+)
+TRACKED_HOMEWORKS = Gauge(
+    'bot_tracked_homeworks', 'Number of tracked homeworks.'
+)
+TENANTS = Gauge('bot_tenants', 'Number of polled tenants.')
+SNAPSHOT_BYTES = Gauge(
+    'bot_snapshot_bytes', 'Approximate memory of homeworks snapshots.'
+)
+HOMEWORK_BYTES = Gauge(
+    'bot_homework_bytes', 'Approximate snapshot memory per tracked homework.'
+)
+EVICTED_HOMEWORKS = Counter(
+    'bot_evicted_homeworks', 'Finalized homeworks removed from snapshots.'
+)
+CIRCUIT_STATE = Gauge(
+    'bot_circuit_state',
+    'Circuit breaker state by host: 0 closed, 1 half-open, 2 open.',
+    labelnames=('host',)
+)
+CIRCUIT_TRANSITIONS = Counter(
+    'bot_circuit_transitions', 'Circuit breaker state changes.',
+    ('host', 'state')
+)
+DISPATCH_QUEUE_DEPTH = Gauge(
+    'bot_dispatch_queue_depth', 'Number of telegram messages waiting to send.'
+)
+DISPATCH_SENT = Counter(
+    'bot_dispatch_sent', 'Telegram messages sent by the dispatcher.'
+)
+DISPATCH_FAILED = Counter(
+    'bot_dispatch_failed',
+    'Telegram messages given up by the dispatcher after all attempts.'
+)
+DISPATCH_RETRIED = Counter(
+    'bot_dispatch_retried', 'Telegram message send retries.'
+)
+
+
+def count_exception(error):
+    """Increase exceptions counter of the error class."""
+    EXCEPTIONS.inc(labels=(type(error).__name__,))
+
+
+def make_handler(registry, health=None):
+    """Return request handler class serving registry on /metrics path.
+
+    health() returns health report dict served on /health path, status
+    code is 503 unless report status is ok.
+    """
+    import json
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            path = self.path.split('?')[0]
+            if path == '/health' and health is not None:
+                report = health()
+                self.respond(
+                    200 if report['status'] == 'ok' else 503,
+                    'application/json', json.dumps(report, default=str)
+                )
+                return
+            if path != '/metrics':
+                self.send_error(404)
+                return
+            self.respond(200, CONTENT_TYPE, registry.render())
+
+        def respond(self, code, content_type, text):
+            body = text.encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return MetricsHandler
+
+
+def start_http_server(port, address='', registry=REGISTRY, health=None):
+    """Start metrics HTTP server in a daemon thread and return it."""
+    from http.server import ThreadingHTTPServer
+
+    server = ThreadingHTTPServer(
+        (address, port), make_handler(registry, health)
+    )
+    server.daemon_threads = True
+    thread = threading.Thread(
+        target=server.serve_forever, name='metrics', daemon=True
+    )
+    thread.start()
+    return server
@@ -0,0 +1,172 @@
+import asyncio
+import functools
+import threading
+
+import clocks
+from assistant_bot import logger
+from metrics import Gauge, Histogram, count_exception
+
+# Seconds between deletes of delivered messages from the store
+FLUSH_INTERVAL = 1
+# Seconds between sends of messages undelivered after all attempts
+RETRY_INTERVAL = 60
+DELIVERY_BUCKETS = (1, 5, 15, 60, 300, 900, 3600, 21600, 86400)
+
+OUTBOX_SIZE = Gauge(
+    'bot_outbox_size', 'Number of undelivered messages in the outbox.'
+)
+OUTBOX_OLDEST_SECONDS = Gauge(
+    'bot_outbox_oldest_seconds',
+    'Age of the oldest undelivered message in the outbox.'
+)
+OUTBOX_DELIVERY_SECONDS = Histogram(
+    'bot_outbox_delivery_seconds',
+    'Time from outbox commit to telegram delivery.', DELIVERY_BUCKETS
+)
+
+
+class OutboxMessage:
+    """Message saved in the outbox until telegram accepts it."""
+
+    __slots__ = ('key', 'tenant', 'chat_id', 'text', 'created')
+
+    def __init__(self, key, tenant, chat_id, text, created=None):
+        self.key = key
+        self.tenant = tenant
+        self.chat_id = chat_id
+        self.text = text
+        self.created = clocks.now() if created is None else created
+
+    @classmethod
+    def of_event(cls, tenant, event, text):
+        """Return message of the tenant change event.
+
+        Idempotency key is the same for the same change of a homework, so
+        a change found again is not queued twice.
+        """
+        return cls(
+            f'{tenant.name}:{event.key}:{event.entry.digest}', tenant.name,
+            tenant.chat_id, text
+        )
+
+    def __repr__(self):
+        return f'OutboxMessage({self.key!r})'
+
+
+class Outbox:
+    """Engine service delivering change messages at least once.
+
+    Messages are saved to the store outbox in the transaction of the tenant
+    state, then submitted to the dispatcher. Delivered messages are deleted
+    from the store, messages given up by the dispatcher stay there and are
+    sent again every retry interval. Undelivered messages of the previous
+    run are sent on start, only messages of tenants (list kept up to date
+    by the owner) when it is given. Keys of submitted messages are kept,
+    so a message is never queued twice. Message is sent again only when
+    the process stops after sending and before its delete.
+    """
+
+    def __init__(self, store, dispatcher, tenants=None,
+                 retry_interval=RETRY_INTERVAL, clock=clocks.now):
+        self.store = store
+        self.dispatcher = dispatcher
+        self.tenants = tenants
+        self.retry_interval = retry_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        # Commit time of every undelivered message by key
+        self._undelivered = {}
+        # Keys of messages waiting in the dispatcher
+        self._submitted = set()
+        # Keys of delivered messages to delete from the store
+        self._delivered = []
+        OUTBOX_SIZE.set_function(self.size)
+        OUTBOX_OLDEST_SECONDS.set_function(self.oldest_age)
+
+    def size(self):
+        """Return number of undelivered messages."""
+        return len(self._undelivered)
+
+    def oldest_age(self):
+        """Return seconds the oldest undelivered message waits."""
+        with self._lock:
+            oldest = min(self._undelivered.values(), default=None)
+        return 0 if oldest is None else max(self._clock() - oldest, 0)
+
+    def submit(self, messages):
+        """Queue saved messages to the dispatcher. Thread safe.
+
+        Messages waiting in the dispatcher are skipped, return number of
+        queued messages.
+        """
+        queued = 0
+        for message in messages:
+            with self._lock:
+                if message.key in self._submitted:
+                    continue
+                self._submitted.add(message.key)
+                self._undelivered[message.key] = message.created
+            self.dispatcher.submit(
+                message.chat_id, message.text,
+                functools.partial(self._done, message)
+            )
+            queued += 1
+        return queued
+
+    def _done(self, message, sent):
+        with self._lock:
+            self._submitted.discard(message.key)
+            if not sent:
+                return
+            self._undelivered.pop(message.key, None)
+            self._delivered.append(message.key)
+        OUTBOX_DELIVERY_SECONDS.observe(
+            max(self._clock() - message.created, 0)
+        )
+
+    def flush(self):
+        """Delete delivered messages from the store."""
+        with self._lock:
+            keys, self._delivered = self._delivered, []
+        if not keys:
+            return
+        try:
+            self.store.delete_outbox(keys)
+        except Exception as error:
+            count_exception(error)
+            logger.error('Outbox delete failure: %s', error)
+            with self._lock:
+                self._delivered[:0] = keys
+
+    def replay(self):
+        """Queue undelivered messages of the store, return their number."""
+        self.flush()
+        names = None
+        if self.tenants is not None:
+            names = {tenant.name for tenant in self.tenants}
+        messages = self.store.load_outbox(names)
+        with self._lock:
+            delivered = set(self._delivered)
+        queued = self.submit(
+            message for message in messages if message.key not in delivered
+        )
+        if queued:
+            logger.info('Outbox: send %d undelivered messages.', queued)
+        return queued
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        retry_at = 0
+        while True:
+            try:
+                if loop.time() >= retry_at:
+                    retry_at = loop.time() + self.retry_interval
+                    await loop.run_in_executor(None, self.replay)
+                else:
+                    await loop.run_in_executor(None, self.flush)
+            except Exception as error:
+                # Store may be locked by another worker, failure should not
+                # stop the service task and the engine
+                count_exception(error)
+                logger.error('Outbox failure: %s', error)
+            await asyncio.sleep(FLUSH_INTERVAL)
@@ -0,0 +1,139 @@
+import os
+import sys
+import time
+import signal
+import threading
+
+from assistant_bot import logger
+
+# Seconds of profile window started on bot start, empty disables it
+PROFILE_SECONDS = os.getenv('PROFILE_SECONDS')
+# Window length of profile started with SIGUSR2
+PROFILE_WINDOW = float(PROFILE_SECONDS or 30)
+PROFILE_DIR = os.getenv('PROFILE_DIR', '.')
+SAMPLE_INTERVAL = 0.005
+TOP_FUNCTIONS = 10
+
+
+def frame_stack(frame):
+    """Return stack of the frame as list of `file:function` from the root."""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(
+            f'{os.path.basename(code.co_filename)}:{code.co_name}'
+        )
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+class SamplingProfiler:
+    """Sample stacks of all threads for a time window.
+
+    Samples are counted by thread name and stack and written in collapsed
+    stacks format (`thread;frame;frame count`), which flame graph tools
+    read. Only one window runs at a time.
+    """
+
+    def __init__(self, directory=PROFILE_DIR, interval=SAMPLE_INTERVAL):
+        self.directory = directory
+        self.interval = interval
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds=PROFILE_WINDOW):
+        """Start profile window in a background thread.
+
+        Return False when another window is running.
+        """
+        with self._lock:
+            if self.running:
+                return False
+            self._thread = threading.Thread(
+                target=self._run, args=(seconds,), name='profiler',
+                daemon=True
+            )
+            self._thread.start()
+        return True
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def sample(self, counts):
+        """Add current stacks of other threads to counts."""
+        names = {
+            thread.ident: thread.name for thread in threading.enumerate()
+        }
+        own = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            key = ';'.join(
+                [names.get(ident, str(ident))] + frame_stack(frame)
+            )
+            counts[key] = counts.get(key, 0) + 1
+
+    def _run(self, seconds):
+        logger.info('Start profile window of %s seconds.', seconds)
+        counts = {}
+        samples = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            self.sample(counts)
+            samples += 1
+            time.sleep(self.interval)
+        try:
+            path = self.dump(counts)
+        except OSError as error:
+            logger.error('Profile dump failure: %s', error)
+            return
+        logger.info(
+            'Profile of %d samples is written to %s. Top functions: %s',
+            samples, path, ', '.join(
+                f'{name} {count}' for name, count in top_functions(counts)
+            )
+        )
+
+    def dump(self, counts):
+        """Write collapsed stacks to a new file and return its path."""
+        path = os.path.join(
+            self.directory,
+            f'profile-{os.getpid()}-{time.strftime("%Y%m%d-%H%M%S")}.txt'
+        )
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, count in sorted(
+                counts.items(), key=lambda item: item[1], reverse=True
+            ):
+                file.write(f'{stack} {count}\n')
+        return path
+
+
+def top_functions(counts, limit=TOP_FUNCTIONS):
+    """Return most sampled innermost functions and their counts."""
+    leaves = {}
+    for stack, count in counts.items():
+        leaf = stack.rsplit(';', 1)[-1]
+        leaves[leaf] = leaves.get(leaf, 0) + count
+    return sorted(leaves.items(), key=lambda item: item[1], reverse=True)[
+        :limit
+    ]
+
+
+def install(profiler=None):
+    """Start profile window on SIGUSR2 and on start with PROFILE_SECONDS.
+
+    Call from the main thread. Return the profiler.
+    """
+    profiler = profiler or SamplingProfiler()
+    # Not available on Windows
+    if hasattr(signal, 'SIGUSR2'):
+        signal.signal(signal.SIGUSR2, lambda *args: profiler.start())
+    if PROFILE_SECONDS:
+        profiler.start(float(PROFILE_SECONDS))
+    return profiler
@@ -0,0 +1,148 @@
+import os
+import signal
+import asyncio
+
+import assistant_bot
+from assistant_bot import logger
+
+# Seconds between checks of config files modification time
+CHECK_INTERVAL = 5
+
+
+class ConfigReloader:
+    """Engine service applying changed settings and tenants on the run.
+
+    Reload is made on SIGHUP and when .env or TENANTS_FILE file changes.
+    Settings of RELOADABLE_SETTINGS are read again, tenants list is loaded
+    by load_tenants(). Polling loop keeps running, state, connections and
+    cached responses of kept tenants are not touched. Invalid settings or
+    tenants file is logged and the previous one stays in use.
+    """
+
+    def __init__(self, engine, load_tenants, index=None, dispatcher=None,
+                 interval=CHECK_INTERVAL, on_reload=None):
+        self.engine = engine
+        self.load_tenants = load_tenants
+        self.index = index
+        self.dispatcher = dispatcher
+        self.interval = interval
+        self.on_reload = on_reload
+        self._requested = None
+        self._mtimes = self.mtimes()
+
+    @staticmethod
+    def paths():
+        """Return watched config files."""
+        return [
+            path for path in (assistant_bot.ENV_FILE,
+                              assistant_bot.TENANTS_FILE)
+            if path
+        ]
+
+    def mtimes(self):
+        """Return dict of watched file to its modification time."""
+        mtimes = {}
+        for path in self.paths():
+            try:
+                mtimes[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                mtimes[path] = None
+        return mtimes
+
+    def request(self, signum=None):
+        """Reload on the next check. Call from the event loop thread."""
+        logger.info('Config reload requested (signal %s).', signum)
+        self._requested.set()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self._requested = asyncio.Event()
+        # Not available on Windows
+        handled = hasattr(signal, 'SIGHUP')
+        if handled:
+            try:
+                loop.add_signal_handler(
+                    signal.SIGHUP, self.request, signal.SIGHUP
+                )
+            except (NotImplementedError, RuntimeError):
+                logger.warning('Signal SIGHUP handler is not supported.')
+                handled = False
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(
+                        self._requested.wait(), self.interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                mtimes = self.mtimes()
+                if self._requested.is_set() or mtimes != self._mtimes:
+                    self._requested.clear()
+                    self._mtimes = mtimes
+                    self.reload()
+        finally:
+            if handled:
+                loop.remove_signal_handler(signal.SIGHUP)
+
+    def reload(self):
+        """Apply settings and tenants of config files.
+
+        Return dict of changed settings, None when settings are invalid.
+        """
+        try:
+            changed = assistant_bot.reload_settings()
+        except Exception as error:
+            logger.error('Settings reload failure, settings are kept: %s',
+                         error)
+            return None
+        self.apply(changed)
+        try:
+            tenants = self.load_tenants()
+        except Exception as error:
+            logger.error('Tenants reload failure, tenants are kept: %s',
+                         error)
+            added, removed = [], []
+        else:
+            added, removed = self.engine.update_tenants(tenants)
+            if self.index is not None:
+                self.index.rebuild(self.engine.tenants)
+            if self.on_reload is not None:
+                self.on_reload(self.engine.tenants)
+        logger.info(
+            'Config reloaded, changed settings: %s, added tenants: %s, '
+            'removed tenants: %s.', ', '.join(sorted(changed)) or 'none',
+            ', '.join(added) or 'none', ', '.join(removed) or 'none'
+        )
+        return changed
+
+    def apply(self, changed):
+        """Pass changed settings to the engine and the dispatcher.
+
+        Api request settings are read by the api functions on every call.
+        """
+        engine = self.engine
+        scheduler = engine.scheduler
+        if 'RETRY_TIME' in changed:
+            scheduler.base_interval = assistant_bot.RETRY_TIME
+        if 'MIN_POLL_INTERVAL' in changed:
+            scheduler.min_interval = assistant_bot.MIN_POLL_INTERVAL
+        if 'MAX_POLL_INTERVAL' in changed:
+            scheduler.max_interval = assistant_bot.MAX_POLL_INTERVAL
+        if 'REVIEWING_POLL_INTERVAL' in changed:
+            scheduler.reviewing_interval = (
+                assistant_bot.REVIEWING_POLL_INTERVAL
+            )
+        if 'POLL_CONCURRENCY' in changed:
+            engine.set_concurrency(assistant_bot.POLL_CONCURRENCY)
+        if 'POLL_DEADLINE' in changed:
+            engine.poll_deadline = assistant_bot.POLL_DEADLINE
+        if 'APPROVED_RETENTION_DAYS' in changed:
+            engine.retention = assistant_bot.APPROVED_RETENTION_DAYS * 86400
+        if self.dispatcher is not None and (
+            'TELEGRAM_GLOBAL_RATE' in changed
+            or 'TELEGRAM_CHAT_RATE' in changed
+        ):
+            self.dispatcher.set_rates(
+                assistant_bot.TELEGRAM_GLOBAL_RATE,
+                assistant_bot.TELEGRAM_CHAT_RATE
+            )
@@ -0,0 +1,79 @@
+import random
+
+from exceptions import ApiEndpointFatalException, ApiCircuitOpenException
+from exceptions import ApiEndpointHttpResponseException
+
+BACKOFF_EXCEPTIONS = (
+    ApiEndpointHttpResponseException, ApiEndpointFatalException,
+    ApiCircuitOpenException
+)
+PENDING_STATUSES = ('reviewing',)
+
+
+class AdaptiveScheduler:
+    """Choose poll interval of a tenant from its last poll result.
+
+    Tenants with homework in review are polled every reviewing_interval.
+    Endpoint failures and idle polls (nothing pending) back off
+    exponentially from base_interval up to max_interval. Every interval
+    is randomly stretched or shrunk by jitter share within the bounds.
+    """
+
+    def __init__(self, base_interval=600, min_interval=60,
+                 max_interval=3600, reviewing_interval=120,
+                 backoff_factor=2, jitter=0.1, rand=random.random):
+        if not 0 < min_interval <= max_interval:
+            raise ValueError(
+                f'Invalid interval bounds: {min_interval}, {max_interval}.'
+            )
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.reviewing_interval = reviewing_interval
+        self.backoff_factor = backoff_factor
+        self.jitter = jitter
+        self._rand = rand
+
+    def first_delay(self):
+        """Return random delay of the first poll to spread tenants."""
+        return self._rand() * self.jitter * self.min_interval
+
+    def next_interval(self, tenant, changes=None, error=None):
+        """Update tenant backoff counters and return seconds to wait."""
+        if isinstance(error, BACKOFF_EXCEPTIONS):
+            tenant.failures += 1
+            interval = self._backoff(tenant.failures)
+        elif error is not None:
+            # Other failures keep regular cadence
+            interval = self.base_interval
+        else:
+            tenant.failures = 0
+            if changes:
+                tenant.idle_polls = 0
+            if self.is_pending(tenant):
+                tenant.idle_polls = 0
+                interval = self.reviewing_interval
+            else:
+                tenant.idle_polls += 1
+                interval = self._backoff(tenant.idle_polls - 1)
+        return self._clamp(self._jittered(self._clamp(interval)))
+
+    @staticmethod
+    def is_pending(tenant):
+        """Check any homework of the tenant waits for review result."""
+        for _, status in tenant.snapshot.statuses():
+            if status in PENDING_STATUSES:
+                return True
+        return False
+
+    def _backoff(self, attempts):
+        # Cap exponent, large attempts counters would overflow float
+        attempts = min(attempts, 32)
+        return self.base_interval * self.backoff_factor ** attempts
+
+    def _clamp(self, interval):
+        return max(self.min_interval, min(interval, self.max_interval))
+
+    def _jittered(self, interval):
+        spread = interval * self.jitter
+        return interval - spread + 2 * spread * self._rand()
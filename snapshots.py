@@ -0,0 +1,229 @@
+import sys
+import time
+import hashlib
+import threading
+from collections import namedtuple
+
+from assistant_bot import VERDICTS
+
+# Change event kinds
+NEW = 'new'
+STATUS_CHANGED = 'status_changed'
+COMMENT_UPDATED = 'comment_updated'
+# Other compared fields changed (date_updated), nothing to notify
+UPDATED = 'updated'
+
+# Final statuses, entries are evicted after retention period
+TERMINAL_STATUSES = ('approved',)
+
+# Status enum: entries keep small code of the status string, codes of
+# VERDICTS are fixed, unexpected statuses get next codes on first use
+STATUSES = list(VERDICTS)
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+_statuses_lock = threading.Lock()
+
+ChangeEvent = namedtuple(
+    'ChangeEvent', 'kind key homework entry previous_status'
+)
+# Status of homework known by name only, saved before id keys
+LegacyEntry = namedtuple('LegacyEntry', 'name status')
+
+
+def field_digest(*values):
+    """Return signed 64-bit hash of the field values.
+
+    Fits SQLite INTEGER column and is stable between restarts.
+    """
+    data = '\x1f'.join('' if value is None else value for value in values)
+    return int.from_bytes(
+        hashlib.blake2b(data.encode('utf-8'), digest_size=8).digest(),
+        'big', signed=True
+    )
+
+
+def status_code(status):
+    """Return code of the status string."""
+    code = STATUS_CODES.get(status)
+    if code is None:
+        with _statuses_lock:
+            code = STATUS_CODES.get(status)
+            if code is None:
+                code = len(STATUSES)
+                STATUSES.append(status)
+                STATUS_CODES[status] = code
+    return code
+
+
+def homework_key(homework):
+    """Return snapshot key of the homework record: id, name without id."""
+    return homework.name if homework.id is None else homework.id
+
+
+class SnapshotEntry:
+    """Last seen homework status and hashes of compared fields.
+
+    Status is kept as code, updated is unix time of the last change.
+    """
+
+    __slots__ = ('name', 'code', 'comment_digest', 'digest', 'updated')
+
+    def __init__(self, name, status, comment_digest=None, digest=None,
+                 updated=None):
+        self.name = name
+        self.code = status_code(status)
+        self.comment_digest = comment_digest
+        self.digest = digest
+        self.updated = updated
+
+    @property
+    def status(self):
+        return STATUSES[self.code]
+
+    def size(self):
+        """Return approximate memory size of the entry in bytes."""
+        return (
+            sys.getsizeof(self) + sys.getsizeof(self.name)
+            + sys.getsizeof(self.comment_digest) + sys.getsizeof(self.digest)
+            + sys.getsizeof(self.updated)
+        )
+
+
+class Snapshot:
+    """Homeworks of a tenant keyed by homework id.
+
+    Only status code and hashes are kept. Entries saved before id keys
+    were introduced are kept by name until the homework is seen again.
+    """
+
+    __slots__ = ('_entries', '_legacy')
+
+    def __init__(self):
+        self._entries = {}
+        self._legacy = {}
+
+    def __len__(self):
+        return len(self._entries) + len(self._legacy)
+
+    def add(self, key, name, status, comment_digest=None, digest=None,
+            updated=None):
+        """Add stored entry of the homework key.
+
+        Entries without update time are counted as updated now.
+        """
+        self._entries[key] = SnapshotEntry(
+            name, status, comment_digest, digest,
+            int(time.time()) if updated is None else updated
+        )
+
+    def add_legacy(self, name, status):
+        """Add stored status of homework known by name only."""
+        self._legacy[name] = status
+
+    def entries(self):
+        """Return list of (key, entry) tuples, legacy entries by name."""
+        result = list(self._entries.items())
+        result.extend(
+            (name, LegacyEntry(name, status))
+            for name, status in list(self._legacy.items())
+        )
+        return result
+
+    def statuses(self):
+        """Return list of (homework name, status) tuples."""
+        result = [
+            (entry.name, entry.status)
+            for entry in list(self._entries.values())
+        ]
+        result.extend(list(self._legacy.items()))
+        return result
+
+    def expired(self, before, statuses=TERMINAL_STATUSES):
+        """Return keys of the statuses entries unchanged since before time."""
+        codes = {status_code(status) for status in statuses}
+        return [
+            key for key, entry in self._entries.items()
+            if entry.code in codes and entry.updated < before
+        ]
+
+    def remove(self, keys):
+        """Remove entries of the keys."""
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def evict(self, before, statuses=TERMINAL_STATUSES):
+        """Remove entries of the statuses not changed since before time.
+
+        Return list of removed keys.
+        """
+        keys = self.expired(before, statuses)
+        self.remove(keys)
+        return keys
+
+    def memory_size(self):
+        """Return approximate memory size of the entries in bytes."""
+        entries = list(self._entries.items())
+        return sys.getsizeof(self._entries) + sum(
+            sys.getsizeof(key) + entry.size() for key, entry in entries
+        )
+
+    def diff(self, homeworks, now=None):
+        """Update snapshot from homework records and return change events."""
+        events = self.changes(homeworks, now)
+        self.apply(events)
+        return events
+
+    def apply(self, events):
+        """Put entries of the change events to the snapshot."""
+        for event in events:
+            self._entries[event.key] = event.entry
+            if self._legacy:
+                self._legacy.pop(event.homework.name, None)
+
+    def changes(self, homeworks, now=None):
+        """Return change events of homework records, snapshot is kept.
+
+        Events hold new entries, apply() puts them to the snapshot (after
+        they are saved). One dict lookup and one hash per record, comment
+        hash is computed only for changed records.
+        """
+        entries = self._entries
+        legacy = self._legacy
+        updated = int(time.time()) if now is None else now
+        events = []
+        for homework in homeworks:
+            key = homework_key(homework)
+            digest = field_digest(
+                homework.name, homework.status, homework.reviewer_comment,
+                homework.date_updated
+            )
+            entry = entries.get(key)
+            if entry is not None and entry.digest == digest:
+                continue
+            comment_digest = field_digest(homework.reviewer_comment)
+            if entry is None:
+                previous_status = (
+                    legacy.get(homework.name) if legacy else None
+                )
+                if previous_status is None:
+                    kind = NEW
+                elif previous_status != homework.status:
+                    kind = STATUS_CHANGED
+                else:
+                    kind = UPDATED
+            else:
+                previous_status = entry.status
+                if previous_status != homework.status:
+                    kind = STATUS_CHANGED
+                elif (entry.comment_digest != comment_digest
+                      and homework.reviewer_comment):
+                    kind = COMMENT_UPDATED
+                else:
+                    kind = UPDATED
+            entry = SnapshotEntry(
+                homework.name, homework.status, comment_digest, digest,
+                updated
+            )
+            events.append(
+                ChangeEvent(kind, key, homework, entry, previous_status)
+            )
+        return events
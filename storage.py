@@ -0,0 +1,231 @@
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+
+from outbox import OutboxMessage
+from snapshots import Snapshot
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tenants (
+    name TEXT PRIMARY KEY,
+    from_date INTEGER
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS homework_snapshots (
+    tenant TEXT NOT NULL,
+    key NOT NULL,
+    name TEXT NOT NULL,
+    status TEXT,
+    comment_digest INTEGER,
+    digest INTEGER,
+    updated INTEGER,
+    PRIMARY KEY (tenant, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS digest_messages (
+    chat_id TEXT PRIMARY KEY,
+    message_id INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS outbox (
+    key TEXT PRIMARY KEY,
+    tenant TEXT NOT NULL,
+    chat_id NOT NULL,
+    text TEXT NOT NULL,
+    created REAL NOT NULL
+) WITHOUT ROWID;
+"""
+# Statuses by homework name, saved before homework id keys
+LEGACY_TABLE = 'homeworks'
+
+
+class TenantState:
+    """Persisted state of a tenant: api timestamp and homeworks snapshot."""
+
+    __slots__ = ('current_timestamp', 'snapshot')
+
+    def __init__(self, current_timestamp=None, snapshot=None):
+        self.current_timestamp = current_timestamp
+        self.snapshot = snapshot or Snapshot()
+
+
+class StateStore(ABC):
+    """Base class of persistent tenant state stores.
+
+    Store missing any abstract method can not be created.
+    """
+
+    @abstractmethod
+    def load_all(self):
+        """Return dict of tenant name to TenantState."""
+
+    @abstractmethod
+    def save(self, tenant, current_timestamp, changes, evicted=(),
+             messages=()):
+        """Save tenant timestamp and changed homeworks in one transaction.
+
+        changes is a list of snapshot change events, evicted is a list of
+        homework keys removed from the snapshot, messages is a list of
+        outbox messages of the changes. Messages with a saved key are
+        skipped.
+        """
+
+    @abstractmethod
+    def load_outbox(self, tenants=None):
+        """Return list of undelivered outbox messages, oldest first.
+
+        Messages of all tenants are returned unless tenant names are given.
+        """
+
+    @abstractmethod
+    def delete_outbox(self, keys):
+        """Remove delivered outbox messages by their keys."""
+
+    @abstractmethod
+    def load_digest_messages(self):
+        """Return dict of chat id to its pinned digest message id."""
+
+    @abstractmethod
+    def save_digest_message(self, chat_id, message_id):
+        """Save pinned digest message id of the chat."""
+
+    def close(self):
+        """Release store resources."""
+        pass
+
+
+class SQLiteStateStore(StateStore):
+    """State store in SQLite database with write-ahead logging."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.executescript(SCHEMA)
+        columns = {
+            row[1] for row in self._connection.execute(
+                'PRAGMA table_info(homework_snapshots)'
+            )
+        }
+        if 'updated' not in columns:
+            # Entries of older databases are counted as updated on load
+            self._connection.execute(
+                'ALTER TABLE homework_snapshots ADD COLUMN updated INTEGER'
+            )
+        self._legacy = self._connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (LEGACY_TABLE,)
+        ).fetchone() is not None
+
+    def load_all(self):
+        """Return dict of tenant name to TenantState."""
+        states = {}
+        with self._lock:
+            tenants = self._connection.execute(
+                'SELECT name, from_date FROM tenants'
+            ).fetchall()
+            homeworks = self._connection.execute(
+                'SELECT tenant, key, name, status, comment_digest, digest, '
+                'updated FROM homework_snapshots'
+            ).fetchall()
+            legacy = self._connection.execute(
+                f'SELECT tenant, name, status FROM {LEGACY_TABLE}'
+            ).fetchall() if self._legacy else ()
+        for name, current_timestamp in tenants:
+            states[name] = TenantState(current_timestamp)
+        for tenant, *entry in homeworks:
+            state = states.get(tenant)
+            if state is None:
+                state = states[tenant] = TenantState()
+            state.snapshot.add(*entry)
+        for tenant, name, status in legacy:
+            state = states.get(tenant)
+            if state is None:
+                state = states[tenant] = TenantState()
+            state.snapshot.add_legacy(name, status)
+        return states
+
+    def save(self, tenant, current_timestamp, changes, evicted=(),
+             messages=()):
+        """Save tenant state and outbox messages in one transaction."""
+        with self._lock:
+            connection = self._connection
+            connection.execute('BEGIN')
+            try:
+                connection.execute(
+                    'INSERT OR REPLACE INTO tenants VALUES (?, ?)',
+                    (tenant, current_timestamp)
+                )
+                if changes:
+                    connection.executemany(
+                        'INSERT OR REPLACE INTO homework_snapshots '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                        ((tenant, event.key, event.entry.name,
+                          event.entry.status, event.entry.comment_digest,
+                          event.entry.digest, event.entry.updated)
+                         for event in changes)
+                    )
+                if evicted:
+                    connection.executemany(
+                        'DELETE FROM homework_snapshots '
+                        'WHERE tenant = ? AND key = ?',
+                        ((tenant, key) for key in evicted)
+                    )
+                if messages:
+                    connection.executemany(
+                        'INSERT OR IGNORE INTO outbox VALUES (?, ?, ?, ?, ?)',
+                        ((message.key, message.tenant, message.chat_id,
+                          message.text, message.created)
+                         for message in messages)
+                    )
+                if changes and self._legacy:
+                    # Legacy entries are replaced by id keyed entries
+                    connection.executemany(
+                        f'DELETE FROM {LEGACY_TABLE} '
+                        'WHERE tenant = ? AND name = ?',
+                        ((tenant, event.entry.name) for event in changes)
+                    )
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+
+    def load_digest_messages(self):
+        """Return dict of chat id to its pinned digest message id."""
+        with self._lock:
+            return dict(self._connection.execute(
+                'SELECT chat_id, message_id FROM digest_messages'
+            ).fetchall())
+
+    def save_digest_message(self, chat_id, message_id):
+        """Save pinned digest message id of the chat."""
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO digest_messages VALUES (?, ?)',
+                (str(chat_id), message_id)
+            )
+
+    def load_outbox(self, tenants=None):
+        """Return list of undelivered outbox messages, oldest first."""
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT key, tenant, chat_id, text, created FROM outbox '
+                'ORDER BY created, key'
+            ).fetchall()
+        return [
+            OutboxMessage(*row) for row in rows
+            if tenants is None or row[1] in tenants
+        ]
+
+    def delete_outbox(self, keys):
+        """Remove delivered outbox messages by their keys."""
+        with self._lock:
+            self._connection.executemany(
+                'DELETE FROM outbox WHERE key = ?', ((key,) for key in keys)
+            )
+
+    def close(self):
+        """Close database connection."""
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,462 @@
+import os
+import time
+import bisect
+import signal
+import asyncio
+import hashlib
+import threading
+import multiprocessing
+from multiprocessing.connection import wait
+
+from assistant_bot import BOT_COMMANDS, METRICS_PORT, SHUTDOWN_TIMEOUT
+from assistant_bot import TELEGRAM_TOKEN, WATCHDOG_TIMEOUT, logger
+from commands import CommandHandler
+from health import STALLS
+from metrics import EXCEPTIONS, POLL_SECONDS, Counter, Gauge, count_exception
+
+HASH_REPLICAS = 100
+# Seconds between worker load reports and supervisor status log records
+REPORT_INTERVAL = 10
+STATUS_LOG_INTERVAL = 300
+# Crashed worker restart delay, doubled on every crash in a row
+RESTART_DELAY = 1
+MAX_RESTART_DELAY = 60
+# Seconds to wait for workers after shutdown timeout before killing them
+KILL_GRACE = 5
+LOAD_FIELDS = (
+    'tenants', 'tracked_homeworks', 'polls', 'exceptions', 'queue_depth',
+    'cpu_seconds', 'snapshot_bytes'
+)
+
+WORKER_UP = Gauge(
+    'bot_worker_up', 'Worker process is running.', labelnames=('worker',)
+)
+WORKER_RESTARTS = Counter(
+    'bot_worker_restarts', 'Worker process restarts.', ('worker',)
+)
+WORKER_LOAD = Gauge(
+    'bot_worker_load', 'Last load report of worker process by field.',
+    labelnames=('worker', 'field')
+)
+
+
+def ring_hash(key):
+    """Return 64-bit hash of the key, equal in every process."""
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class HashRing:
+    """Consistent hashing ring of worker nodes.
+
+    Every node has replicas points on the ring, a key belongs to the node
+    of the next point clockwise. Adding or removing one of N nodes moves
+    about 1/N of keys.
+    """
+
+    def __init__(self, nodes, replicas=HASH_REPLICAS):
+        points = sorted(
+            (ring_hash(f'{node}#{replica}'), node)
+            for node in nodes for replica in range(replicas)
+        )
+        if not points:
+            raise ValueError('Hash ring needs at least one node.')
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key):
+        """Return node of the key."""
+        index = bisect.bisect(self._hashes, ring_hash(str(key)))
+        return self._nodes[index % len(self._nodes)]
+
+
+def shard_key(tenant):
+    """Return sharding key of the tenant.
+
+    Tenants of a chat share worker, so bot commands are routed to one
+    process by chat id.
+    """
+    return str(tenant.chat_id)
+
+
+def collect_load(tenants, dispatcher):
+    """Return load report of the worker process."""
+    return {
+        'pid': os.getpid(),
+        'tenants': len(tenants),
+        'tracked_homeworks': sum(len(tenant.snapshot) for tenant in tenants),
+        'polls': POLL_SECONDS.count,
+        'exceptions': EXCEPTIONS.total(),
+        'queue_depth': dispatcher.stats()['queue_depth'],
+        'cpu_seconds': time.process_time(),
+        'snapshot_bytes': sum(
+            tenant.snapshot.memory_size() for tenant in tenants
+        ),
+    }
+
+
+class WorkerLink:
+    """Engine service connecting worker process with the supervisor.
+
+    Bot command updates routed by the supervisor are handled in a reader
+    thread, load report is sent every interval.
+    """
+
+    def __init__(self, connection, tenants, handler, dispatcher,
+                 interval=REPORT_INTERVAL):
+        self.connection = connection
+        self.tenants = tenants
+        self.handler = handler
+        self.dispatcher = dispatcher
+        self.interval = interval
+
+    async def run(self):
+        threading.Thread(
+            target=self._receive, name='supervisor-link', daemon=True
+        ).start()
+        while True:
+            self.report()
+            await asyncio.sleep(self.interval)
+
+    def report(self):
+        """Send load report to the supervisor."""
+        try:
+            self.connection.send(
+                ('load', collect_load(self.tenants, self.dispatcher))
+            )
+        except OSError as error:
+            logger.warning('Supervisor connection failure: %s', error)
+
+    def _receive(self):
+        while True:
+            try:
+                kind, payload = self.connection.recv()
+            except (EOFError, OSError):
+                return
+            if kind != 'update' or self.handler is None:
+                continue
+            try:
+                self.handler.process(payload)
+            except Exception as error:
+                count_exception(error)
+                logger.error('Commands failure: %s', error)
+
+
+def run_worker(worker, workers, connection):
+    """Worker process entry: poll tenants of the shard until stopped."""
+    import assistant_bot
+
+    # Rotating log file is not shared between processes
+    log_file = os.getenv('LOG_FILE', 'main.log')
+    if log_file:
+        os.environ['LOG_FILE'] = f'{log_file}.worker{worker}'
+    if assistant_bot.CASSETTE_FILE:
+        assistant_bot.CASSETTE_FILE += f'.worker{worker}'
+    ring = HashRing(range(workers))
+
+    def load_shard():
+        return [
+            tenant for tenant in assistant_bot.load_bot_tenants()
+            if ring.node_for(shard_key(tenant)) == worker
+        ]
+
+    tenants = load_shard()
+    logger.info('Worker %d polls %d tenants.', worker, len(tenants))
+
+    def make_services(bot, index, dispatcher):
+        handler = None
+        if BOT_COMMANDS:
+            handler = CommandHandler(bot, index, dispatcher.submit)
+        return [WorkerLink(connection, tenants, handler, dispatcher)]
+
+    assistant_bot.run_bot(
+        tenants, make_services, metrics_port=None, load_tenants=load_shard
+    )
+
+
+class CommandRouter(CommandHandler):
+    """Receive bot command updates and pass them to the chat worker."""
+
+    def __init__(self, bot, supervisor, poll_timeout=30):
+        super().__init__(bot, None, None, poll_timeout)
+        self.supervisor = supervisor
+
+    def process(self, update):
+        chat_id = ((update.get('message') or {}).get('chat') or {}).get('id')
+        if chat_id is not None:
+            self.supervisor.route(chat_id, update)
+
+
+class WorkerProcess:
+    """Worker process handle and its last load report."""
+
+    def __init__(self, index):
+        self.index = index
+        self.process = None
+        self.connection = None
+        self.started = 0.0
+        self.crashes = 0
+        self.restarts = 0
+        self.restart_at = None
+        self.load = {}
+        # Monotonic time of the last load report
+        self.reported = 0.0
+
+
+class Supervisor:
+    """Run tenants polling in worker processes.
+
+    Tenants are assigned to workers by consistent hashing of chat id.
+    Crashed workers are restarted with backoff, workers load reports
+    are aggregated in status() and metrics. Workers without load report
+    for stall timeout (blocked event loop) are killed and restarted. Bot
+    command updates are long polled here and routed to the worker of the
+    chat.
+    """
+
+    def __init__(self, workers, target=run_worker,
+                 shutdown_timeout=SHUTDOWN_TIMEOUT,
+                 route_commands=BOT_COMMANDS, metrics_port=METRICS_PORT,
+                 restart_delay=RESTART_DELAY,
+                 stall_timeout=WATCHDOG_TIMEOUT):
+        self.workers = workers
+        self.target = target
+        self.shutdown_timeout = shutdown_timeout
+        self.route_commands = route_commands
+        self.metrics_port = metrics_port
+        self.restart_delay = restart_delay
+        self.stall_timeout = stall_timeout
+        self.ring = HashRing(range(workers))
+        self._context = multiprocessing.get_context('spawn')
+        self._workers = [WorkerProcess(index) for index in range(workers)]
+        self._stopping = threading.Event()
+        self._status_logged = time.monotonic()
+
+    def run(self, handle_signals=False):
+        """Start workers and supervise them until stopped."""
+        if handle_signals:
+            self.add_signal_handlers()
+        if self.metrics_port:
+            from metrics import start_http_server
+
+            start_http_server(int(self.metrics_port), health=self.health)
+            logger.info(
+                'Metrics endpoint started on port %s.', self.metrics_port
+            )
+        transport = None
+        if self.route_commands:
+            transport = self.start_router()
+        logger.info('Start %d worker processes.', self.workers)
+        for worker in self._workers:
+            self.start_worker(worker)
+        try:
+            while not self._stopping.is_set():
+                self.check()
+        finally:
+            self.shutdown()
+            if transport is not None:
+                transport.close()
+
+    def add_signal_handlers(self):
+        """Stop on SIGTERM and SIGINT, pass SIGUSR1, SIGUSR2 and SIGHUP to
+        workers.
+        """
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        # Not available on Windows
+        for name in ('SIGUSR1', 'SIGUSR2', 'SIGHUP'):
+            if hasattr(signal, name):
+                signal.signal(getattr(signal, name), self.forward_signal)
+
+    def stop(self, signum=None, frame=None):
+        """Stop supervising, workers are stopped by run()."""
+        logger.info('Stop supervisor (signal %s).', signum)
+        self._stopping.set()
+
+    def forward_signal(self, signum, frame=None):
+        """Send the signal to every running worker."""
+        for worker in self._workers:
+            if worker.process is not None and worker.process.is_alive():
+                os.kill(worker.process.pid, signum)
+
+    def start_router(self):
+        """Start bot commands long polling thread, return its transport."""
+        from transport import TelegramClient, Transport
+
+        transport = Transport()
+        router = CommandRouter(
+            TelegramClient(TELEGRAM_TOKEN, transport), self
+        )
+
+        def target():
+            while not self._stopping.is_set():
+                try:
+                    router.get_updates()
+                except Exception as error:
+                    count_exception(error)
+                    logger.error('Commands failure: %s', error)
+                    self._stopping.wait(5)
+
+        threading.Thread(target=target, name='commands', daemon=True).start()
+        return transport
+
+    def start_worker(self, worker):
+        """Start worker process with a new connection."""
+        connection, child_connection = self._context.Pipe()
+        worker.process = self._context.Process(
+            target=self.target,
+            args=(worker.index, self.workers, child_connection),
+            name=f'worker-{worker.index}', daemon=True
+        )
+        worker.process.start()
+        child_connection.close()
+        worker.connection = connection
+        worker.started = worker.reported = time.monotonic()
+        worker.restart_at = None
+        WORKER_UP.set(1, (str(worker.index),))
+        logger.info(
+            'Worker %d started, pid %s.', worker.index, worker.process.pid
+        )
+
+    def route(self, chat_id, update):
+        """Send bot command update to the worker of the chat."""
+        worker = self._workers[self.ring.node_for(str(chat_id))]
+        try:
+            worker.connection.send(('update', update))
+        except (OSError, ValueError):
+            logger.warning(
+                'Worker %d is not running, update is skipped.', worker.index
+            )
+
+    def check(self, timeout=1):
+        """Receive load reports and restart exited workers."""
+        waitables = []
+        for worker in self._workers:
+            if worker.restart_at is None:
+                waitables.append(worker.connection)
+                waitables.append(worker.process.sentinel)
+        for ready in wait(waitables, timeout):
+            for worker in self._workers:
+                if ready is worker.connection:
+                    self._receive(worker)
+        if not waitables:
+            self._stopping.wait(timeout)
+        now = time.monotonic()
+        if not self._stopping.is_set():
+            for worker in self._workers:
+                self._check_worker(worker, now)
+        if now - self._status_logged >= STATUS_LOG_INTERVAL:
+            self._status_logged = now
+            self.log_status()
+
+    def _receive(self, worker):
+        try:
+            kind, payload = worker.connection.recv()
+        except (EOFError, OSError):
+            return
+        if kind != 'load':
+            return
+        worker.reported = time.monotonic()
+        worker.load = payload
+        for field in LOAD_FIELDS:
+            WORKER_LOAD.set(
+                payload.get(field, 0), (str(worker.index), field)
+            )
+
+    def _check_worker(self, worker, now):
+        if worker.process.is_alive():
+            if (worker.restart_at is None
+                    and now - worker.reported > self.stall_timeout):
+                STALLS.inc(labels=('worker',))
+                logger.critical(
+                    'Worker %d sent no load report for %.0f seconds, '
+                    'kill it.', worker.index, now - worker.reported
+                )
+                worker.process.kill()
+            return
+        if worker.restart_at is None:
+            # Crashes in a row (shortly after start) increase the delay
+            if now - worker.started > MAX_RESTART_DELAY:
+                worker.crashes = 0
+            worker.crashes += 1
+            delay = min(
+                MAX_RESTART_DELAY,
+                self.restart_delay * 2 ** (worker.crashes - 1)
+            )
+            worker.restart_at = now + delay
+            worker.connection.close()
+            WORKER_UP.set(0, (str(worker.index),))
+            logger.error(
+                'Worker %d exited with code %s, restart in %s seconds.',
+                worker.index, worker.process.exitcode, delay
+            )
+        elif now >= worker.restart_at:
+            worker.restarts += 1
+            WORKER_RESTARTS.inc(labels=(str(worker.index),))
+            self.start_worker(worker)
+
+    def status(self):
+        """Return workers load reports and their totals."""
+        workers = []
+        total = dict.fromkeys(LOAD_FIELDS, 0)
+        for worker in self._workers:
+            alive = worker.process is not None and worker.process.is_alive()
+            workers.append(dict(
+                worker.load, worker=worker.index, alive=alive,
+                restarts=worker.restarts
+            ))
+            for field in LOAD_FIELDS:
+                total[field] += worker.load.get(field, 0)
+        total['alive'] = sum(worker['alive'] for worker in workers)
+        return {'workers': workers, 'total': total}
+
+    def health(self):
+        """Return health report: ok when every worker runs and reports."""
+        now = time.monotonic()
+        workers = {
+            worker.index: {
+                'alive': (
+                    worker.process is not None
+                    and worker.process.is_alive()
+                ),
+                'report_age': now - worker.reported,
+                'restarts': worker.restarts,
+            }
+            for worker in self._workers
+        }
+        ok = all(
+            worker['alive'] and worker['report_age'] <= self.stall_timeout
+            for worker in workers.values()
+        )
+        return {'status': 'ok' if ok else 'stalled', 'workers': workers}
+
+    def log_status(self):
+        """Log totals of workers load reports."""
+        total = self.status()['total']
+        logger.info(
+            'Workers %d/%d alive, tenants %d, tracked homeworks %d, '
+            'polls %d, exceptions %d, queued messages %d, cpu %.1f s.',
+            total['alive'], self.workers, total['tenants'],
+            total['tracked_homeworks'], total['polls'], total['exceptions'],
+            total['queue_depth'], total['cpu_seconds']
+        )
+
+    def shutdown(self):
+        """Stop workers gracefully, kill them after the timeout."""
+        self._stopping.set()
+        running = [
+            worker.process for worker in self._workers
+            if worker.process is not None and worker.process.is_alive()
+        ]
+        for process in running:
+            process.terminate()
+        deadline = time.monotonic() + self.shutdown_timeout + KILL_GRACE
+        for process in running:
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning('Kill worker process %s.', process.pid)
+                process.kill()
+                process.join()
+        for worker in self._workers:
+            WORKER_UP.set(0, (str(worker.index),))
+        logger.info('Supervisor stopped.')
@@ -0,0 +1,118 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+
+from metrics import Counter
+
+SUPPRESSED_ERRORS = Counter(
+    'bot_suppressed_errors', 'Error notifications not sent (repeats).'
+)
+FINGERPRINT_LENGTH = 200
+# Parts of error messages which change between equal failures
+VOLATILE_PATTERNS = (
+    (re.compile(r'0x[0-9a-fA-F]+'), '0x?'),
+    (re.compile(r'\d{4,}'), '#'),
+)
+
+
+def fingerprint(error):
+    """Return error class and message with volatile parts masked.
+
+    Timestamps, ports and object addresses are replaced, so repeats of
+    the same failure share fingerprint.
+    """
+    message = str(error)
+    for pattern, replacement in VOLATILE_PATTERNS:
+        message = pattern.sub(replacement, message)
+    return type(error).__name__, message[:FINGERPRINT_LENGTH]
+
+
+def format_period(seconds):
+    """Return human readable length of the time window."""
+    if seconds % 3600 == 0:
+        hours = seconds // 3600
+        return 'hour' if hours == 1 else f'{hours} hours'
+    if seconds % 60 == 0:
+        minutes = seconds // 60
+        return 'minute' if minutes == 1 else f'{minutes} minutes'
+    return f'{seconds} seconds'
+
+
+class SuppressionEntry:
+    """Time window, repeats count and last message of one fingerprint."""
+
+    __slots__ = ('window_start', 'repeats', 'message')
+
+    def __init__(self, window_start, message):
+        self.window_start = window_start
+        self.repeats = 0
+        self.message = message
+
+
+class ErrorSuppressor:
+    """Deduplicate error notifications by fingerprint and time window.
+
+    The first error of a fingerprint is reported and starts the window,
+    repeats within the window are counted and suppressed. When the window
+    ends, due() returns a summary with the number of occurrences in the
+    window, windows without repeats end silently. Fingerprints are kept in
+    LRU order, the least recently seen are dropped over max_entries.
+    """
+
+    def __init__(self, window=3600, max_entries=10000, clock=time.monotonic):
+        self.window = window
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._summaries = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def notification(self, scope, error):
+        """Return message to send about the error or None if suppressed.
+
+        Scope (tenant name) separates equal errors of different chats.
+        """
+        key = (scope,) + fingerprint(error)
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry.window_start >= self.window:
+                self._close(key, entry)
+                entry = None
+            if entry is None:
+                self._entries[key] = SuppressionEntry(now, str(error))
+                while len(self._entries) > self.max_entries:
+                    self._close(*self._entries.popitem(last=False))
+                return f'Program failure: {error}'
+            self._entries.move_to_end(key)
+            entry.repeats += 1
+            entry.message = str(error)
+        SUPPRESSED_ERRORS.inc()
+        return None
+
+    def due(self):
+        """End windows past their time.
+
+        Return list of (scope, summary message) of the ended windows with
+        suppressed repeats.
+        """
+        now = self.clock()
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if now - entry.window_start >= self.window:
+                    self._close(key, entry)
+            summaries, self._summaries = self._summaries, []
+        return summaries
+
+    def _close(self, key, entry):
+        self._entries.pop(key, None)
+        if not entry.repeats:
+            return
+        self._summaries.append((key[0], (
+            f'Program failure: {entry.message} ({entry.repeats + 1} '
+            f'occurrences in the last {format_period(self.window)}).'
+        )))
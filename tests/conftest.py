@@ -1,9 +1,19 @@
 import sys
 from os.path import abspath, dirname
 
+import pytest
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
 
 pytest_plugins = [
     'tests.fixtures.fixture_data'
 ]
+
+
+@pytest.fixture(autouse=True)
+def no_retry_backoff(monkeypatch):
+    """Retry failed api requests without waiting."""
+    import assistant_bot
+
+    monkeypatch.setattr(assistant_bot, 'API_RETRY_BACKOFF', 0)
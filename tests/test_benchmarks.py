@@ -0,0 +1,16 @@
+class TestBenchmarks:
+
+    def test_polling_benchmark_smoke(self):
+        from benchmarks.bench_polling import run
+
+        result = run(tenants=2, cycles=2, concurrency=2, homeworks=3,
+                     change_rate=1.0)
+        assert result['polls'] == 4
+        assert result['api_requests'] == 4, (
+            'Every poll should reach the stub Practicum server'
+        )
+        assert result['notifications'] == 12, (
+            'Every changed homework should reach the stub Telegram server'
+        )
+        assert result['polls_per_second'] > 0
+        assert result['notification_latency']['max'] is not None
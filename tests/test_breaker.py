@@ -0,0 +1,78 @@
+import pytest
+
+from exceptions import ApiCircuitOpenException, ApiEndpointFatalException
+from exceptions import ApiEndpointHttpResponseException
+
+
+def fail():
+    raise ApiEndpointFatalException('Timeout')
+
+
+def succeed():
+    return 'ok'
+
+
+class TestCircuitBreaker:
+
+    def make(self, now):
+        from breaker import CircuitBreaker
+
+        return CircuitBreaker(
+            'practicum.yandex.ru', window=4, min_calls=4, failure_rate=0.5,
+            open_time=60, clock=lambda: now[0]
+        )
+
+    def test_open_and_recover(self):
+        now = [0.0]
+        breaker = self.make(now)
+        breaker.call(succeed)
+        breaker.call(succeed)
+        for _ in range(2):
+            with pytest.raises(ApiEndpointFatalException):
+                breaker.call(fail)
+        assert breaker.state == 'open', (
+            'Breaker should open when failure rate reaches threshold'
+        )
+        with pytest.raises(ApiCircuitOpenException):
+            breaker.call(succeed)
+
+        now[0] = 61
+        breaker._before_call()
+        assert breaker.state == 'half_open'
+        with pytest.raises(ApiCircuitOpenException):
+            breaker.call(succeed)
+        breaker._after_call(True)
+        assert breaker.state == 'closed', (
+            'Successful probe should close the breaker'
+        )
+
+    def test_failed_probe_opens(self):
+        now = [0.0]
+        breaker = self.make(now)
+        for _ in range(4):
+            with pytest.raises(ApiEndpointFatalException):
+                breaker.call(fail)
+        now[0] = 61
+        with pytest.raises(ApiEndpointFatalException):
+            breaker.call(fail)
+        assert breaker.state == 'open'
+
+    def test_client_errors_are_not_failures(self):
+        now = [0.0]
+        breaker = self.make(now)
+
+        def unauthorized():
+            raise ApiEndpointHttpResponseException('401', 401)
+
+        for _ in range(5):
+            with pytest.raises(ApiEndpointHttpResponseException):
+                breaker.call(unauthorized)
+        assert breaker.state == 'closed'
+
+    def test_registry_shares_host_breaker(self):
+        from breaker import BreakerRegistry
+
+        registry = BreakerRegistry()
+        first = registry.for_url('https://practicum.yandex.ru/api/a/')
+        second = registry.for_url('https://practicum.yandex.ru/api/b/')
+        assert first is second
@@ -0,0 +1,59 @@
+from http import HTTPStatus
+
+import requests
+
+from utils import MockResponse
+
+
+class TestResponseCache:
+
+    def test_payload_digest_ignores_current_date(self):
+        from cache import payload_digest
+
+        first = payload_digest(b'{"homeworks": [], "current_date": 100}')
+        second = payload_digest(b'{"homeworks": [], "current_date": 2000}')
+        other = payload_digest(b'{"homeworks": [1], "current_date": 100}')
+        assert first == second
+        assert first != other
+
+    def test_fetch(self, monkeypatch):
+        from cache import ResponseCache
+
+        calls = []
+        responses = [
+            MockResponse({'homeworks': [1], 'current_date': 100},
+                         headers={'ETag': '"v1"'}),
+            MockResponse({'homeworks': [1], 'current_date': 200},
+                         headers={'ETag': '"v1"'}),
+            MockResponse(http_status=HTTPStatus.NOT_MODIFIED),
+            MockResponse({'homeworks': [2], 'current_date': 300}),
+        ]
+
+        def mock_get(url, params=None, headers=None, **kwargs):
+            calls.append((params['from_date'], headers))
+            return responses[len(calls) - 1]
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        cache = ResponseCache()
+        headers = {'Authorization': 'OAuth t1'}
+
+        from_date, data = cache.fetch('t1', 50, headers)
+        assert data == {'homeworks': [1], 'current_date': 100}
+        from_date, data = cache.fetch('t1', 100, headers)
+        assert (from_date, data) == (100, None), (
+            'Unchanged payload should not be decoded'
+        )
+        assert 'If-None-Match' not in calls[1][1]
+        from_date, data = cache.fetch('t1', 100, headers)
+        assert (from_date, data) == (100, None)
+        assert calls[2][1]['If-None-Match'] == '"v1"', (
+            'Request with the same from_date should be conditional'
+        )
+        from_date, data = cache.fetch('t1', 100, headers)
+        assert data['homeworks'] == [2]
+        assert cache.stats()['hits'] == 2
+        assert cache.stats()['misses'] == 2
+        assert cache.stats()['not_modified'] == 1
+        assert 'If-None-Match' not in headers, (
+            'Tenant headers should not be changed'
+        )
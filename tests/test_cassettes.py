@@ -0,0 +1,121 @@
+import json
+from http import HTTPStatus
+
+from utils import MockResponse
+
+ETAG = {'ETag': '"v1"'}
+
+
+class TestVirtualClock:
+
+    def test_sleep_advances_clock(self):
+        import clocks
+
+        clock = clocks.VirtualClock(1000)
+        previous = clocks.set_clock(clock)
+        try:
+            clocks.sleep(30)
+            assert clocks.now() == clocks.monotonic() == 1030, (
+                'Sleep should move virtual clock forward'
+            )
+        finally:
+            clocks.set_clock(previous)
+        clock.set(500)
+        assert clock.now() == 1030, 'Virtual clock should not go back'
+
+
+class TestCassettes:
+
+    def test_record_and_replay(self, tmp_path):
+        from assistant_bot import format_status
+        from cassettes import CassetteRecorder, load_cassette, replay
+        from engine import Tenant
+
+        path = str(tmp_path / 'cassette.jsonl')
+        responses = [
+            MockResponse({}, HTTPStatus.BAD_GATEWAY, ETAG),
+            MockResponse({'homeworks': [
+                {'id': 1, 'homework_name': 'hw', 'status': 'reviewing'}
+            ], 'current_date': 200}, headers=ETAG),
+            MockResponse({'homeworks': [
+                {'id': 1, 'homework_name': 'hw', 'status': 'approved'}
+            ], 'current_date': 86400}, headers=ETAG),
+        ]
+
+        def mock_get(url, params=None, headers=None, **kwargs):
+            return responses.pop(0)
+
+        recorder = CassetteRecorder(
+            path, [Tenant('one', 'secret', 1)], mock_get
+        )
+        headers = {'Authorization': 'OAuth secret'}
+        for from_date in (100, 100, 200):
+            recorder.get('url', params={'from_date': from_date},
+                         headers=headers)
+        recorder.close()
+        records = load_cassette(path)
+        assert 'secret' not in open(path).read(), (
+            'Tokens should not be recorded'
+        )
+        records[2]['time'] = records[0]['time'] + 86400
+
+        bot = replay(records)
+        assert [
+            (chat, text) for _, chat, text in bot.messages
+        ] == [
+            ('one', format_status('hw', 'reviewing')),
+            ('one', format_status('hw', 'approved')),
+        ], 'Replay should send messages of recorded status changes'
+        assert bot.messages[1][0] - bot.messages[0][0] >= 86400, (
+            'Messages should be sent at recorded virtual time'
+        )
+
+    def test_reloaded_tenants_are_recorded(self, tmp_path):
+        from cassettes import CassetteRecorder, load_cassette
+        from engine import Tenant
+
+        def mock_get(url, params=None, headers=None, **kwargs):
+            return MockResponse({'homeworks': [], 'current_date': 100})
+
+        path = str(tmp_path / 'cassette.jsonl')
+        tenants = [Tenant('one', 't1', 1)]
+        recorder = CassetteRecorder(path, tenants, mock_get)
+        # Config reload: token of a kept tenant changed, tenant added
+        tenants[0].headers = {'Authorization': 'OAuth t1-new'}
+        tenants.append(Tenant('two', 't2', 2))
+        for token in ('t1-new', 't2'):
+            recorder.get('url', params={'from_date': 100},
+                         headers={'Authorization': f'OAuth {token}'})
+        recorder.close()
+        assert [record['tenant'] for record in load_cassette(path)] == [
+            'one', 'two'
+        ], 'Tenants of reloaded list should be recorded by name'
+
+    def test_replay_of_failing_endpoint_ends(self):
+        import threading
+
+        from assistant_bot import API_RETRIES, format_status
+        from cassettes import replay
+
+        records = [
+            {'time': 1000, 'tenant': f'failing{number}', 'from_date': 100,
+             'error': 'ConnectionError', 'message': 'down'}
+            for number in range(5) for _ in range(API_RETRIES + 1)
+        ]
+        records.append({
+            'time': 1010, 'tenant': 'one', 'from_date': 100, 'status': 200,
+            'headers': {}, 'body': json.dumps({'homeworks': [
+                {'id': 1, 'homework_name': 'hw', 'status': 'reviewing'}
+            ], 'current_date': 1100})
+        })
+        result = []
+        thread = threading.Thread(
+            target=lambda: result.append(replay(records)), daemon=True
+        )
+        thread.start()
+        thread.join(10)
+        assert not thread.is_alive(), (
+            'Replay should end when the endpoint fails for many tenants'
+        )
+        assert [text for _, chat, text in result[0].messages
+                if chat == 'one'] == [format_status('hw', 'reviewing')]
@@ -0,0 +1,101 @@
+def make_update(update_id, chat_id, text):
+    return {
+        'update_id': update_id,
+        'message': {'chat': {'id': chat_id}, 'text': text}
+    }
+
+
+class MockBot:
+
+    def __init__(self, updates):
+        self.updates = updates
+        self.calls = []
+
+    def call(self, method, **params):
+        self.calls.append((method, params))
+        updates, self.updates = self.updates, []
+        return updates
+
+
+class TestCommandHandler:
+
+    def make_handler(self, updates=()):
+        from commands import CommandHandler, SnapshotIndex
+        from engine import Tenant
+
+        tenant = Tenant('one', 't1', 42)
+        tenant.snapshot.add(1, 'hw1', 'approved')
+        tenant.snapshot.add(2, 'hw2', 'reviewing')
+        tenant.snapshot.add(3, 'Final', 'reviewing')
+        replies = []
+        handler = CommandHandler(
+            MockBot(list(updates)), SnapshotIndex([tenant]),
+            lambda chat_id, text: replies.append((chat_id, text))
+        )
+        return handler, replies
+
+    def test_commands(self):
+        handler, _ = self.make_handler()
+        assert handler.handle(make_update(1, 42, '/list')) == (
+            'Final: reviewing\nhw1: approved\nhw2: reviewing'
+        )
+        assert handler.handle(make_update(2, 42, '/status')) == (
+            'approved: 1\nreviewing: 2'
+        )
+        assert handler.handle(
+            make_update(3, 42, '/status@assistant_bot final')
+        ).startswith('Final: reviewing.'), (
+            'Homework name should be matched case insensitive'
+        )
+        assert 'not tracked' in handler.handle(
+            make_update(4, 42, '/status hw9')
+        )
+        assert handler.handle(make_update(5, 7, '/list')) == (
+            'This chat is not registered.'
+        )
+        assert handler.handle(make_update(6, 42, 'hello')) is None
+
+    def test_get_updates(self):
+        handler, replies = self.make_handler([
+            make_update(10, 42, '/status hw1'),
+            make_update(11, 42, 'text'),
+        ])
+        assert handler.get_updates() == 2
+        assert len(replies) == 1
+        assert replies[0][0] == 42
+        handler.get_updates()
+        method, params = handler.bot.calls[-1]
+        assert method == 'getUpdates'
+        assert params['offset'] == 12, (
+            'Handled updates should be confirmed with offset'
+        )
+
+
+class TestSnapshotIndex:
+
+    def test_update_from_change_events(self):
+        from commands import SnapshotIndex
+        from engine import Tenant
+        from validator import HomeworkRecord
+
+        tenant = Tenant('one', 't1', 42)
+        tenant.snapshot.add_legacy('hw1', 'reviewing')
+        tenant.snapshot.add(2, 'hw2', 'approved')
+        index = SnapshotIndex([tenant])
+        assert index.find(42, 'HW1') == [('hw1', 'reviewing')]
+        assert index.counts(42) == {'approved': 1, 'reviewing': 1}
+
+        events = tenant.snapshot.diff([
+            HomeworkRecord(1, 'hw1', 'approved', None, None, None),
+            HomeworkRecord(3, 'hw3', 'rejected', None, None, None),
+        ])
+        index.update(tenant, events, tenant.snapshot.evict(float('inf')))
+        assert index.find(42, 'hw1') == [], (
+            'Evicted homework should be removed from the index'
+        )
+        assert index.find(42, 'hw3') == [('hw3', 'rejected')], (
+            'New homework should be indexed by name'
+        )
+        assert index.counts(42) == {'rejected': 1}, (
+            'Legacy entry should be replaced by the id keyed one'
+        )
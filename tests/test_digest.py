@@ -0,0 +1,143 @@
+class MockClient:
+
+    def __init__(self, errors=None):
+        self.calls = []
+        self.errors = errors or {}
+
+    def call(self, method, **params):
+        self.calls.append((method, params))
+        error = self.errors.pop(method, None)
+        if error is not None:
+            raise error
+        if method == 'sendMessage':
+            return {'message_id': len(self.calls)}
+        return True
+
+
+def make_service(client, store=None):
+    from commands import SnapshotIndex
+    from digest import DigestService
+    from engine import Tenant
+
+    tenant = Tenant('one', 't1', 1)
+    tenant.snapshot.add(1, 'hw1', 'approved')
+    tenant.snapshot.add(2, 'hw2', 'reviewing')
+    now = [0.0]
+    service = DigestService(
+        client, SnapshotIndex([tenant]), store, window=60,
+        clock=lambda: now[0]
+    )
+    return service, now
+
+
+class TestDigestService:
+
+    def test_coalesce_and_edit(self, tmp_path):
+        from storage import SQLiteStateStore
+
+        store = SQLiteStateStore(str(tmp_path / 'state.sqlite3'))
+        client = MockClient()
+        service, now = make_service(client, store)
+        service.add(1, 'first change')
+        service.add(1, 'second change')
+        assert service.due() == {}, 'Window should not end yet'
+        now[0] = 60
+        for chat_id, pending in service.due().items():
+            assert service.flush(chat_id, pending)
+        assert [method for method, _ in client.calls] == [
+            'sendMessage', 'pinChatMessage'
+        ], 'Changes of a window should be sent as one pinned summary'
+        text = client.calls[0][1]['text']
+        assert 'hw2' in text and 'second change' in text
+
+        service.add(1, 'third change')
+        service.flush_all()
+        assert client.calls[-1][0] == 'editMessageText', (
+            'Pinned summary should be edited in place'
+        )
+        assert client.calls[-1][1]['message_id'] == 1
+        assert store.load_digest_messages() == {'1': 1}, (
+            'Pinned message id should be saved'
+        )
+        store.close()
+
+    def test_deleted_summary_and_failures(self):
+        from exceptions import TelegramApiException
+
+        client = MockClient()
+        service, now = make_service(client)
+        service._messages['1'] = 7
+        client.errors['editMessageText'] = TelegramApiException(
+            'Bad Request: message to edit not found (400)'
+        )
+        service.add(1, 'change')
+        service.flush_all()
+        assert [method for method, _ in client.calls] == [
+            'editMessageText', 'sendMessage', 'pinChatMessage'
+        ], 'Deleted summary should be sent again'
+
+        client.errors['editMessageText'] = TelegramApiException(
+            'Internal error (500)'
+        )
+        service.add(1, 'lost change')
+        service.flush_all()
+        now[0] = 60
+        pending = service.due()['1']
+        assert pending.changes == ['lost change'], (
+            'Failed update should be retried in the next window'
+        )
+
+    def test_unexpected_failure_is_retried(self):
+        import sqlite3
+
+        client = MockClient({'sendMessage': KeyError('message_id')})
+        service, now = make_service(client)
+        service.add(1, 'change')
+        now[0] = 60
+        [(chat_id, pending)] = service.due().items()
+        assert not service.flush(chat_id, pending), (
+            'Unexpected failure should not escape the service'
+        )
+
+        class FailingStore:
+
+            def save_digest_message(self, chat_id, message_id):
+                raise sqlite3.OperationalError('database is locked')
+
+        service.store = FailingStore()
+        now[0] = 120
+        [(chat_id, pending)] = service.due().items()
+        assert pending.changes == ['change'], (
+            'Failed update should be retried in the next window'
+        )
+        assert not service.flush(chat_id, pending)
+        now[0] = 180
+        assert service.due()['1'].changes == ['change']
+
+    def test_engine_sends_changes_to_digest(self, monkeypatch):
+        import asyncio
+        from http import HTTPStatus
+
+        import requests
+
+        from engine import PollingEngine, Tenant
+
+        class MockResponse:
+            status_code = HTTPStatus.OK
+
+            def json(self):
+                return {'homeworks': [{
+                    'id': 1, 'homework_name': 'hw', 'status': 'approved'
+                }], 'current_date': 100}
+
+        monkeypatch.setattr(
+            requests, 'get', lambda *args, **kwargs: MockResponse()
+        )
+        client = MockClient()
+        service, _ = make_service(client)
+        engine = PollingEngine(
+            [Tenant('one', 't1', 1)], client, digest=service
+        )
+        asyncio.run(engine.run_cycle())
+        assert client.calls == [], 'Change should not be sent right away'
+        assert len(service.due(force=True)['1'].changes) == 1
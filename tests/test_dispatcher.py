@@ -0,0 +1,98 @@
+import asyncio
+
+from exceptions import TelegramRetryAfterException
+
+
+class FloodBot:
+
+    def __init__(self, floods=1):
+        self.floods = floods
+        self.messages = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        if self.floods:
+            self.floods -= 1
+            raise TelegramRetryAfterException('Flood', 0.05)
+        self.messages.append((chat_id, text))
+
+
+class TestTokenBucket:
+
+    def test_reserve(self):
+        from dispatcher import TokenBucket
+
+        now = [0.0]
+        bucket = TokenBucket(2, capacity=2, clock=lambda: now[0])
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 0
+        assert bucket.reserve() == 0.5, (
+            'Third reservation should wait for the next token'
+        )
+        assert bucket.reserve() == 1.0
+        now[0] = 2.0
+        assert bucket.reserve() == 0
+        assert not bucket.is_full()
+
+
+class TestDispatcher:
+
+    def test_retry_after_and_order(self):
+        from dispatcher import Dispatcher
+        from metrics import DISPATCH_RETRIED, DISPATCH_SENT
+
+        sent, retried = DISPATCH_SENT.value(), DISPATCH_RETRIED.value()
+        bot = FloodBot(floods=1)
+        dispatcher = Dispatcher(bot, global_rate=100, chat_rate=100)
+        done = []
+
+        async def run():
+            dispatcher.start()
+            for number in range(3):
+                dispatcher.submit(1, f'message {number}')
+            dispatcher.submit(2, 'other chat', done.append)
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if len(bot.messages) == 4:
+                    break
+            stats = dispatcher.stats()
+            await dispatcher.stop()
+            return stats
+
+        stats = asyncio.run(run())
+        assert len(bot.messages) == 4, (
+            'Message should be sent again after flood control pause'
+        )
+        assert stats['sent'] == 4
+        assert done == [True], 'Sent message callback should be called'
+        assert DISPATCH_SENT.value() - sent == 4, (
+            'Sent messages should be counted in metrics'
+        )
+        assert DISPATCH_RETRIED.value() - retried == 1
+        assert stats['retried'] == 1
+        assert stats['queue_depth'] == 0
+        assert stats['throughput'] > 0
+
+    def test_send_times_are_trimmed(self, monkeypatch):
+        import dispatcher as dispatcher_module
+
+        monkeypatch.setattr(dispatcher_module, 'THROUGHPUT_WINDOW', 0)
+        bot = FloodBot(floods=0)
+        dispatcher = dispatcher_module.Dispatcher(
+            bot, global_rate=100, chat_rate=100
+        )
+
+        async def run():
+            dispatcher.start()
+            for number in range(5):
+                dispatcher.submit(number, f'message {number}')
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if len(bot.messages) == 5:
+                    break
+            await dispatcher.stop()
+
+        asyncio.run(run())
+        assert len(bot.messages) == 5
+        assert len(dispatcher._sent_times) <= 1, (
+            'Send times out of the window should be dropped on send'
+        )
@@ -0,0 +1,262 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from http import HTTPStatus
+
+import requests
+
+from utils import MockBot, MockResponse
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BLOCKED_POLL = (
+    'import asyncio, time\n'
+    'from engine import PollingEngine, Tenant\n'
+    'def blocked_get(*args, **kwargs):\n'
+    '    print("polling", flush=True)\n'
+    '    time.sleep(60)\n'
+    'engine = PollingEngine(\n'
+    '    [Tenant("one", "t1", 1)], None, get=blocked_get,\n'
+    '    shutdown_timeout=0.5\n'
+    ')\n'
+    'async def main():\n'
+    '    task = asyncio.get_running_loop().create_task(engine.run())\n'
+    '    await asyncio.sleep(0.2)\n'
+    '    engine.poll_now()\n'
+    '    await asyncio.sleep(0.2)\n'
+    '    engine.stop()\n'
+    '    await task\n'
+    'asyncio.run(main())\n'
+)
+
+
+class TestPollingEngine:
+
+    def test_load_tenants(self, tmp_path):
+        from engine import load_tenants
+
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([
+            {'name': 'one', 'practicum_token': 't1', 'chat_id': 1},
+            {'name': 'two', 'practicum_token': 't2', 'chat_id': 2},
+        ]))
+        tenants = load_tenants(str(path))
+        assert [tenant.name for tenant in tenants] == ['one', 'two'], (
+            'Tenants should be loaded in file order'
+        )
+        assert tenants[1].headers['Authorization'] == 'OAuth t2', (
+            'Tenant should build own `Authorization` header'
+        )
+
+    def test_cycle_tracks_tenants_separately(self, monkeypatch,
+                                             random_timestamp):
+        from engine import PollingEngine, Tenant
+
+        statuses = {'OAuth t1': 'reviewing', 'OAuth t2': 'approved'}
+
+        def mock_get(url, params=None, headers=None, **kwargs):
+            status = statuses[headers['Authorization']]
+            return MockResponse({
+                'homeworks': [{'homework_name': 'hw1', 'status': status}],
+                'current_date': random_timestamp
+            })
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        tenants = [Tenant('one', 't1', 1), Tenant('two', 't2', 2)]
+        bot = MockBot()
+        engine = PollingEngine(tenants, bot, concurrency=2)
+
+        asyncio.run(engine.run_cycle())
+        assert sorted(chat for chat, _ in bot.messages) == [1, 2], (
+            'Every tenant should get own status message'
+        )
+        assert tenants[0].snapshot.statuses() == [('hw1', 'reviewing')]
+        assert tenants[1].snapshot.statuses() == [('hw1', 'approved')]
+        assert tenants[0].current_timestamp == random_timestamp, (
+            'Tenant timestamp should be updated from `current_date`'
+        )
+
+        asyncio.run(engine.run_cycle())
+        assert len(bot.messages) == 2, (
+            'Unchanged statuses should not be sent again'
+        )
+
+    def test_cycle_reports_error_once(self, monkeypatch):
+        from engine import PollingEngine, Tenant
+
+        def mock_get(*args, **kwargs):
+            return MockResponse({}, HTTPStatus.INTERNAL_SERVER_ERROR)
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        tenant = Tenant('one', 't1', 1, current_timestamp=100)
+        bot = MockBot()
+        engine = PollingEngine([tenant], bot, concurrency=1)
+
+        asyncio.run(engine.run_cycle())
+        assert len(bot.messages) == 1, (
+            'Api failure should be reported to tenant chat'
+        )
+        assert tenant.current_timestamp == 100, (
+            'Tenant timestamp should not change after failure'
+        )
+
+        asyncio.run(engine.run_cycle())
+        assert len(bot.messages) == 1, (
+            'Repeated api failure should not be reported again'
+        )
+
+
+    def test_evict_once_per_interval(self):
+        from engine import EVICTION_INTERVAL, PollingEngine, Tenant
+        from validator import HomeworkRecord
+
+        tenant = Tenant('one', 't1', 1)
+        tenant.snapshot.diff([
+            HomeworkRecord(1, 'hw', 'approved', None, None, None)
+        ], now=100)
+        engine = PollingEngine([tenant], MockBot(), retention=50)
+        assert engine.evict(tenant, now=120) == [], (
+            'Homework should be kept within retention'
+        )
+        assert engine.evict(tenant, now=200) == [], (
+            'Eviction should run once per interval'
+        )
+        assert engine.evict(tenant, now=120 + EVICTION_INTERVAL) == [1]
+        assert engine.homework_bytes() == 0
+
+
+class TestShutdown:
+
+    def make_engine(self, monkeypatch, requests_made):
+        from dispatcher import Dispatcher
+        from engine import PollingEngine, Tenant
+        from scheduler import AdaptiveScheduler
+
+        def mock_get(url, params=None, headers=None, **kwargs):
+            requests_made.append(params['from_date'])
+            return MockResponse({
+                'homeworks': [{
+                    'id': len(requests_made), 'homework_name': 'hw',
+                    'status': 'reviewing'
+                }],
+                'current_date': 100
+            })
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        bot = MockBot()
+        # Zero random value: no first poll delay
+        scheduler = AdaptiveScheduler(600, 600, 3600, 600, rand=lambda: 0.0)
+        engine = PollingEngine(
+            [Tenant('one', 't1', 1)], bot, scheduler=scheduler,
+            dispatcher=Dispatcher(bot, global_rate=100, chat_rate=100),
+            concurrency=1, shutdown_timeout=2
+        )
+        return engine, bot
+
+    def test_poll_now_and_stop(self, monkeypatch):
+        requests_made = []
+        engine, bot = self.make_engine(monkeypatch, requests_made)
+
+        async def run():
+            task = asyncio.get_running_loop().create_task(engine.run())
+            while not requests_made:
+                await asyncio.sleep(0.01)
+            engine.poll_now()
+            while len(requests_made) < 2:
+                await asyncio.sleep(0.01)
+            engine.stop()
+            await asyncio.wait_for(task, 2)
+
+        asyncio.run(run())
+        assert len(requests_made) == 2, (
+            'poll_now() should poll without waiting for the interval'
+        )
+        assert len(bot.messages) == 2, (
+            'Queued messages should be sent before engine stops'
+        )
+
+    def test_signals(self, monkeypatch):
+        import os
+        import signal
+
+        requests_made = []
+        engine, _ = self.make_engine(monkeypatch, requests_made)
+
+        async def run():
+            task = asyncio.get_running_loop().create_task(
+                engine.run(handle_signals=True)
+            )
+            while not requests_made:
+                await asyncio.sleep(0.01)
+            os.kill(os.getpid(), signal.SIGUSR1)
+            while len(requests_made) < 2:
+                await asyncio.sleep(0.01)
+            os.kill(os.getpid(), signal.SIGTERM)
+            await asyncio.wait_for(task, 2)
+
+        asyncio.run(run())
+        assert len(requests_made) == 2, (
+            'SIGUSR1 should poll right away, SIGTERM should stop engine'
+        )
+
+    def test_blocked_poll_does_not_delay_exit(self, tmp_path):
+        start = time.monotonic()
+        output = subprocess.run(
+            [sys.executable, '-c', BLOCKED_POLL], cwd=str(tmp_path),
+            env=dict(os.environ, PYTHONPATH=ROOT_DIR), check=True,
+            stdout=subprocess.PIPE, universal_newlines=True, timeout=30
+        ).stdout
+        assert 'polling' in output
+        assert time.monotonic() - start < 10, (
+            'Process should exit at shutdown timeout, not after the poll'
+        )
+
+
+class TestResponseCaching:
+
+    def test_failed_save_payload_is_decoded_again(self, tmp_path):
+        import sqlite3
+
+        from cache import ResponseCache
+        from engine import PollingEngine, Tenant
+        from storage import SQLiteStateStore
+
+        def mock_get(url, params=None, headers=None, **kwargs):
+            return MockResponse({
+                'homeworks': [{
+                    'id': 1, 'homework_name': 'hw1', 'status': 'reviewing'
+                }],
+                'current_date': 200
+            })
+
+        store = SQLiteStateStore(str(tmp_path / 'state.sqlite3'))
+        save = store.save
+        failures = [sqlite3.OperationalError('database is locked')]
+
+        def flaky_save(*args, **kwargs):
+            if failures:
+                raise failures.pop()
+            return save(*args, **kwargs)
+
+        store.save = flaky_save
+        tenant = Tenant('one', 't1', 1, current_timestamp=100)
+        bot = MockBot()
+        engine = PollingEngine(
+            [tenant], bot, store=store, cache=ResponseCache(), get=mock_get
+        )
+        _, error = engine.poll_tenant(tenant)
+        assert isinstance(error, sqlite3.OperationalError)
+        assert [text for chat, text in bot.messages if 'hw1' in text] == []
+
+        changes, error = engine.poll_tenant(tenant)
+        assert error is None and len(changes) == 1, (
+            'Same payload of the failed poll should not be a cache hit'
+        )
+        assert len([text for _, text in bot.messages if 'hw1' in text]) == 1
+        assert engine.poll_tenant(tenant) == ([], None)
+        assert engine.cache.stats()['hits'] == 1, (
+            'Processed payload should be cached'
+        )
+        store.close()
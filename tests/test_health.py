@@ -0,0 +1,160 @@
+import asyncio
+import threading
+
+import requests
+
+from utils import MockBot, MockResponse
+
+
+class TestWatchdog:
+
+    def test_stalled_stage(self):
+        from health import Watchdog
+
+        now = [0.0]
+        stalled = []
+        watchdog = Watchdog(
+            timeout=10, on_stall=stalled.append, clock=lambda: now[0]
+        )
+        watchdog.loop_beat()
+        watchdog.enter('one', 'wait', 100)
+        watchdog.enter('two', 'get_api_answer')
+        watchdog.leave('one')
+        now[0] = 50
+        watchdog.loop_beat()
+        assert watchdog.check() == ['two'], (
+            'Stage running past timeout should be stalled'
+        )
+        assert watchdog.check() == [], 'Stall should be reported once'
+        assert stalled == ['two']
+        report = watchdog.health()
+        assert report['status'] == 'stalled'
+        assert report['tenants']['one']['last_success'] is not None
+        watchdog.enter('two', 'wait', 100)
+        assert watchdog.health()['status'] == 'ok', (
+            'Next stage should clear the stall'
+        )
+        now[0] = 200
+        watchdog.check()
+        assert watchdog.health()['status'] == 'stalled', (
+            'Event loop without beats should be stalled'
+        )
+
+    def test_health_endpoint(self):
+        from metrics import Registry, start_http_server
+
+        server = start_http_server(
+            0, '127.0.0.1', registry=Registry(),
+            health=lambda: {'status': 'stalled'}
+        )
+        url = f'http://127.0.0.1:{server.server_address[1]}'
+        try:
+            response = requests.get(url + '/health')
+            assert response.status_code == 503
+            assert response.json() == {'status': 'stalled'}
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+class TestEngineRestarts:
+
+    def make_engine(self, monkeypatch, get, watchdog=None):
+        from engine import PollingEngine, Tenant
+        from scheduler import AdaptiveScheduler
+
+        monkeypatch.setattr(requests, 'get', get)
+        scheduler = AdaptiveScheduler(
+            600, 0.01, 3600, 600, rand=lambda: 0.0
+        )
+        return PollingEngine(
+            [Tenant('one', 't1', 1)], MockBot(), scheduler=scheduler,
+            concurrency=1, watchdog=watchdog
+        )
+
+    def test_failed_task_is_restarted(self, monkeypatch):
+        polls = []
+
+        def mock_get(*args, **kwargs):
+            polls.append(1)
+            return MockResponse({'homeworks': [], 'current_date': 100})
+
+        engine = self.make_engine(monkeypatch, mock_get)
+
+        def next_interval(tenant, changes=None, error=None):
+            if len(polls) == 1:
+                raise RuntimeError('Scheduler failure')
+            engine.stop()
+            return 600
+
+        engine.scheduler.next_interval = next_interval
+        asyncio.run(asyncio.wait_for(engine.run(), 5))
+        assert len(polls) == 2, (
+            'Tenant task should be restarted after unexpected failure'
+        )
+
+    def test_stalled_poll_is_restarted(self, monkeypatch):
+        from health import Watchdog
+
+        polls = []
+        release = threading.Event()
+        finished = threading.Event()
+
+        def mock_get(*args, **kwargs):
+            polls.append(1)
+            status = 'approved'
+            if len(polls) == 1:
+                # Stalled request returns outdated status after restart
+                release.wait(5)
+                status = 'reviewing'
+            return MockResponse({'homeworks': [{
+                'id': 1, 'homework_name': 'hw', 'status': status
+            }], 'current_date': 100})
+
+        class Bot:
+
+            def __init__(self):
+                self.messages = []
+
+            def send_message(self, chat_id=None, text=None, **kwargs):
+                self.messages.append(text)
+
+        watchdog = Watchdog(timeout=0.1, interval=0.02)
+        engine = self.make_engine(monkeypatch, mock_get, watchdog)
+        engine.bot = Bot()
+        engine.poll_deadline = 0.05
+        poll_tenant = engine.poll_tenant
+
+        def tracked_poll(tenant, generation=None):
+            try:
+                return poll_tenant(tenant, generation)
+            finally:
+                if generation == 0:
+                    finished.set()
+
+        engine.poll_tenant = tracked_poll
+
+        async def run():
+            task = asyncio.get_running_loop().create_task(engine.run())
+            while not engine.bot.messages:
+                await asyncio.sleep(0.01)
+            release.set()
+            await asyncio.get_running_loop().run_in_executor(
+                None, finished.wait, 5
+            )
+            engine.stop()
+            await asyncio.wait_for(task, 5)
+
+        try:
+            asyncio.run(asyncio.wait_for(run(), 5))
+        finally:
+            release.set()
+        assert len(polls) == 2, (
+            'Stalled poll should be restarted with concurrency 1'
+        )
+        assert len(engine.bot.messages) == 1, (
+            'Result of the stalled poll should be dropped'
+        )
+        assert 'approved' in engine.bot.messages[0]
+        tenant = engine.tenants[0]
+        assert tenant.snapshot.statuses() == [('hw', 'approved')]
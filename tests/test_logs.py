@@ -0,0 +1,43 @@
+import gzip
+import json
+import logging
+import queue
+
+
+class TestLogs:
+
+    def test_json_formatter(self):
+        from logs import JsonFormatter
+
+        record = logging.LogRecord(
+            'assistant_bot', logging.INFO, __file__, 10,
+            'Message sent to telegram: %s.', ('text',), None
+        )
+        data = json.loads(JsonFormatter().format(record))
+        assert data['message'] == 'Message sent to telegram: text.'
+        assert data['level'] == 'INFO'
+
+    def test_deferred_queue_handler_keeps_args(self):
+        from logs import DeferredQueueHandler
+
+        log_queue = queue.SimpleQueue()
+        handler = DeferredQueueHandler(log_queue)
+        record = logging.LogRecord(
+            'assistant_bot', logging.INFO, __file__, 10, '%s', ('text',), None
+        )
+        handler.handle(record)
+        queued = log_queue.get_nowait()
+        assert queued.args == ('text',), (
+            'Message should be formatted by the listener thread'
+        )
+
+    def test_gzip_rotator(self, tmp_path):
+        from logs import gzip_namer, gzip_rotator
+
+        source = tmp_path / 'main.log'
+        source.write_text('line\n')
+        dest = gzip_namer(str(source) + '.1')
+        gzip_rotator(str(source), dest)
+        assert not source.exists()
+        with gzip.open(dest, 'rt') as file:
+            assert file.read() == 'line\n'
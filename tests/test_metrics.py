@@ -0,0 +1,49 @@
+import requests
+
+
+class TestMetrics:
+
+    def test_render(self):
+        from metrics import Counter, Gauge, Histogram, Registry
+
+        registry = Registry()
+        counter = Counter(
+            'test_errors', 'Errors.', ('exception',), registry=registry
+        )
+        gauge = Gauge('test_tenants', 'Tenants.', registry=registry)
+        histogram = Histogram(
+            'test_seconds', 'Time.', buckets=(0.1, 1), registry=registry
+        )
+        counter.inc(labels=('KeyError',))
+        counter.inc(labels=('KeyError',))
+        gauge.set_function(lambda: 3)
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+
+        text = registry.render()
+        assert '# TYPE test_errors counter' in text
+        assert 'test_errors_total{exception="KeyError"} 2' in text
+        assert 'test_tenants 3' in text
+        assert 'test_seconds_bucket{le="0.1"} 1' in text
+        assert 'test_seconds_bucket{le="1"} 2' in text, (
+            'Histogram buckets should be cumulative'
+        )
+        assert 'test_seconds_bucket{le="+Inf"} 3' in text
+        assert 'test_seconds_count 3' in text
+
+    def test_http_server(self):
+        from metrics import Gauge, Registry, start_http_server
+
+        registry = Registry()
+        Gauge('test_tenants', 'Tenants.', registry=registry).set(5)
+        server = start_http_server(0, '127.0.0.1', registry=registry)
+        url = f'http://127.0.0.1:{server.server_address[1]}'
+        try:
+            response = requests.get(url + '/metrics')
+            assert response.status_code == 200
+            assert 'test_tenants 5' in response.text
+            assert requests.get(url + '/other').status_code == 404
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,194 @@
+from utils import MockResponse
+
+
+class MockDispatcher:
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, chat_id, text, on_done=None):
+        self.submitted.append((chat_id, text, on_done))
+
+
+def make_store(tmp_path):
+    from storage import SQLiteStateStore
+
+    return SQLiteStateStore(str(tmp_path / 'state.sqlite3'))
+
+
+class TestOutbox:
+
+    def test_save_and_deliver(self, tmp_path):
+        from outbox import Outbox, OutboxMessage
+
+        store = make_store(tmp_path)
+        store.save('one', 100, [], messages=[
+            OutboxMessage('one:1:1', 'one', 1, 'first', 10),
+            OutboxMessage('one:2:1', 'one', 1, 'second', 20),
+        ])
+        store.save('one', 200, [], messages=[
+            OutboxMessage('one:1:1', 'one', 1, 'first again', 30),
+            OutboxMessage('two:1:1', 'two', 2, 'other tenant', 30),
+        ])
+        assert [message.text for message in store.load_outbox({'one'})] == [
+            'first', 'second'
+        ], 'Saved key should not be queued twice'
+
+        dispatcher = MockDispatcher()
+        now = [50.0]
+        outbox = Outbox(
+            store, dispatcher, tenants=None, clock=lambda: now[0]
+        )
+        assert outbox.replay() == 3, 'Undelivered messages should be sent'
+        assert outbox.replay() == 0, (
+            'Messages waiting in the dispatcher should not be sent again'
+        )
+        assert outbox.size() == 3 and outbox.oldest_age() == 40, (
+            'Outbox size and age of the oldest message should be reported'
+        )
+
+        first, second, _ = dispatcher.submitted
+        first[2](True)
+        second[2](False)
+        outbox.flush()
+        assert [message.key for message in store.load_outbox()] == [
+            'one:2:1', 'two:1:1'
+        ], 'Delivered message should be deleted'
+        assert outbox.size() == 2 and outbox.oldest_age() == 30
+        assert outbox.replay() == 1, (
+            'Message given up by the dispatcher should be sent again'
+        )
+        assert dispatcher.submitted[-1][1] == 'second'
+        store.close()
+
+    def test_engine_saves_messages_with_state(self, tmp_path):
+        from engine import PollingEngine, Tenant
+        from outbox import Outbox
+
+        def mock_get(url, params=None, headers=None, **kwargs):
+            return MockResponse({
+                'homeworks': [{
+                    'id': 1, 'homework_name': 'hw1', 'status': 'reviewing'
+                }],
+                'current_date': 200
+            })
+
+        store = make_store(tmp_path)
+        tenants = [Tenant('one', 't1', 1, current_timestamp=100)]
+        dispatcher = MockDispatcher()
+        engine = PollingEngine(
+            tenants, bot=None, store=store, get=mock_get,
+            outbox=Outbox(store, dispatcher, tenants)
+        )
+        changes, error = engine.poll_tenant(tenants[0])
+        assert error is None and len(changes) == 1
+        assert len(dispatcher.submitted) == 1, (
+            'Change message should be queued after the state is saved'
+        )
+        [message] = store.load_outbox()
+        assert message.chat_id == 1 and 'hw1' in message.text, (
+            'Change message should be saved with the tenant state'
+        )
+        store.close()
+
+        # Restart before delivery: message is sent again on start
+        store = make_store(tmp_path)
+        dispatcher = MockDispatcher()
+        restarted = [Tenant('one', 't1', 1)]
+        engine = PollingEngine(
+            restarted, bot=None, store=store, get=mock_get,
+            outbox=Outbox(store, dispatcher, restarted)
+        )
+        engine.restore()
+        assert engine.poll_tenant(restarted[0])[0] == [], (
+            'Restored snapshot should have the change'
+        )
+        assert engine.outbox.replay() == 1
+        assert dispatcher.submitted[0][1] == message.text
+        store.close()
+
+    def test_failed_save_keeps_changes(self, tmp_path):
+        import sqlite3
+
+        from engine import PollingEngine, Tenant
+        from outbox import Outbox
+
+        current_dates = iter((101, 102))
+
+        def mock_get(url, params=None, headers=None, **kwargs):
+            return MockResponse({
+                'homeworks': [{
+                    'id': 1, 'homework_name': 'hw1', 'status': 'reviewing'
+                }],
+                'current_date': next(current_dates)
+            })
+
+        store = make_store(tmp_path)
+        save = store.save
+        failures = [sqlite3.OperationalError('database is locked')]
+
+        def flaky_save(*args, **kwargs):
+            if failures:
+                raise failures.pop()
+            return save(*args, **kwargs)
+
+        store.save = flaky_save
+        tenants = [Tenant('one', 't1', 1, current_timestamp=100)]
+        dispatcher = MockDispatcher()
+        engine = PollingEngine(
+            tenants, bot=None, store=store, get=mock_get,
+            outbox=Outbox(store, dispatcher, tenants)
+        )
+        _, error = engine.poll_tenant(tenants[0])
+        assert error is not None and dispatcher.submitted == []
+        assert tenants[0].current_timestamp == 100 and (
+            len(tenants[0].snapshot) == 0
+        ), 'Failed save should keep the memory state'
+
+        changes, error = engine.poll_tenant(tenants[0])
+        assert error is None and len(changes) == 1, (
+            'Changes of the failed save should be found again'
+        )
+        assert len(store.load_outbox()) == 1
+        assert len(dispatcher.submitted) == 1
+        assert store.load_all()['one'].current_timestamp == 102
+        store.close()
+
+    def test_run_survives_store_failure(self, tmp_path, monkeypatch):
+        import asyncio
+        import sqlite3
+
+        import outbox as outbox_module
+        from outbox import Outbox, OutboxMessage
+
+        monkeypatch.setattr(outbox_module, 'FLUSH_INTERVAL', 0.01)
+        store = make_store(tmp_path)
+        store.save('one', 100, [], messages=[
+            OutboxMessage('one:1:1', 'one', 1, 'first', 10)
+        ])
+        load_outbox = store.load_outbox
+        failures = [sqlite3.OperationalError('database is locked')]
+
+        def flaky_load_outbox(*args, **kwargs):
+            if failures:
+                raise failures.pop()
+            return load_outbox(*args, **kwargs)
+
+        store.load_outbox = flaky_load_outbox
+        dispatcher = MockDispatcher()
+        outbox = Outbox(store, dispatcher, retry_interval=0.05)
+
+        async def run():
+            task = asyncio.get_running_loop().create_task(outbox.run())
+            for _ in range(200):
+                if dispatcher.submitted:
+                    break
+                await asyncio.sleep(0.01)
+            assert not task.done(), 'Store failure should not end the task'
+            task.cancel()
+
+        asyncio.run(run())
+        assert [text for _, text, _ in dispatcher.submitted] == ['first'], (
+            'Replay should be retried after store failure'
+        )
+        store.close()
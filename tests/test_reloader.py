@@ -0,0 +1,119 @@
+import json
+
+from utils import MockBot
+
+
+def write_tenants(path, tenants):
+    path.write_text(json.dumps([
+        {'name': name, 'practicum_token': token, 'chat_id': chat_id}
+        for name, token, chat_id in tenants
+    ]))
+
+
+class TestConfigReloader:
+
+    def test_update_tenants_keeps_state(self):
+        from cache import ResponseCache
+        from engine import PollingEngine, Tenant
+
+        one, two = Tenant('one', 't1', 1), Tenant('two', 't2', 2)
+        one.snapshot.add(1, 'hw', 'reviewing')
+        engine = PollingEngine([one, two], MockBot(), cache=ResponseCache())
+        added, removed = engine.update_tenants([
+            Tenant('one', 't1-new', 10), Tenant('three', 't3', 3)
+        ])
+        assert (added, removed) == (['three'], ['two'])
+        assert engine.tenants[0] is one, (
+            'Kept tenant should not be re-created'
+        )
+        assert one.snapshot.statuses() == [('hw', 'reviewing')], (
+            'Kept tenant should keep tracked homeworks'
+        )
+        assert (one.chat_id, one.headers['Authorization']) == (
+            10, 'OAuth t1-new'
+        ), 'Changed token and chat id should be updated in place'
+
+    def test_reload_settings_and_tenants(self, tmp_path, monkeypatch):
+        import assistant_bot
+        from commands import SnapshotIndex
+        from engine import PollingEngine, load_tenants
+        from reloader import ConfigReloader
+
+        env_file = tmp_path / '.env'
+        tenants_file = tmp_path / 'tenants.json'
+        write_tenants(tenants_file, [('one', 't1', 1)])
+        monkeypatch.setattr(assistant_bot, 'ENV_FILE', str(env_file))
+        monkeypatch.setattr(assistant_bot, 'TENANTS_FILE', str(tenants_file))
+        for name in ('MIN_POLL_INTERVAL', 'POLL_CONCURRENCY'):
+            monkeypatch.setattr(assistant_bot, name, getattr(
+                assistant_bot, name
+            ))
+            monkeypatch.setenv(name, str(getattr(assistant_bot, name)))
+        env_file.write_text('MIN_POLL_INTERVAL=30\nPOLL_CONCURRENCY=3\n')
+        write_tenants(tenants_file, [('one', 't1', 1), ('two', 't2', 2)])
+
+        engine = PollingEngine(
+            load_tenants(str(tenants_file)), MockBot(), concurrency=2
+        )
+        index = SnapshotIndex(engine.tenants)
+        reloader = ConfigReloader(
+            engine, assistant_bot.load_bot_tenants, index
+        )
+        changed = reloader.reload()
+        assert changed == {'MIN_POLL_INTERVAL': 30, 'POLL_CONCURRENCY': 3}
+        assert engine.scheduler.min_interval == 30
+        assert engine.concurrency == 3
+        assert [tenant.name for tenant in engine.tenants] == ['one', 'two']
+        assert index.tenants(2), 'Commands index should be rebuilt'
+
+        tenants_file.write_text('not json')
+        reloader.reload()
+        assert len(engine.tenants) == 2, (
+            'Invalid tenants file should keep tenants'
+        )
+
+    def test_environment_takes_precedence(self, tmp_path, monkeypatch):
+        import os
+
+        import assistant_bot
+
+        env_file = tmp_path / '.env'
+        monkeypatch.setattr(assistant_bot, 'ENV_FILE', str(env_file))
+        monkeypatch.setattr(
+            assistant_bot, 'ENVIRONMENT_NAMES', frozenset({'RETRY_TIME'})
+        )
+        monkeypatch.setattr(assistant_bot, 'RETRY_TIME', 300)
+        monkeypatch.setattr(assistant_bot, 'POLL_DEADLINE', 30.0)
+        monkeypatch.setenv('RETRY_TIME', '300')
+        monkeypatch.delenv('POLL_DEADLINE', raising=False)
+        env_file.write_text('RETRY_TIME=600\nPOLL_DEADLINE=40\n')
+        assert assistant_bot.reload_settings() == {'POLL_DEADLINE': 40.0}, (
+            'Process environment should take precedence over .env file'
+        )
+        assert 'POLL_DEADLINE' not in os.environ, (
+            'Reload should not change process environment'
+        )
+
+    def test_inconsistent_settings_are_kept(self, tmp_path, monkeypatch):
+        import assistant_bot
+        from engine import PollingEngine, Tenant
+        from reloader import ConfigReloader
+
+        env_file = tmp_path / '.env'
+        monkeypatch.setattr(assistant_bot, 'ENV_FILE', str(env_file))
+        for name in ('MIN_POLL_INTERVAL', 'MAX_POLL_INTERVAL'):
+            monkeypatch.setattr(assistant_bot, name, getattr(
+                assistant_bot, name
+            ))
+            monkeypatch.setenv(name, str(getattr(assistant_bot, name)))
+        env_file.write_text('MIN_POLL_INTERVAL=7200\nMAX_POLL_INTERVAL=60\n')
+        engine = PollingEngine([Tenant('one', 't1', 1)], MockBot())
+        minimum = engine.scheduler.min_interval
+        reloader = ConfigReloader(engine, lambda: engine.tenants)
+        assert reloader.reload() is None, (
+            'Minimum interval over maximum should be rejected'
+        )
+        assert assistant_bot.MIN_POLL_INTERVAL != 7200
+        assert engine.scheduler.min_interval == minimum, (
+            'Previous settings should stay in use'
+        )
@@ -0,0 +1,59 @@
+class TestAdaptiveScheduler:
+
+    def make(self):
+        from scheduler import AdaptiveScheduler
+
+        # Fixed random value 0.5 disables jitter
+        return AdaptiveScheduler(
+            base_interval=600, min_interval=60, max_interval=3600,
+            reviewing_interval=120, rand=lambda: 0.5
+        )
+
+    def test_reviewing_polls_faster(self):
+        from engine import Tenant
+
+        scheduler = self.make()
+        tenant = Tenant('one', 't1', 1)
+        tenant.snapshot.add(1, 'hw1', 'reviewing')
+        assert scheduler.next_interval(tenant) == 120, (
+            'Tenant with homework in review should be polled faster'
+        )
+
+    def test_idle_backoff(self):
+        from engine import Tenant
+
+        scheduler = self.make()
+        tenant = Tenant('one', 't1', 1)
+        tenant.snapshot.add(1, 'hw1', 'approved')
+        intervals = [scheduler.next_interval(tenant) for _ in range(4)]
+        assert intervals == [600, 1200, 2400, 3600], (
+            'Idle tenant should back off exponentially up to max interval'
+        )
+        assert scheduler.next_interval(tenant, {'hw2': 'reviewing'}) == 600
+
+    def test_error_backoff(self):
+        from engine import Tenant
+        from exceptions import ApiEndpointHttpResponseException
+
+        scheduler = self.make()
+        tenant = Tenant('one', 't1', 1)
+        tenant.snapshot.add(1, 'hw1', 'reviewing')
+        error = ApiEndpointHttpResponseException('500')
+        assert scheduler.next_interval(tenant, error=error) == 1200
+        assert scheduler.next_interval(tenant, error=error) == 2400
+        assert scheduler.next_interval(tenant) == 120, (
+            'Successful poll should reset failures backoff'
+        )
+
+    def test_jitter_within_bounds(self):
+        from engine import Tenant
+        from scheduler import AdaptiveScheduler
+
+        tenant = Tenant('one', 't1', 1)
+        for value in (0.0, 0.99):
+            scheduler = AdaptiveScheduler(
+                600, 60, 3600, 120, jitter=0.1, rand=lambda: value
+            )
+            tenant.idle_polls = 0
+            interval = scheduler.next_interval(tenant)
+            assert 540 <= interval <= 660
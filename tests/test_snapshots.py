@@ -0,0 +1,86 @@
+def make_record(homework_id, name, status, comment=None, updated=None):
+    from validator import HomeworkRecord
+
+    return HomeworkRecord(homework_id, name, status, comment, updated, None)
+
+
+class TestSnapshot:
+
+    def test_change_events(self):
+        from snapshots import Snapshot
+
+        snapshot = Snapshot()
+        events = snapshot.diff([
+            make_record(1, 'hw', 'reviewing'),
+            make_record(2, 'hw', 'approved'),
+        ])
+        assert [event.kind for event in events] == ['new', 'new'], (
+            'Homeworks with the same name should be tracked by id'
+        )
+        assert snapshot.diff([make_record(1, 'hw', 'reviewing')]) == [], (
+            'Unchanged homework should not produce events'
+        )
+        events = snapshot.diff([
+            make_record(1, 'hw', 'rejected', 'Fix tests'),
+            make_record(2, 'hw', 'approved', 'Well done'),
+        ])
+        assert [event.kind for event in events] == [
+            'status_changed', 'comment_updated'
+        ]
+        assert events[0].previous_status == 'reviewing'
+        events = snapshot.diff([
+            make_record(1, 'hw', 'rejected', 'Fix tests', '2022-05-01'),
+        ])
+        assert [event.kind for event in events] == ['updated'], (
+            'Other compared fields changes should be tracked'
+        )
+        assert len(snapshot) == 2
+
+    def test_event_message(self):
+        from engine import event_message
+        from snapshots import Snapshot
+
+        snapshot = Snapshot()
+        snapshot.diff([make_record(1, 'hw', 'approved')])
+        event, = snapshot.diff([make_record(1, 'hw', 'approved', 'Good')])
+        assert event_message(event).endswith('"hw": Good'), (
+            'Updated reviewer comment should be sent'
+        )
+        event, = snapshot.diff([
+            make_record(1, 'hw', 'approved', 'Good', '2022-05-01')
+        ])
+        assert event_message(event) is None
+
+    def test_evict_approved(self):
+        from snapshots import Snapshot
+
+        snapshot = Snapshot()
+        snapshot.diff([
+            make_record(1, 'hw1', 'approved'),
+            make_record(2, 'hw2', 'reviewing'),
+        ], now=100)
+        snapshot.diff([make_record(3, 'hw3', 'approved')], now=300)
+        assert snapshot.evict(200) == [1], (
+            'Only approved homeworks unchanged since the time are evicted'
+        )
+        assert sorted(name for name, _ in snapshot.statuses()) == [
+            'hw2', 'hw3'
+        ]
+
+    def test_status_codes(self):
+        from snapshots import Snapshot, SnapshotEntry
+
+        snapshot = Snapshot()
+        snapshot.diff([
+            make_record(1, 'hw1', 'approved'),
+            make_record(2, 'hw2', 'unknown'),
+        ])
+        assert snapshot.statuses() == [
+            ('hw1', 'approved'), ('hw2', 'unknown')
+        ], 'Statuses should be restored from codes'
+        entry = SnapshotEntry('hw', 'approved')
+        assert isinstance(entry.code, int)
+        assert not hasattr(entry, '__dict__'), (
+            'Entries should not have instance dict'
+        )
+        assert snapshot.memory_size() > 2 * entry.size()
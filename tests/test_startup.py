@@ -0,0 +1,53 @@
+import os
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHECK_IMPORT = (
+    'import sys, threading\n'
+    'import assistant_bot\n'
+    'print(sorted(name for name in ("requests", "telegram", "asyncio") '
+    'if name in sys.modules), threading.active_count())\n'
+)
+
+RUN_SCRIPT = (
+    'import runpy\n'
+    'import assistant_bot\n'
+    'def run_bot(tenants, *args, **kwargs):\n'
+    '    assistant_bot.PRACTICUM_TOKEN = "new"\n'
+    '    assistant_bot.TELEGRAM_CHAT_ID = "2"\n'
+    '    [tenant] = assistant_bot.load_bot_tenants()\n'
+    '    print(tenant.practicum_token, tenant.chat_id)\n'
+    'assistant_bot.run_bot = run_bot\n'
+    'runpy.run_path(assistant_bot.__file__, run_name="__main__")\n'
+)
+
+
+class TestStartup:
+
+    def test_import_is_lazy(self, tmp_path):
+        output = subprocess.run(
+            [sys.executable, '-c', CHECK_IMPORT], cwd=str(tmp_path),
+            env=dict(os.environ, PYTHONPATH=ROOT_DIR), check=True,
+            stdout=subprocess.PIPE, universal_newlines=True
+        ).stdout
+        assert output.strip() == '[] 1', (
+            'Import should not load heavy modules or start logging thread'
+        )
+        assert not (tmp_path / 'main.log').exists(), (
+            'Import should not open log file'
+        )
+
+    def test_script_uses_reloaded_settings(self, tmp_path):
+        output = subprocess.run(
+            [sys.executable, '-c', RUN_SCRIPT], cwd=str(tmp_path),
+            env=dict(
+                os.environ, PYTHONPATH=ROOT_DIR, PRACTICUM_TOKEN='old',
+                TELEGRAM_TOKEN='bot', TELEGRAM_CHAT_ID='1', WORKERS='1'
+            ), check=True, stdout=subprocess.PIPE, universal_newlines=True,
+            timeout=30
+        ).stdout
+        assert output.strip() == 'new 2', (
+            'Script should run the imported module, settings changed by '
+            'config reload should be used'
+        )
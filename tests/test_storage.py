@@ -0,0 +1,124 @@
+import pytest
+
+
+def make_record(homework_id, name, status, comment=None):
+    from validator import HomeworkRecord
+
+    return HomeworkRecord(homework_id, name, status, comment, None, None)
+
+
+class TestSQLiteStateStore:
+
+    def test_save_and_load(self, tmp_path):
+        from snapshots import Snapshot
+        from storage import SQLiteStateStore
+
+        path = str(tmp_path / 'state.sqlite3')
+        store = SQLiteStateStore(path)
+        snapshot = Snapshot()
+        store.save('one', 100, snapshot.diff([
+            make_record(1, 'hw1', 'reviewing'),
+            make_record(2, 'hw2', 'approved'),
+        ]))
+        store.save('one', 200, snapshot.diff([
+            make_record(1, 'hw1', 'approved')
+        ]))
+        store.save('two', 300, [])
+        store.close()
+
+        store = SQLiteStateStore(path)
+        states = store.load_all()
+        assert states['one'].current_timestamp == 200, (
+            'Last saved timestamp should be loaded'
+        )
+        assert sorted(states['one'].snapshot.statuses()) == [
+            ('hw1', 'approved'), ('hw2', 'approved')
+        ], (
+            'Changed homeworks should be merged into saved snapshot'
+        )
+        assert states['one'].snapshot.diff([
+            make_record(1, 'hw1', 'approved')
+        ]) == [], 'Loaded snapshot should keep field hashes'
+        assert states['two'].snapshot.statuses() == []
+        mode = store._connection.execute('PRAGMA journal_mode').fetchone()
+        assert mode[0] == 'wal', (
+            'Database should use write-ahead logging'
+        )
+        store.close()
+
+    def test_legacy_statuses(self, tmp_path):
+        import sqlite3
+
+        from storage import SQLiteStateStore
+
+        path = str(tmp_path / 'state.sqlite3')
+        connection = sqlite3.connect(path)
+        connection.execute(
+            'CREATE TABLE homeworks (tenant TEXT, name TEXT, status TEXT)'
+        )
+        connection.execute(
+            "INSERT INTO homeworks VALUES ('one', 'hw1', 'reviewing')"
+        )
+        connection.commit()
+        connection.close()
+
+        store = SQLiteStateStore(path)
+        snapshot = store.load_all()['one'].snapshot
+        events = snapshot.diff([make_record(7, 'hw1', 'reviewing')])
+        assert [event.kind for event in events] == ['updated'], (
+            'Status saved by name should not be notified again'
+        )
+        store.save('one', 100, events)
+        assert store.load_all()['one'].snapshot.statuses() == [
+            ('hw1', 'reviewing')
+        ], 'Name keyed status should be replaced by id keyed entry'
+        store.close()
+
+    def test_evicted_homeworks(self, tmp_path):
+        from snapshots import Snapshot
+        from storage import SQLiteStateStore
+
+        store = SQLiteStateStore(str(tmp_path / 'state.sqlite3'))
+        snapshot = Snapshot()
+        store.save('one', 100, snapshot.diff([
+            make_record(1, 'hw1', 'approved'),
+            make_record(2, 'hw2', 'reviewing'),
+        ], now=100))
+        restored = store.load_all()['one'].snapshot
+        assert restored.evict(101) == [1], (
+            'Update time should be saved'
+        )
+        store.save('one', 200, [], snapshot.evict(101))
+        assert store.load_all()['one'].snapshot.statuses() == [
+            ('hw2', 'reviewing')
+        ], 'Evicted homeworks should be deleted'
+        store.close()
+
+    def test_engine_restores_state(self, tmp_path):
+        from engine import PollingEngine, Tenant
+        from snapshots import Snapshot
+        from storage import SQLiteStateStore
+
+        store = SQLiteStateStore(str(tmp_path / 'state.sqlite3'))
+        store.save('one', 100, Snapshot().diff([
+            make_record(1, 'hw1', 'reviewing')
+        ]))
+        tenant = Tenant('one', 't1', 1)
+        engine = PollingEngine([tenant], bot=None, store=store)
+        engine.restore()
+        assert tenant.current_timestamp == 100, (
+            'Tenant should continue from saved `current_date`'
+        )
+        assert tenant.snapshot.statuses() == [('hw1', 'reviewing')]
+        store.close()
+
+    def test_partial_store_is_not_created(self):
+        from storage import StateStore
+
+        class PartialStore(StateStore):
+
+            def load_all(self):
+                return {}
+
+        with pytest.raises(TypeError):
+            PartialStore()
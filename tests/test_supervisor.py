@@ -0,0 +1,90 @@
+import sys
+import threading
+import time
+
+
+def report_and_exit(worker, workers, connection):
+    """Worker process target which reports load and crashes."""
+    connection.send(('load', {'tenants': worker + 1, 'polls': 1}))
+    connection.close()
+    sys.exit(1)
+
+
+class MockConnection:
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, data):
+        self.sent.append(data)
+
+
+class TestHashRing:
+
+    def test_balance_and_movement(self):
+        from supervisor import HashRing
+
+        keys = [str(chat_id) for chat_id in range(3000)]
+        three = HashRing(range(3))
+        four = HashRing(range(4))
+        shares = [
+            sum(three.node_for(key) == node for key in keys) / len(keys)
+            for node in range(3)
+        ]
+        assert min(shares) > 0.2, (
+            f'Keys should be spread between nodes: {shares}'
+        )
+        moved = [
+            key for key in keys if three.node_for(key) != four.node_for(key)
+        ]
+        assert all(four.node_for(key) == 3 for key in moved), (
+            'Keys should move only to the added node'
+        )
+        assert len(moved) / len(keys) < 0.4, (
+            'Adding a node should move about a quarter of keys'
+        )
+
+
+class TestSupervisor:
+
+    def test_route(self):
+        from supervisor import Supervisor
+
+        supervisor = Supervisor(3, route_commands=False, metrics_port=None)
+        for worker in supervisor._workers:
+            worker.connection = MockConnection()
+        update = {'update_id': 1, 'message': {'chat': {'id': 42}}}
+        supervisor.route(42, update)
+        worker = supervisor._workers[supervisor.ring.node_for('42')]
+        assert worker.connection.sent == [('update', update)], (
+            'Update should be sent to the worker of the chat'
+        )
+
+    def test_restart_and_status(self):
+        from supervisor import Supervisor
+
+        supervisor = Supervisor(
+            2, target=report_and_exit, route_commands=False,
+            metrics_port=None, restart_delay=0.05, shutdown_timeout=1
+        )
+        thread = threading.Thread(target=supervisor.run)
+        thread.start()
+        try:
+            deadline = time.monotonic() + 30
+            while time.monotonic() < deadline:
+                status = supervisor.status()
+                restarted = all(
+                    worker['restarts'] >= 1 for worker in status['workers']
+                )
+                if restarted and status['total']['tenants'] == 3:
+                    break
+                time.sleep(0.05)
+        finally:
+            supervisor.stop()
+            thread.join(10)
+        assert all(
+            worker['restarts'] >= 1 for worker in status['workers']
+        ), 'Crashed workers should be restarted'
+        assert status['total']['tenants'] == 3, (
+            'Workers load reports should be summed up'
+        )
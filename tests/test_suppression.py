@@ -0,0 +1,92 @@
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestErrorSuppressor:
+
+    def test_fingerprint_masks_volatile_parts(self):
+        from suppression import fingerprint
+
+        first = fingerprint(KeyError('Parameters: from_date 1650000000'))
+        second = fingerprint(KeyError('Parameters: from_date 1650000600'))
+        assert first == second, (
+            'Errors differing by timestamp should share fingerprint'
+        )
+        assert fingerprint(KeyError('a')) != fingerprint(ValueError('a')), (
+            'Fingerprint should include error class'
+        )
+
+    def test_repeats_are_summarized(self):
+        from suppression import ErrorSuppressor
+
+        clock = FakeClock()
+        suppressor = ErrorSuppressor(window=3600, clock=clock)
+        assert suppressor.notification('one', ValueError('down')) == (
+            'Program failure: down'
+        )
+        for _ in range(4):
+            clock.now += 60
+            assert suppressor.notification('one', ValueError('down')) is None
+        assert suppressor.notification('two', ValueError('down')), (
+            'Errors of other tenants should not be suppressed'
+        )
+        assert suppressor.due() == [], 'Window should not end yet'
+        clock.now = 3600
+        assert suppressor.due() == [(
+            'one', 'Program failure: down (5 occurrences in the last hour).'
+        )], 'Summary should be sent when the window ends'
+        assert suppressor.due() == []
+        clock.now += 7200
+        assert suppressor.notification('one', ValueError('down')) == (
+            'Program failure: down'
+        ), 'Error after the window should start a new window'
+        clock.now += 3600
+        assert suppressor.due() == [], (
+            'Window without repeats should end silently'
+        )
+
+    def test_bounded_entries(self):
+        from suppression import ErrorSuppressor
+
+        suppressor = ErrorSuppressor(max_entries=2, clock=FakeClock())
+        for name in ('a', 'b', 'c'):
+            suppressor.notification('one', ValueError(name))
+        assert len(suppressor) == 2, (
+            'Least recently seen fingerprints should be dropped'
+        )
+        assert suppressor.notification('one', ValueError('a')), (
+            'Dropped fingerprint should be reported again'
+        )
+
+    def test_engine_sends_summaries(self):
+        from engine import PollingEngine, Tenant
+        from suppression import ErrorSuppressor
+
+        class MockBot:
+
+            def __init__(self):
+                self.messages = []
+
+            def send_message(self, chat_id=None, text=None, **kwargs):
+                self.messages.append((chat_id, text))
+
+        clock = FakeClock()
+        bot = MockBot()
+        engine = PollingEngine(
+            [Tenant('one', 't1', 1)], bot,
+            suppressor=ErrorSuppressor(window=60, clock=clock)
+        )
+        for _ in range(3):
+            engine.suppressor.notification('one', ValueError('down'))
+        engine.report_suppressed()
+        assert bot.messages == []
+        clock.now = 60
+        engine.report_suppressed()
+        assert bot.messages == [
+            (1, 'Program failure: down (3 occurrences in the last minute).')
+        ], 'Summary should be sent to the tenant chat'
@@ -0,0 +1,143 @@
+import socket
+import threading
+import time
+from http import HTTPStatus
+
+import pytest
+import requests
+
+from utils import MockResponse
+
+
+class SilentServer:
+    """TCP server which accepts connections and never answers."""
+
+    def __init__(self):
+        self.socket = socket.socket()
+        self.socket.bind(('127.0.0.1', 0))
+        self.socket.listen(8)
+        self.url = f'http://127.0.0.1:{self.socket.getsockname()[1]}/'
+        self.connections = []
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                connection, _ = self.socket.accept()
+            except OSError:
+                return
+            self.connections.append(connection)
+
+    def close(self):
+        for connection in self.connections:
+            connection.close()
+        self.socket.close()
+
+
+class TestApiRetries:
+
+    def mock_get(self, monkeypatch, results):
+        calls = []
+
+        def mock_get(url, params=None, headers=None, timeout=None, **kwargs):
+            calls.append(timeout)
+            result = results[min(len(calls), len(results)) - 1]
+            if isinstance(result, Exception):
+                raise result
+            return MockResponse(
+                {'homeworks': [], 'current_date': 100}, result
+            )
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        return calls
+
+    def test_retry_server_error(self, monkeypatch):
+        import assistant_bot
+
+        calls = self.mock_get(
+            monkeypatch, [HTTPStatus.SERVICE_UNAVAILABLE, HTTPStatus.OK]
+        )
+        assert assistant_bot.get_api_answer(100)['current_date'] == 100
+        assert len(calls) == 2, 'Server error should be retried'
+        assert calls[0] == (
+            assistant_bot.API_CONNECT_TIMEOUT, assistant_bot.API_READ_TIMEOUT
+        ), 'Request should be sent with connect and read timeouts'
+
+    def test_client_error_is_not_retried(self, monkeypatch):
+        import assistant_bot
+        from exceptions import ApiEndpointHttpResponseException
+
+        calls = self.mock_get(monkeypatch, [HTTPStatus.NOT_FOUND])
+        with pytest.raises(ApiEndpointHttpResponseException):
+            assistant_bot.get_api_answer(100)
+        assert len(calls) == 1
+
+    @pytest.mark.parametrize('error, exception', [
+        (requests.exceptions.ConnectTimeout(), 'ApiConnectTimeoutException'),
+        (requests.exceptions.ReadTimeout(), 'ApiReadTimeoutException'),
+        (requests.exceptions.ConnectionError(), 'ApiConnectionException'),
+    ])
+    def test_failure_exceptions(self, monkeypatch, error, exception):
+        import assistant_bot
+
+        calls = self.mock_get(monkeypatch, [error])
+        with pytest.raises(Exception) as info:
+            assistant_bot.get_api_answer(100)
+        assert type(info.value).__name__ == exception
+        assert len(calls) == assistant_bot.API_RETRIES + 1, (
+            'Failed request should be retried limited number of times'
+        )
+
+    def test_deadline(self, monkeypatch):
+        import assistant_bot
+        from exceptions import ApiDeadlineExceededException
+
+        calls = self.mock_get(monkeypatch, [HTTPStatus.OK])
+        assistant_bot.request_api_answer(
+            100, {}, deadline=time.monotonic() + 1
+        )
+        assert calls[0][1] <= 1, (
+            'Read timeout should not exceed time left before deadline'
+        )
+        with pytest.raises(ApiDeadlineExceededException):
+            assistant_bot.request_api_answer(
+                100, {}, deadline=time.monotonic() - 1
+            )
+
+    def test_read_timeout_bounds_request(self, monkeypatch):
+        import assistant_bot
+        from exceptions import ApiReadTimeoutException
+
+        server = SilentServer()
+        monkeypatch.setattr(assistant_bot, 'ENDPOINT', server.url)
+        monkeypatch.setattr(assistant_bot, 'API_READ_TIMEOUT', 0.2)
+        monkeypatch.setattr(assistant_bot, 'API_RETRIES', 1)
+        start = time.monotonic()
+        try:
+            with pytest.raises(ApiReadTimeoutException):
+                assistant_bot.get_api_answer(100)
+        finally:
+            server.close()
+        assert time.monotonic() - start < 2, (
+            'Stuck connection should fail after read timeout'
+        )
+
+
+class TestTelegramTimeout:
+
+    def test_call_timeout(self):
+        from exceptions import TelegramTimeoutException
+        from transport import TelegramClient, Transport
+
+        server = SilentServer()
+        transport = Transport()
+        client = TelegramClient(
+            '1234:abc', transport, api_url=server.url.rstrip('/'),
+            timeout=(0.2, 0.2)
+        )
+        try:
+            with pytest.raises(TelegramTimeoutException):
+                client.send_message(1, 'text')
+        finally:
+            transport.close()
+            server.close()
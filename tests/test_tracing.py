@@ -0,0 +1,97 @@
+import asyncio
+import json
+import time
+
+import requests
+
+from utils import MockBot, MockResponse
+
+HOMEWORKS = {
+    'homeworks': [{'homework_name': 'hw1', 'status': 'approved'}],
+    'current_date': 100
+}
+
+
+class TestTracing:
+
+    def test_cycle_spans(self, monkeypatch):
+        import tracing
+        from engine import PollingEngine, Tenant
+        from metrics import PARSE_STATUS_SECONDS
+
+        exporter = tracing.MemoryExporter()
+        monkeypatch.setattr(tracing.TRACER, 'exporter', exporter)
+        monkeypatch.setattr(
+            requests, 'get', lambda *args, **kwargs: MockResponse(HOMEWORKS)
+        )
+        engine = PollingEngine([Tenant('one', 't1', 1)], MockBot())
+        parsed = PARSE_STATUS_SECONDS.count
+        asyncio.run(engine.run_cycle())
+        assert PARSE_STATUS_SECONDS.count == parsed + 1, (
+            'Status parsing time should be observed'
+        )
+
+        names = [span.name for span in exporter.spans]
+        assert names == [
+            'json_decode', 'get_api_answer', 'check_response',
+            'parse_status', 'send_message', 'poll'
+        ], 'Every stage of the cycle should be recorded'
+        root = exporter.spans[-1]
+        assert {span.cycle_id for span in exporter.spans} == {root.cycle_id}
+        assert {span.tenant for span in exporter.spans} == {'one'}, (
+            'Child spans should inherit tenant of the cycle'
+        )
+        assert root.attributes['changes'] == 1
+        assert exporter.spans[1].parent_id == root.span_id
+
+    def test_sampling(self):
+        from tracing import MemoryExporter, Tracer
+
+        exporter = MemoryExporter()
+        tracer = Tracer(exporter, sample_rate=0.5, rand=lambda: 0.9)
+        with tracer.span('poll') as span:
+            span.set(changes=1)
+            with tracer.span('get_api_answer'):
+                pass
+        assert exporter.spans == [], (
+            'Spans of not sampled cycle should not be exported'
+        )
+
+    def test_json_lines_exporter(self, tmp_path):
+        from tracing import JsonLinesExporter, Tracer
+
+        path = tmp_path / 'traces.jsonl'
+        exporter = JsonLinesExporter(str(path))
+        tracer = Tracer(exporter)
+        try:
+            with tracer.span('poll', tenant='one'):
+                raise KeyError('homeworks')
+        except KeyError:
+            pass
+        exporter.close()
+        data = json.loads(path.read_text())
+        assert data['name'] == 'poll'
+        assert data['error'] == 'KeyError'
+        assert data['duration'] >= 0
+
+
+class TestSamplingProfiler:
+
+    def test_profile_window(self, tmp_path):
+        from profiler import SamplingProfiler
+
+        profiler = SamplingProfiler(str(tmp_path), interval=0.001)
+        assert profiler.start(0.2)
+        assert not profiler.start(0.2), (
+            'Only one profile window should run at a time'
+        )
+        deadline = time.monotonic() + 0.1
+        while time.monotonic() < deadline:
+            sum(range(1000))
+        profiler.join(5)
+        profile, = tmp_path.glob('profile-*.txt')
+        lines = profile.read_text().splitlines()
+        assert any(line.startswith('MainThread;') for line in lines), (
+            'Main thread stacks should be sampled'
+        )
+        assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
@@ -0,0 +1,73 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def _reply(self, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._reply({'agent': self.headers.get('User-Agent')})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        params = json.loads(self.rfile.read(length) or b'{}')
+        if params.get('chat_id') == 'bad':
+            self._reply({'ok': False, 'description': 'Bad Request'})
+        else:
+            self._reply({'ok': True, 'result': params})
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+class TestTransport:
+
+    def test_connections_are_reused(self, stub_url):
+        from transport import Transport
+
+        transport = Transport(default_pool_size=2)
+        for _ in range(5):
+            response = transport.get(stub_url + '/api')
+            assert response.json()['agent'] == 'assistant-telegram-bot', (
+                'Default headers should be sent with every request'
+            )
+        stats = transport.stats()[stub_url[len('http://'):]]
+        assert stats['requests'] == 5
+        assert stats['connections'] == 1, (
+            'Keep-alive session should reuse one connection'
+        )
+        assert stats['reused'] == 4
+        transport.close()
+
+    def test_telegram_client(self, stub_url):
+        from exceptions import TelegramApiException
+        from transport import TelegramClient, Transport
+
+        transport = Transport()
+        client = TelegramClient('1234:abc', transport, api_url=stub_url)
+        result = client.send_message(42, 'text')
+        assert result == {'chat_id': 42, 'text': 'text'}
+        with pytest.raises(TelegramApiException):
+            client.send_message('bad', 'text')
+        transport.close()
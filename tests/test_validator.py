@@ -0,0 +1,54 @@
+import pytest
+
+from exceptions import ApiResponseException, ApiValidationException
+
+VERDICTS = ('approved', 'reviewing', 'rejected')
+
+
+class TestResponseValidator:
+
+    def test_valid_response(self, random_timestamp):
+        from validator import ResponseValidator
+
+        validator = ResponseValidator(VERDICTS)
+        result = validator.validate({
+            'current_date': random_timestamp,
+            'homeworks': [
+                {'id': 1, 'homework_name': 'hw1', 'status': 'approved',
+                 'reviewer_comment': 'OK'},
+                {'homework_name': 'hw2', 'status': 'reviewing'},
+            ]
+        })
+        assert result.current_date == random_timestamp
+        assert [hw.name for hw in result.homeworks] == ['hw1', 'hw2']
+        assert result.homeworks[0].id == 1
+        assert result.homeworks[0].reviewer_comment == 'OK'
+        assert result.homeworks[1].status == 'reviewing'
+
+    def test_all_problems_reported(self, random_timestamp):
+        from validator import ResponseValidator
+
+        validator = ResponseValidator(VERDICTS)
+        with pytest.raises(ApiValidationException) as info:
+            validator.validate({
+                'current_date': random_timestamp,
+                'homeworks': [
+                    {'status': 'approved'},
+                    {'homework_name': 'hw2', 'status': 'unknown'},
+                    {'homework_name': 3, 'status': 'approved'},
+                    'hw4',
+                ]
+            })
+        assert len(info.value.errors) == 4, (
+            'Every invalid homework should be reported'
+        )
+        assert isinstance(info.value, ApiResponseException)
+
+    @pytest.mark.parametrize('response', [
+        {}, [], {'current_date': 1}, {'current_date': 1, 'homeworks': {}},
+    ])
+    def test_invalid_response(self, response):
+        from validator import ResponseValidator
+
+        with pytest.raises(ApiValidationException):
+            ResponseValidator(VERDICTS).validate(response)
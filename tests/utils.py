@@ -1,3 +1,5 @@
+import json
+from http import HTTPStatus
 from inspect import signature
 from types import ModuleType
 
@@ -37,3 +39,25 @@ def check_default_var_exists(scope: ModuleType, var_name: str) -> None:
         f'{var_name} должна быть переменной, а не функцией.'
     )
 
+
+class MockResponse:
+    """Api response with JSON body of the data."""
+
+    def __init__(self, data=None, http_status=HTTPStatus.OK, headers=None):
+        self.data = data
+        self.status_code = http_status
+        self.content = json.dumps(data).encode('utf-8') if data else b''
+        self.headers = headers or {}
+
+    def json(self):
+        return self.data
+
+
+class MockBot:
+    """Telegram bot keeping sent messages."""
+
+    def __init__(self):
+        self.messages = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.messages.append((chat_id, text))
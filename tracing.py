@@ -0,0 +1,218 @@
+import os
+import json
+import time
+import random
+import atexit
+import threading
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+
+# Optional JSON lines file of finished spans, empty disables tracing
+TRACE_FILE = os.getenv('TRACE_FILE')
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', 1))
+
+_current = ContextVar('tracing_span', default=None)
+# Marks context of a cycle which is not sampled
+_UNSAMPLED = object()
+
+
+def new_id():
+    """Return random 64-bit id as hex string."""
+    return '%016x' % random.getrandbits(64)
+
+
+class Span:
+    """Timed stage of a poll cycle.
+
+    Spans of one cycle share cycle id and tenant of the root span.
+    """
+
+    __slots__ = (
+        'name', 'cycle_id', 'span_id', 'parent_id', 'tenant', 'start',
+        'duration', 'attributes', 'error'
+    )
+
+    def __init__(self, name, cycle_id, parent_id, tenant, attributes):
+        self.name = name
+        self.cycle_id = cycle_id
+        self.span_id = new_id()
+        self.parent_id = parent_id
+        self.tenant = tenant
+        self.start = time.time()
+        self.duration = None
+        self.attributes = attributes
+        self.error = None
+
+    def set(self, **attributes):
+        """Add attributes to the span."""
+        self.attributes.update(attributes)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'cycle_id': self.cycle_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'tenant': self.tenant,
+            'start': self.start,
+            'duration': self.duration,
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+
+class NoopSpan:
+    """Span of disabled or not sampled tracing."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class ActiveSpan:
+    """Context manager which records span and makes it current."""
+
+    __slots__ = ('tracer', 'name', 'tenant', 'attributes', 'span', 'token',
+                 '_started')
+
+    def __init__(self, tracer, name, tenant, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.tenant = tenant
+        self.attributes = attributes
+        self.span = None
+        self.token = None
+
+    def __enter__(self):
+        parent = _current.get()
+        if parent is _UNSAMPLED:
+            return NOOP_SPAN
+        if parent is None:
+            # Root span decides if the whole cycle is recorded
+            if self.tracer.rand() >= self.tracer.sample_rate:
+                self.token = _current.set(_UNSAMPLED)
+                return NOOP_SPAN
+            span = Span(
+                self.name, new_id(), None, self.tenant, self.attributes
+            )
+        else:
+            span = Span(
+                self.name, parent.cycle_id, parent.span_id,
+                self.tenant or parent.tenant, self.attributes
+            )
+        self.span = span
+        self.token = _current.set(span)
+        self._started = time.perf_counter()
+        return span
+
+    def __exit__(self, error_type, error, traceback):
+        if self.token is not None:
+            _current.reset(self.token)
+        span = self.span
+        if span is not None:
+            span.duration = time.perf_counter() - self._started
+            if error_type is not None:
+                span.error = error_type.__name__
+            self.tracer.export(span)
+        return False
+
+
+class Exporter(ABC):
+    """Base class of finished spans exporters."""
+
+    @abstractmethod
+    def export(self, span):
+        """Write the finished span."""
+
+    def close(self):
+        pass
+
+
+class MemoryExporter(Exporter):
+    """Keep finished spans in a list."""
+
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+
+class JsonLinesExporter(Exporter):
+    """Append finished spans to a file as JSON lines."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class Tracer:
+    """Create spans and pass finished ones to the exporter.
+
+    Without exporter spans are no-op objects. Share of recorded poll
+    cycles is set by sample_rate.
+    """
+
+    def __init__(self, exporter=None, sample_rate=1.0, rand=random.random):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.rand = rand
+
+    @property
+    def enabled(self):
+        return self.exporter is not None
+
+    def span(self, name, tenant=None, **attributes):
+        """Return context manager of the span, nested in the current one."""
+        if self.exporter is None:
+            return NOOP_SPAN
+        return ActiveSpan(self, name, tenant, attributes)
+
+    def export(self, span):
+        try:
+            self.exporter.export(span)
+        except Exception:
+            # Tracing must not break polling
+            pass
+
+
+TRACER = Tracer()
+
+
+def span(name, tenant=None, **attributes):
+    """Return span context manager of the global tracer."""
+    return TRACER.span(name, tenant, **attributes)
+
+
+def configure(exporter=None, sample_rate=TRACE_SAMPLE_RATE):
+    """Set exporter of the global tracer.
+
+    Exporter defaults to JSON lines file of TRACE_FILE, tracing stays
+    disabled when it is not set.
+    """
+    if exporter is None and TRACE_FILE:
+        exporter = JsonLinesExporter(TRACE_FILE)
+        atexit.register(exporter.close)
+    TRACER.exporter = exporter
+    TRACER.sample_rate = sample_rate
+    return TRACER
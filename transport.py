@@ -0,0 +1,183 @@
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from exceptions import TelegramApiException, TelegramRetryAfterException
+from exceptions import TelegramTimeoutException, TelegramConnectionException
+from tracing import TRACER
+
+TELEGRAM_API_URL = 'https://api.telegram.org'
+# Connect and read timeouts (seconds) of telegram requests
+TELEGRAM_TIMEOUT = (3.05, 10)
+DEFAULT_HEADERS = {
+    'User-Agent': 'assistant-telegram-bot',
+    'Accept': 'application/json',
+    'Connection': 'keep-alive',
+}
+
+
+class Transport:
+    """Pooled keep-alive HTTP sessions shared by api and telegram calls.
+
+    One session is created per host on first use. Pool size of the host
+    is taken from pool_sizes or defaults to default_pool_size.
+    """
+
+    def __init__(self, pool_sizes=None, default_pool_size=10, headers=None):
+        self.pool_sizes = dict(pool_sizes or {})
+        self.default_pool_size = default_pool_size
+        # Build default headers once for every session
+        self.headers = dict(DEFAULT_HEADERS)
+        self.headers.update(headers or {})
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def session(self, url):
+        """Return keep-alive session for the url host."""
+        host = urlsplit(url).netloc
+        session = self._sessions.get(host)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(host)
+                if session is None:
+                    session = self._create_session(host)
+                    self._sessions[host] = session
+        return session
+
+    def _create_session(self, host):
+        pool_size = self.pool_sizes.get(host, self.default_pool_size)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session = requests.Session()
+        session.headers.update(self.headers)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def get(self, url, **kwargs):
+        """Make GET request with the host session."""
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        """Make POST request with the host session."""
+        return self.request('POST', url, **kwargs)
+
+    def request(self, method, url, **kwargs):
+        """Make request with the host session.
+
+        When tracing is enabled request span tells time to response
+        headers and number of opened connections (DNS, TCP and TLS setup).
+        """
+        session = self.session(url)
+        if not TRACER.enabled:
+            return session.request(method, url, **kwargs)
+        opened = self._connections(session)
+        with TRACER.span(
+            'http_request', method=method, host=urlsplit(url).netloc
+        ) as span:
+            response = session.request(method, url, **kwargs)
+            span.set(
+                status=response.status_code,
+                headers_seconds=response.elapsed.total_seconds(),
+                connections_opened=self._connections(session) - opened
+            )
+        return response
+
+    @staticmethod
+    def _connections(session):
+        connections = 0
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    connections += pool.num_connections
+        return connections
+
+    def stats(self):
+        """Return connection reuse statistics per host.
+
+        Requests made over an already open connection are counted as reused.
+        """
+        result = {}
+        for host, session in list(self._sessions.items()):
+            connections = requests_count = 0
+            for adapter in set(session.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for key in pools.keys():
+                    pool = pools.get(key)
+                    if pool is None:
+                        continue
+                    connections += pool.num_connections
+                    requests_count += pool.num_requests
+            result[host] = {
+                'requests': requests_count,
+                'connections': connections,
+                'reused': max(requests_count - connections, 0),
+            }
+        return result
+
+    def close(self):
+        """Close every session and its connections."""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+class TelegramClient:
+    """Telegram Bot API client working over the shared transport.
+
+    Has the same send_message(chat_id, text) call as telegram.Bot.
+    Requests are not retried here, sendMessage is not idempotent.
+    """
+
+    def __init__(self, token, transport, api_url=TELEGRAM_API_URL,
+                 timeout=TELEGRAM_TIMEOUT):
+        self.transport = transport
+        self.timeout = timeout
+        self._base_url = f'{api_url}/bot{token}/'
+
+    def call(self, method, request_timeout=None, **params):
+        """Call Bot API method and return its result.
+
+        request_timeout (connect, read) replaces client timeout, long
+        polling calls need read timeout above the polling timeout.
+        Raise exceptions: request failure or api response is not ok.
+        """
+        try:
+            response = self.transport.post(
+                self._base_url + method, json=params,
+                timeout=request_timeout or self.timeout
+            )
+        except requests.exceptions.Timeout as error:
+            raise TelegramTimeoutException(
+                f'Telegram {method} request timeout: {error}'
+            ) from error
+        except requests.exceptions.ConnectionError as error:
+            raise TelegramConnectionException(
+                f'Telegram {method} connection failure: {error}'
+            ) from error
+        try:
+            data = response.json()
+        except ValueError:
+            raise TelegramApiException(
+                f'Invalid telegram response. Status code: '
+                f'{response.status_code}'
+            )
+        if not data.get('ok'):
+            retry_after = (data.get('parameters') or {}).get('retry_after')
+            if retry_after:
+                raise TelegramRetryAfterException(
+                    f'Flood control exceeded. Retry in {retry_after} seconds.',
+                    retry_after
+                )
+            raise TelegramApiException(
+                f'{data.get("description")} ({response.status_code})'
+            )
+        return data.get('result')
+
+    def send_message(self, chat_id, text, **kwargs):
+        """Send text message to the chat."""
+        return self.call('sendMessage', chat_id=chat_id, text=text, **kwargs)
@@ -0,0 +1,106 @@
+from collections import namedtuple
+
+from exceptions import ApiValidationException
+
+# Declarative schemas: (key, allowed types, required)
+RESPONSE_SCHEMA = (
+    ('current_date', (int,), True),
+    ('homeworks', (list,), True),
+)
+HOMEWORK_SCHEMA = (
+    ('id', (int,), False),
+    ('homework_name', (str,), True),
+    ('status', (str,), True),
+    ('reviewer_comment', (str,), False),
+    ('date_updated', (str,), False),
+    ('lesson_name', (str,), False),
+)
+
+HomeworkRecord = namedtuple(
+    'HomeworkRecord',
+    'id name status reviewer_comment date_updated lesson_name'
+)
+ValidatedResponse = namedtuple('ValidatedResponse', 'current_date homeworks')
+
+_MISSING = object()
+
+
+class ResponseValidator:
+    """Validator of API responses compiled once from declarative schemas.
+
+    Whole homeworks list is checked in one pass, every problem is collected
+    and reported in one ApiValidationException.
+    """
+
+    def __init__(self, statuses, response_schema=RESPONSE_SCHEMA,
+                 homework_schema=HOMEWORK_SCHEMA):
+        self.statuses = frozenset(statuses)
+        self._response_fields = tuple(response_schema)
+        self._homework_fields = tuple(homework_schema)
+        self._status_index = [
+            key for key, _, _ in self._homework_fields
+        ].index('status')
+        if len(self._homework_fields) != len(HomeworkRecord._fields):
+            raise ValueError('Homework schema does not match record fields.')
+        self._make_record = HomeworkRecord._make
+
+    def validate(self, response):
+        """Return ValidatedResponse with current date and homework records.
+
+        Raise exceptions: response or any homework does not match schema
+        or has unknown status.
+        """
+        if not isinstance(response, dict) or not response:
+            raise ApiValidationException(
+                ['API response is not dictionary or empty.']
+            )
+        errors = []
+        for key, types, required in self._response_fields:
+            value = response.get(key, _MISSING)
+            if value is _MISSING:
+                if required:
+                    errors.append(f'Missing key {key!r} in api response.')
+            elif not isinstance(value, types):
+                errors.append(f'API response[{key!r}] has invalid type.')
+        if errors:
+            raise ApiValidationException(errors)
+        records = self._validate_homeworks(response['homeworks'], errors)
+        if errors:
+            raise ApiValidationException(errors)
+        return ValidatedResponse(response['current_date'], records)
+
+    def _validate_homeworks(self, homeworks, errors):
+        fields = self._homework_fields
+        statuses = self.statuses
+        status_index = self._status_index
+        make_record = self._make_record
+        records = []
+        append = records.append
+        for index, homework in enumerate(homeworks):
+            if not isinstance(homework, dict):
+                errors.append(f'Homework {index} is not dictionary.')
+                continue
+            values = []
+            valid = True
+            for key, types, required in fields:
+                value = homework.get(key)
+                if value is None:
+                    if required:
+                        errors.append(
+                            f'Missing {key!r} key in homework {index}.'
+                        )
+                        valid = False
+                elif not isinstance(value, types):
+                    errors.append(
+                        f'Homework {index} {key!r} has invalid type.'
+                    )
+                    valid = False
+                values.append(value)
+            if valid and values[status_index] not in statuses:
+                errors.append(
+                    f'Incorrect home work status: {values[status_index]}.'
+                )
+                valid = False
+            if valid:
+                append(make_record(values))
+        return records